@@ -0,0 +1,115 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from auto_assign import AUTO_ASSIGN_WEEKDAYS
+from config import (
+    DEFAULT_AUTO_ASSIGN_START_TIME, DEFAULT_AUTO_ASSIGN_END_TIME,
+    WEDNESDAY_AUTO_ASSIGN_START_TIME, WEDNESDAY_AUTO_ASSIGN_END_TIME,
+)
+from occupancy import end_minutes, end_minutes_array, time_to_minutes
+from reservation_frame import frame_from_rows, ordinal_to_date
+
+# --- 이용 통계 집계 ---
+# (주, 방) / (주, 조) / (주, 예약유형) 별 예약 분·건수와, 그중 그날 자동 배정 시간대와 겹친 건수를 집계 행으로 만든다.
+# 저장소는 이 행들을 usage_weekly 테이블에 두고 추가/취소 때마다 해당 예약분만 더하고 빼며,
+# 전체 기록은 처음 조회할 때(또는 전체 교체 후) 컬럼형 DataFrame 하나로 한 번에 다시 채운다.
+# 주(week)는 그 주 월요일의 date.toordinal() 이다.
+
+AGG_DIMENSIONS = {"room": "방", "team": "조", "type": "예약유형"}
+AGG_COLUMNS = ["dim", "week", "key", "minutes", "bookings", "auto_window_bookings"]
+SMALL_BATCH_ROWS = 64  # 이보다 적은 행(예약/취소 한 번)은 DataFrame 을 만들지 않고 행마다 더함
+
+_DEFAULT_AUTO_SLOT = (time_to_minutes(DEFAULT_AUTO_ASSIGN_START_TIME), end_minutes(time_to_minutes(DEFAULT_AUTO_ASSIGN_START_TIME), time_to_minutes(DEFAULT_AUTO_ASSIGN_END_TIME)))
+_WEDNESDAY_AUTO_SLOT = (time_to_minutes(WEDNESDAY_AUTO_ASSIGN_START_TIME), end_minutes(time_to_minutes(WEDNESDAY_AUTO_ASSIGN_START_TIME), time_to_minutes(WEDNESDAY_AUTO_ASSIGN_END_TIME)))
+
+
+def week_of(ordinal):
+    """날짜 서수 → 그 주 월요일의 서수 (date(1, 1, 1) 은 월요일)."""
+    return ordinal - (ordinal - 1) % 7
+
+
+def aggregate_frame(df):
+    """컬럼형 예약 DataFrame → AGG_COLUMNS 집계 DataFrame (차원마다 (주, 값) 한 행)."""
+    if df.empty: return pd.DataFrame(columns=AGG_COLUMNS)
+    days = df["날짜"].to_numpy(np.int64)
+    weekday = (days - 1) % 7
+    start = df["시간_시작"].to_numpy(np.int32)
+    end = end_minutes_array(start, df["시간_종료"])
+    wednesday = weekday == 2
+    auto_start = np.where(wednesday, _WEDNESDAY_AUTO_SLOT[0], _DEFAULT_AUTO_SLOT[0])
+    auto_end = np.where(wednesday, _WEDNESDAY_AUTO_SLOT[1], _DEFAULT_AUTO_SLOT[1])
+    base = pd.DataFrame({
+        "week": days - weekday, "minutes": np.maximum(end - start, 0), "bookings": 1,
+        "auto_window_bookings": (np.isin(weekday, AUTO_ASSIGN_WEEKDAYS) & (start < auto_end) & (end > auto_start)).astype(np.int64),
+    })
+    parts = [base.assign(key=df[col].astype(str).to_numpy()).groupby(["week", "key"], sort=False).sum().reset_index().assign(dim=dim)
+             for dim, col in AGG_DIMENSIONS.items()]
+    return pd.concat(parts, ignore_index=True)[AGG_COLUMNS]
+
+
+def aggregate_values(df, sign=1):
+    """usage_weekly 에 더할 (dim, week, key, minutes, bookings, auto_window_bookings) 튜플 목록. sign=-1 이면 빼기용."""
+    agg = aggregate_frame(df)
+    return [(dim, int(week), key, sign * int(minutes), sign * int(bookings), sign * int(auto))
+            for dim, week, key, minutes, bookings, auto in agg.itertuples(index=False)]
+
+
+def _parse_minutes(text):
+    hour, minute = text.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def aggregate_rows(values, headers, sign=1):
+    """저장소 행(헤더 순서의 'YYYY-MM-DD'/'HH:MM' 문자열) → aggregate_values 와 같은 튜플 목록.
+
+    몇 행뿐인 추가/취소는 DataFrame 생성·groupby 비용(수십 ms)이 대부분이라 행마다 직접 더하고, 많으면 컬럼 연산으로 넘긴다.
+    """
+    if len(values) >= SMALL_BATCH_ROWS: return aggregate_values(frame_from_rows(values, headers), sign)
+    acc = {}
+    for row in values:
+        record = dict(zip(headers, row))
+        try: ordinal, start, end = date.fromisoformat(record["날짜"]).toordinal(), _parse_minutes(record["시간_시작"]), _parse_minutes(record["시간_종료"])
+        except ValueError: continue  # frame_from_rows 와 같이 해석할 수 없는 행은 제외
+        weekday = (ordinal - 1) % 7
+        end = end_minutes(start, end)
+        slot_start, slot_end = _WEDNESDAY_AUTO_SLOT if weekday == 2 else _DEFAULT_AUTO_SLOT
+        auto = int(weekday in AUTO_ASSIGN_WEEKDAYS and start < slot_end and end > slot_start)
+        for dim, col in AGG_DIMENSIONS.items():
+            counts = acc.setdefault((dim, week_of(ordinal), str(record[col])), [0, 0, 0])
+            counts[0] += max(end - start, 0); counts[1] += 1; counts[2] += auto
+    return [(dim, week, key, sign * minutes, sign * bookings, sign * auto) for (dim, week, key), (minutes, bookings, auto) in acc.items()]
+
+
+# --- 화면용 표 ---
+# 모두 usage_weekly 조회 결과(AGG_COLUMNS DataFrame)만으로 만든다.
+
+def hours_by_week(agg, dim, keys):
+    """주(행) × keys(열) 예약 시간 표. 예약이 없는 주/값은 0."""
+    part = agg[agg["dim"] == dim]
+    table = part.pivot_table(index="week", columns="key", values="minutes", aggfunc="sum", fill_value=0) / 60
+    extra = sorted(set(table.columns) - set(keys))
+    table = table.reindex(columns=list(keys) + extra, fill_value=0)
+    table.index = [ordinal_to_date(week) for week in table.index]
+    table.index.name = "주 (월요일)"
+    return table
+
+
+def totals(agg, dim, keys, weeks):
+    """keys 별 기간 합계: 예약 시간, 건수, 예약이 없었던 주 수, 비중."""
+    part = agg[agg["dim"] == dim].groupby("key")[["minutes", "bookings"]].sum()
+    part = part.reindex(list(keys) + sorted(set(part.index) - set(keys)), fill_value=0)
+    active_weeks = agg[(agg["dim"] == dim) & (agg["minutes"] > 0)].groupby("key")["week"].nunique().reindex(part.index, fill_value=0)
+    total_minutes = part["minutes"].sum()
+    return pd.DataFrame({
+        "예약 시간": (part["minutes"] / 60).round(1), "예약 건수": part["bookings"],
+        "예약 없는 주": weeks - active_weeks, "비중(%)": (part["minutes"] / total_minutes * 100).round(1) if total_minutes else 0.0,
+    })
+
+
+def collision_summary(agg):
+    """예약유형별 건수와 그날 자동 배정 시간대(수/일)와 겹친 건수."""
+    part = agg[agg["dim"] == "type"].groupby("key")[["bookings", "auto_window_bookings"]].sum()
+    part["비율(%)"] = (part["auto_window_bookings"] / part["bookings"].where(part["bookings"] > 0) * 100).round(1).fillna(0.0)
+    return part.rename(columns={"bookings": "예약 건수", "auto_window_bookings": "자동 배정 시간대와 겹친 건수"})
@@ -0,0 +1,81 @@
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from occupancy import time_to_minutes
+from config import (
+    ALL_ROOMS, ALL_TEAMS, ROTATION_ROOMS, ROTATION_TEAMS, SENIOR_ROOM, SENIOR_TEAM,
+    DEFAULT_AUTO_ASSIGN_START_TIME, DEFAULT_AUTO_ASSIGN_END_TIME,
+    WEDNESDAY_AUTO_ASSIGN_START_TIME, WEDNESDAY_AUTO_ASSIGN_END_TIME,
+)
+
+# --- 자동 배정 ---
+# 하루치 배정(시니어조 고정 + 로테이션)과 기간 단위 계획을 만든다. 계획은 저장소를 건드리지 않으므로
+# 미리보기에 그대로 쓰고, 실행할 때는 모든 행과 마지막 로테이션 인덱스를 store.add(..., next_team_index=...) 한 번으로 기록한다.
+
+AUTO_ASSIGN_WEEKDAYS = (2, 6)  # 수요일, 일요일
+
+
+def auto_assign_slot(day):
+    """해당 날짜의 자동 배정 (시작, 종료) 시각. 수요일은 저녁 슬롯."""
+    if day.weekday() == 2: return WEDNESDAY_AUTO_ASSIGN_START_TIME, WEDNESDAY_AUTO_ASSIGN_END_TIME
+    return DEFAULT_AUTO_ASSIGN_START_TIME, DEFAULT_AUTO_ASSIGN_END_TIME
+
+
+def assign_day(day, next_team_index):
+    """하루치 자동 배정 행, 표시용 문구, 다음 로테이션 인덱스를 반환."""
+    start, end = auto_assign_slot(day)
+    rows, info = [], []
+    def make_row(team, room):
+        return {"날짜": day, "시간_시작": start, "시간_종료": end, "조": team, "방": room, "예약유형": "자동", "예약ID": str(uuid.uuid4())}
+    if SENIOR_TEAM in ALL_TEAMS and SENIOR_ROOM in ALL_ROOMS:
+        rows.append(make_row(SENIOR_TEAM, SENIOR_ROOM)); info.append(f"🔒 **{SENIOR_TEAM}** → **{SENIOR_ROOM}** (고정)")
+    num_teams = len(ROTATION_TEAMS)
+    available_slots = min(num_teams, len(ROTATION_ROOMS))
+    for i in range(available_slots):
+        team = ROTATION_TEAMS[(next_team_index + i) % num_teams]; room = ROTATION_ROOMS[i]
+        rows.append(make_row(team, room)); info.append(f"🔄 **{team}** → **{room}** (로테이션)")
+    new_next_index = (next_team_index + available_slots) % num_teams if num_teams > 0 else 0
+    return rows, info, new_next_index
+
+
+def auto_slot_minutes(day):
+    start, end = auto_assign_slot(day)
+    return time_to_minutes(start), time_to_minutes(end)
+
+
+def auto_assigned_days(existing_df):
+    """기존 (컬럼형) 예약 DataFrame 에서 그날 자동 배정 슬롯에 자동 예약이 있는 날짜 집합."""
+    if existing_df.empty: return set()
+    auto_df = existing_df[existing_df["예약유형"] == "자동"]
+    days = set()
+    for ordinal, start, end in zip(auto_df["날짜"].tolist(), auto_df["시간_시작"].tolist(), auto_df["시간_종료"].tolist()):
+        day = date.fromordinal(ordinal)
+        if (start, end) == auto_slot_minutes(day): days.add(day)
+    return days
+
+
+@dataclass
+class AutoAssignPlan:
+    rows: list = field(default_factory=list)
+    days: list = field(default_factory=list)
+    skipped_days: list = field(default_factory=list)
+    next_team_index: int = 0
+
+
+def plan_range(start_day, end_day, next_team_index, existing_df):
+    """start_day~end_day 의 모든 수/일요일 배정 계획. existing_df 는 같은 기간의 기존 예약(store.load_range 결과).
+
+    이미 자동 배정된 날짜는 건너뛰고 로테이션도 진행하지 않으므로, 실행 결과는 날짜별로 한 번씩 누른 것과 같다.
+    """
+    plan = AutoAssignPlan(next_team_index=next_team_index)
+    assigned = auto_assigned_days(existing_df)
+    day = start_day
+    while day <= end_day:
+        if day.weekday() in AUTO_ASSIGN_WEEKDAYS:
+            if day in assigned: plan.skipped_days.append(day)
+            else:
+                rows, _, plan.next_team_index = assign_day(day, plan.next_team_index)
+                plan.rows.extend(rows); plan.days.append(day)
+        day += timedelta(days=1)
+    return plan
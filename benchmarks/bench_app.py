@@ -0,0 +1,296 @@
+"""가짜 Google Sheets(benchmarks/fake_sheets.py)에 연결한 상태로 streamlit_app.py 를 AppTest 로 실행해 주요 경로를 측정한다.
+
+    python benchmarks/bench_app.py --rows 1000 10000 100000 --output bench.json
+
+결과는 JSON 하나(meta + results 목록)로 출력되며, 커밋 간 비교는 (rows, scenario) 기준으로 한다.
+wall_ms 는 해당 AppTest 실행(사용자가 기다리는 시간), sheet_* 는 가짜 시트가 집계한 호출 수·셀 수·가상 지연이다.
+시트 호출은 백그라운드 스레드에서도 일어나므로, 콜드 스타트 행의 sheet_* 에는 그 실행과 겹친 연결·초기 동기화 호출이 섞일 수 있다.
+form_change_* 는 예약 폼의 조 선택만 바꾼 실행으로, full 은 스크립트 전체, fragment 는 폼 조각만 다시 실행한 시간이다
+(AppTest 는 항상 전체 실행을 하므로 fragment 는 조각 ID 를 실어 보내는 방식으로 흉내 내며, 조각이 없는 트리에서는 건너뛴다).
+쓰기 시나리오의 sync_wall_ms 는 동기화 워커가 저널을 비울 때까지의 시간으로, 워커의 debounce(0.5초)를 포함한다.
+--inject-429 N 을 주면 쓰기 시나리오마다 다음 N 번의 시트 호출이 429 로 실패하며, 재시도 대기(실제 시간)가 sync_wall_ms 에 더해진다.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+import streamlit.testing.v1.local_script_runner as local_script_runner
+
+from config import ALL_ROOMS, ALL_TEAMS, KST, RESERVATION_SHEET_HEADERS, ROTATION_SHEET_HEADER
+import sheets_connection
+from write_behind import MirrorSyncWorker
+from benchmarks.fake_sheets import FakeSpreadsheet, SheetsMeter
+
+APP_PATH = os.path.join(REPO_ROOT, "streamlit_app.py")
+ROWS_PER_DAY = 100
+SLOT_HOURS = range(8, 21)
+
+
+def generate_rows(n_rows, first_day):
+    """first_day 부터 하루 ROWS_PER_DAY 건씩 채운 시트 행과, 그 다음(빈) 날짜. 한 슬롯 안에서는 방마다 다른 조라 겹침이 없다."""
+    day_cells = [(slot, hour, room_idx, room) for slot, hour in enumerate(SLOT_HOURS) for room_idx, room in enumerate(ALL_ROOMS)][:ROWS_PER_DAY]
+    rows = []
+    day = first_day
+    while len(rows) < n_rows:
+        for slot, hour, room_idx, room in day_cells[:n_rows - len(rows)]:
+            team = ALL_TEAMS[(slot * len(ALL_ROOMS) + room_idx) % len(ALL_TEAMS)]
+            kind = "수동" if room_idx % 3 == 0 else "자동"
+            rows.append([day.isoformat(), f"{hour:02d}:00", f"{hour + 1:02d}:00", team, room, kind, f"bench-{len(rows)}"])
+        day += timedelta(days=1)
+    return rows, day
+
+
+def build_spreadsheet(meter, n_rows, first_day):
+    book = FakeSpreadsheet(meter)
+    rows, free_day = generate_rows(n_rows, first_day)
+    book.add_worksheet("reservations", values=[RESERVATION_SHEET_HEADERS] + rows)
+    book.add_worksheet("rotation_state", values=[ROTATION_SHEET_HEADER + ["data_version"], ["0", "seed"]])
+    return book, free_day
+
+
+def stop_background_workers():
+    for thread in threading.enumerate():
+        if isinstance(thread, MirrorSyncWorker): thread.stop()
+
+
+def wait_until(predicate, timeout=600.0, interval=0.05):
+    deadline = time_module.perf_counter() + timeout
+    while not predicate():
+        if time_module.perf_counter() > deadline: raise TimeoutError("benchmark wait timed out")
+        time_module.sleep(interval)
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+
+    def record(self, n_rows, scenario, wall, before, after, **extra):
+        result = {
+            "rows": n_rows, "scenario": scenario, "wall_ms": round(wall * 1000, 2),
+            "sheet_calls": after["calls"] - before["calls"], "sheet_cells": after["cells"] - before["cells"],
+            "sheet_ms": round((after["sheet_seconds"] - before["sheet_seconds"]) * 1000, 2),
+            "quota_waits": after["quota_waits"] - before["quota_waits"],
+            "quota_errors": after["quota_errors"] - before["quota_errors"],
+        }
+        result.update(extra)
+        self.results.append(result)
+        print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+
+    def timed_run(self, n_rows, scenario, meter, run, **extra):
+        before = meter.snapshot()
+        started = time_module.perf_counter()
+        at = run()
+        wall = time_module.perf_counter() - started
+        if at.exception: raise RuntimeError(f"{scenario}: {at.exception[0].value}")
+        self.record(n_rows, scenario, wall, before, meter.snapshot(), **extra)
+        return at
+
+    def timed_write(self, n_rows, scenario, meter, db_path, run, check):
+        """화면 응답 시간과, 이어지는 동기화 워커의 시트 반영 비용을 함께 기록."""
+        before = meter.snapshot()
+        if self.args.inject_429: meter.inject_errors(self.args.inject_429, 429)
+        started = time_module.perf_counter()
+        at = run()
+        wall = time_module.perf_counter() - started
+        if at.exception: raise RuntimeError(f"{scenario}: {at.exception[0].value}")
+        check(at)
+        wait_until(lambda: pending_outbox(db_path) == 0)
+        self.record(n_rows, scenario, wall, before, meter.snapshot(), sync_wall_ms=round((time_module.perf_counter() - started) * 1000, 2))
+        return at
+
+    def run_size(self, n_rows):
+        meter = SheetsMeter(latency=self.args.latency, per_cell_latency=self.args.per_cell_latency,
+                            quota_per_minute=self.args.quota, on_quota="wait", real_sleep=self.args.real_latency)
+        today = datetime.now(KST).date()
+        book, free_day = build_spreadsheet(meter, n_rows, today)
+        sheets_connection.SheetsConnector._connect = lambda connector: {ws.title: ws for ws in book.worksheets() if ws.title in connector.titles}
+
+        stop_background_workers()
+        st.cache_resource.clear()
+        db_path = os.path.join(tempfile.mkdtemp(prefix="fruitroom-bench-"), "reservations.db")
+        os.environ["RESERVATION_DB_PATH"] = db_path
+        # 분당 한도는 가짜 시트가 가상 시간으로 적용하므로 앱의 토큰 버킷(실제 sleep)은 끔
+        os.environ["SHEETS_REQUESTS_PER_MINUTE"] = "0"
+
+        at = AppTest.from_file(APP_PATH, default_timeout=self.args.timeout)
+        at.secrets["GOOGLE_SHEETS_CREDENTIALS"] = "{}"
+        at.secrets["GOOGLE_SHEET_NAME"] = "bench"
+
+        # 1) 콜드 스타트: 빈 로컬 저장소, 시트 연결은 백그라운드
+        # 2) 초기 적재: 연결 후 실행에서 워커가 붙고, 첫 원격 확인이 시트 전체를 가져와 파싱·저장 (콜드 스타트 시작부터 측정)
+        before = meter.snapshot()
+        started = time_module.perf_counter()
+        self.timed_run(n_rows, "cold_start_first_paint", meter, at.run)
+        wait_until(lambda: not any(t.name == "sheets-connect" for t in threading.enumerate()))
+        at.run()
+        wait_until(lambda: local_count(db_path) >= n_rows and remote_reconciled(db_path))
+        self.record(n_rows, "initial_sync_load_parse", time_module.perf_counter() - started, before, meter.snapshot())
+
+        # 3) 전체 다시 불러오기 (get_all_records + 파싱 + 로컬 교체)
+        self.timed_run(n_rows, "reload_from_sheets", meter, at.sidebar.button(key="cache_refresh_btn_admin_v8").click().run)
+
+        # 4) 하루치 시간표: 캐시 미스 후 같은 화면 재실행(캐시 적중)
+        at.date_input(key="unified_date_selector_v8").set_value(today)
+        self.timed_run(n_rows, "timetable_cold", meter, at.run, reservations_on_day=min(n_rows, ROWS_PER_DAY))
+        self.timed_run(n_rows, "timetable_cached", meter, at.run)
+
+        # 4-1) 예약 폼 위젯 변경: 전체 실행 vs 폼 조각만 실행
+        team_select = next(s for s in at.selectbox if s.key and s.key.startswith("manual_team_sel_main_page_reserve_v8"))
+        team_select.set_value(ALL_TEAMS[1])
+        self.timed_run(n_rows, "form_change_full_rerun", meter, at.run)
+        team_select = next(s for s in at.selectbox if s.key and s.key.startswith("manual_team_sel_main_page_reserve_v8"))
+        team_select.set_value(ALL_TEAMS[2])
+        run_form_fragment = fragment_runner(at, "booking_form_fragment")
+        if run_form_fragment is not None:
+            self.timed_run(n_rows, "form_change_fragment_rerun", meter, run_form_fragment)
+            at.run()  # 조각만 실행한 뒤의 요소 트리에는 조각 밖 위젯이 없으므로 전체를 다시 그림
+
+        # 5) 빈 방 찾기: 오늘부터 31일 (꽉 찬 날과 빈 날이 섞임). 첫 검색은 기간 조회로 점유 색인을 채우고, 다음 검색은 색인만 씀
+        #    options/search_ms 는 화면에 표시된 결과 건수와 검색 시간(조회 + 색인 + 검색)
+        at.date_input(key="free_slot_range_v8").set_value((today, today + timedelta(days=30)))
+        for scenario, team in (("free_slot_search_month", ALL_TEAMS[0]), ("free_slot_search_month_warm", ALL_TEAMS[1])):
+            at.selectbox(key="free_slot_team_sel_v8").set_value(team)
+            at = self.timed_run(n_rows, scenario, meter, at.button(key="free_slot_search_btn_v8").click().run)
+            self.results[-1].update(search_stats(at))
+
+        # 6) 수동 예약: 빈 날에 예약 후 시트 반영 (꽉 찬 날은 폼이 빈 방만 보여주므로 충돌할 선택지가 없음)
+        at.date_input(key="unified_date_selector_v8").set_value(free_day).run()
+        self.timed_write(n_rows, "manual_reserve", meter, db_path, lambda: reserve_button(at).click().run(),
+                         lambda at: expect_count(cancel_buttons(at), 1))
+
+        # 7) 취소
+        self.timed_write(n_rows, "cancel", meter, db_path, lambda: cancel_buttons(at)[0].click().run(),
+                         lambda at: expect_count(cancel_buttons(at), 0))
+
+        # 8) 자동 배정: 빈 날 이후 첫 일요일
+        auto_day = free_day + timedelta(days=1 + (6 - (free_day + timedelta(days=1)).weekday()))
+        at.button(key="admin_auto_assign_nav_btn_main_v8").click().run()
+        at.date_input(key="auto_date_admin_page_final_v8").set_value(auto_day).run()
+        self.timed_write(n_rows, "auto_assign", meter, db_path, lambda: at.button(key="auto_assign_btn_admin_page_final_v8").click().run(),
+                         lambda at: expect_count(at.main.dataframe, 1))
+
+        # 9) 이용 통계: 첫 진입은 (다시 불러오기로 비워진) 주간 집계를 전체 기록으로 채우고, 다음 실행은 집계 테이블만 읽음
+        at.sidebar.button(key="return_to_main_from_admin_v8").click().run()
+        at.sidebar.button(key="admin_analytics_nav_btn_main_v8").click()
+        self.timed_run(n_rows, "analytics_backfill", meter, at.run)
+        at = self.timed_run(n_rows, "analytics_cached", meter, at.run)
+        expect_count(at.main.dataframe, 3)
+
+        stop_background_workers()
+
+    def run(self):
+        for n_rows in self.args.rows: self.run_size(n_rows)
+        return {
+            "meta": {
+                "commit": git_commit(), "timestamp": datetime.now(KST).isoformat(timespec="seconds"),
+                "python": platform.python_version(), "streamlit": st.__version__,
+                "latency_s": self.args.latency, "per_cell_latency_s": self.args.per_cell_latency,
+                "quota_per_minute": self.args.quota, "real_latency": self.args.real_latency, "inject_429": self.args.inject_429, "rows_per_day": ROWS_PER_DAY,
+            },
+            "results": self.results,
+        }
+
+
+def reserve_button(at):
+    return next(b for b in at.button if b.key and b.key.startswith("manual_reserve_btn_main_page_reserve_v8"))
+
+
+def fragment_runner(at, name):
+    """AppTest 에서 함수 이름이 name 인 st.fragment 만 다시 실행하는 함수. 조각이 없거나 흉내 낼 수 없으면 None.
+
+    AppTest 공개 API 에는 조각만 실행하는 방법이 없어 비공개 구조(at._fragment_storage._fragments,
+    local_script_runner.RerunData 의 fragment_id_queue)를 쓴다. 이 함수에서만 쓰며, Streamlit 업그레이드로 모양이 바뀌면
+    조용히 전체 실행을 재지 않도록 경고를 남기고 해당 시나리오를 건너뛴다.
+    """
+    fragments = getattr(getattr(at, "_fragment_storage", None), "_fragments", None)
+    rerun_data = getattr(local_script_runner, "RerunData", None)
+    if not isinstance(fragments, dict) or not dataclasses.is_dataclass(rerun_data) or "fragment_id_queue" not in {f.name for f in dataclasses.fields(rerun_data)}:
+        print(f"경고: 이 Streamlit 버전({st.__version__})에서는 조각 실행을 흉내 낼 수 없어 {name} 시나리오를 건너뜁니다.", file=sys.stderr)
+        return None
+    fid = next((fid for fid, wrapped in fragments.items()
+                if any(getattr(cell.cell_contents, "__name__", None) == name for cell in wrapped.__closure__ or ())), None)
+    if fid is None: return None
+
+    def run():
+        # 브라우저가 조각 안 위젯을 바꿀 때처럼 fragment_id_queue 를 실은 재실행 요청을 보냄
+        local_script_runner.RerunData = lambda **kwargs: rerun_data(fragment_id_queue=[fid], **kwargs)
+        try: return at.run()
+        finally: local_script_runner.RerunData = rerun_data
+    return run
+
+
+def search_stats(at):
+    # "검색 N건 · X.Yms" 캡션
+    text = next(c.value for c in at.caption if c.value.startswith("검색 "))
+    count, elapsed = text.removeprefix("검색 ").split(" · ")
+    return {"options": int(count.removesuffix("건")), "search_ms": float(elapsed.removesuffix("ms"))}
+
+
+def cancel_buttons(at):
+    return [b for b in at.button if b.key and b.key.startswith("cancel_")]
+
+
+def expect_count(elements, count):
+    if len(elements) != count: raise RuntimeError(f"expected {count} elements, found {len(elements)}")
+
+
+def _db_scalar(db_path, sql):
+    with sqlite3.connect(db_path) as conn:
+        try: return conn.execute(sql).fetchone()[0]
+        except sqlite3.OperationalError: return 0
+
+
+def local_count(db_path):
+    return _db_scalar(db_path, "SELECT COUNT(*) FROM reservations")
+
+
+def remote_reconciled(db_path):
+    # 앱은 첫 원격 대조가 끝나기 전까지 쓰기 버튼을 막으므로 쓰기 시나리오 전에 확인
+    return _db_scalar(db_path, "SELECT COUNT(*) FROM app_state WHERE key = 'remote_reconciled'") > 0
+
+
+def pending_outbox(db_path):
+    return _db_scalar(db_path, "SELECT COUNT(*) FROM outbox")
+
+
+def git_commit():
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception: return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 Google Sheets 로 FruitRoom 앱 성능 측정")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--latency", type=float, default=0.2, help="시트 호출당 기본 지연(초, 가상 시간)")
+    parser.add_argument("--per-cell-latency", type=float, default=0.00002, help="읽고 쓴 셀 하나당 추가 지연(초)")
+    parser.add_argument("--quota", type=int, default=60, help="분당 요청 한도 (0 이면 제한 없음)")
+    parser.add_argument("--real-latency", action="store_true", help="가상 시간 대신 실제로 지연만큼 기다림")
+    parser.add_argument("--inject-429", type=int, default=0, help="쓰기 시나리오마다 먼저 실패시킬 429 응답 수 (재시도 확인용)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest 실행 제한 시간(초)")
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args(argv)
+    report = Bench(args).run()
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
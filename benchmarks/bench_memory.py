@@ -0,0 +1,94 @@
+"""예약 데이터 표현별 행당 메모리와 파싱·필터 시간을 비교한다.
+
+    python benchmarks/bench_memory.py --rows 1000 10000 100000 --output memory.json
+
+legacy 는 이전 경로(get_all_records() 의 dict 목록 → object 컬럼 DataFrame, 형식 없는 날짜 파싱, date/time 객체),
+columnar 는 reservation_frame 의 정수·범주형 컬럼이다. bytes_per_row 는 DataFrame.memory_usage(deep=True) 기준이며,
+filter_ms 는 하루치 수동 예약 추출 + 한 방의 시간 겹침 검사를 날짜마다 한 번씩 한 시간이다.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time as time_module
+from datetime import date, time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import pandas as pd
+
+from config import RESERVATION_SHEET_HEADERS
+from occupancy import time_to_minutes
+from reservation_frame import frame_from_rows
+from benchmarks.bench_app import generate_rows, git_commit
+
+
+def legacy_frame(rows, headers=RESERVATION_SHEET_HEADERS):
+    records = [dict(zip(headers, row)) for row in rows]
+    df = pd.DataFrame(records)
+    df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce').dt.date
+    df['시간_시작'] = pd.to_datetime(df['시간_시작'], format='%H:%M', errors='coerce').dt.time
+    df['시간_종료'] = pd.to_datetime(df['시간_종료'], format='%H:%M', errors='coerce').dt.time
+    return df.dropna(subset=['날짜', '시간_시작', '시간_종료'])
+
+
+def legacy_filter(df, days, room, start, end):
+    hits = 0
+    for day in days:
+        day_df = df[df["날짜"] == day]
+        hits += len(day_df[day_df["예약유형"] == "수동"])
+        hits += ((day_df["방"] == room) & (day_df["시간_시작"] < end) & (day_df["시간_종료"] > start)).sum()
+    return hits
+
+
+def columnar_filter(df, days, room, start, end):
+    start_min, end_min = time_to_minutes(start), time_to_minutes(end)
+    hits = 0
+    for day in days:
+        day_df = df[df["날짜"] == day.toordinal()]
+        hits += len(day_df[day_df["예약유형"] == "수동"])
+        hits += ((day_df["방"] == room) & (day_df["시간_시작"] < end_min) & (day_df["시간_종료"] > start_min)).sum()
+    return hits
+
+
+def measure(n_rows):
+    rows, free_day = generate_rows(n_rows, date(2026, 1, 1))
+    days = sorted({date.fromisoformat(row[0]) for row in rows})
+    results = []
+    for name, build, run_filter in (("legacy", legacy_frame, legacy_filter), ("columnar", frame_from_rows, columnar_filter)):
+        started = time_module.perf_counter()
+        df = build(rows)
+        parsed = time_module.perf_counter()
+        hits = run_filter(df, days, "9F-1", time(13, 0), time(15, 0))
+        filtered = time_module.perf_counter()
+        usage = df.memory_usage(index=False, deep=True)
+        results.append({
+            "rows": n_rows, "representation": name,
+            "bytes_per_row": round(usage.sum() / len(df), 1),
+            "bytes_per_row_by_column": {col: round(usage[col] / len(df), 1) for col in df.columns},
+            "parse_ms": round((parsed - started) * 1000, 2), "filter_ms": round((filtered - parsed) * 1000, 2), "filter_hits": int(hits),
+        })
+        print(json.dumps(results[-1], ensure_ascii=False), file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="예약 데이터 표현별 메모리/파싱/필터 비교")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--output", help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args(argv)
+    report = {
+        "meta": {"commit": git_commit(), "python": platform.python_version(), "pandas": pd.__version__},
+        "results": [result for n_rows in args.rows for result in measure(n_rows)],
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import re
+import threading
+import time as time_module
+from datetime import date
+
+# --- 가짜 Google Sheets ---
+# SheetsMirror / SheetsConnector 가 쓰는 gspread 표면(워크시트 읽기/쓰기, spreadsheet.batch_update, worksheets())만 메모리에서 흉내 낸다.
+# 모든 호출은 SheetsMeter 를 거치며, 호출마다 지연(기본 + 셀 수 비례)을 더하고 분당 요청 한도를 적용한다.
+# 기본은 실제로 기다리지 않고 가상 시간만 누적하므로 큰 시나리오도 빠르게 돌고, real_sleep=True 면 실제로 sleep 한다.
+
+_A1 = re.compile(r"([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$")
+_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})$")
+_TIME = re.compile(r"(\d{1,2}):(\d{2})$")
+_SERIAL_EPOCH = date(1899, 12, 30)
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters: index = index * 26 + (ord(ch) - 64)
+    return index
+
+
+def _parse_range(a1):
+    """'A2:G10' / 'B2' → (첫 행, 첫 열, 끝 행, 끝 열), 1부터 시작."""
+    m = _A1.match(a1.split("!")[-1])
+    c1, r1 = _column_index(m.group(1)), int(m.group(2))
+    c2 = _column_index(m.group(3)) if m.group(3) else c1
+    r2 = int(m.group(4)) if m.group(4) else r1
+    return r1, c1, r2, c2
+
+
+def _unformatted(value):
+    # USER_ENTERED 로 쓴 날짜/시간은 시트에서 일련번호가 되므로 UNFORMATTED_VALUE 읽기는 숫자를 돌려줌
+    m = _DATE.match(value)
+    if m: return (date(*map(int, m.groups())) - _SERIAL_EPOCH).days
+    m = _TIME.match(value)
+    if m: return (int(m.group(1)) * 60 + int(m.group(2))) / 1440
+    return _numericise(value)
+
+
+def _render(values, kwargs):
+    if kwargs.get("value_render_option") != "UNFORMATTED_VALUE": return values
+    return [[_unformatted(v) for v in row] for row in values]
+
+
+def _numericise(value):
+    # get_all_records 처럼 정수로 보이는 값은 int 로 돌려줌
+    if isinstance(value, str) and value.lstrip("-").isdigit(): return int(value)
+    return value
+
+
+class SheetsMeter:
+    """가짜 시트 전체가 공유하는 지연·요청 한도 모델과 호출 통계.
+
+    on_quota="wait" 이면 한도를 넘는 호출은 창이 빌 때까지 (가상) 대기하고, "raise" 면 HTTP 429 APIError 를 던진다.
+    """
+
+    def __init__(self, latency=0.2, per_cell_latency=0.00002, quota_per_minute=60, on_quota="wait", real_sleep=False):
+        self.latency = latency
+        self.per_cell_latency = per_cell_latency
+        self.quota_per_minute = quota_per_minute
+        self.on_quota = on_quota
+        self.real_sleep = real_sleep
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.clock = 0.0
+            self.calls = 0
+            self.cells = 0
+            self.quota_waits = 0
+            self.quota_errors = 0
+            self.by_method = {}
+            self._window = []
+            self._injected = []
+
+    def snapshot(self):
+        with self._lock:
+            return {"calls": self.calls, "cells": self.cells, "sheet_seconds": self.clock,
+                    "quota_waits": self.quota_waits, "quota_errors": self.quota_errors, "by_method": dict(self.by_method)}
+
+    def inject_errors(self, count, status=429):
+        """다음 count 번의 호출이 HTTP status 로 실패하게 함 (요청은 반영되지 않음)."""
+        with self._lock: self._injected.extend([status] * count)
+
+    def _api_error(self, status):
+        from gspread.exceptions import APIError
+        class _Response:
+            status_code = status
+            text = "Quota exceeded" if status == 429 else "Backend error"
+            headers = {}
+            def json(self): return {"error": {"code": status, "message": self.text, "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"}}
+        return APIError(_Response())
+
+    def charge(self, method, cells=0):
+        with self._lock:
+            if self._injected:
+                self.quota_errors += 1
+                self.clock += self.latency
+                raise self._api_error(self._injected.pop(0))
+            now = self.clock
+            self._window = [t for t in self._window if t > now - 60.0]
+            wait = 0.0
+            if self.quota_per_minute and len(self._window) >= self.quota_per_minute:
+                if self.on_quota == "raise":
+                    self.quota_errors += 1
+                    raise self._api_error(429)
+                wait = self._window[0] + 60.0 - now
+                self.quota_waits += 1
+                self._window.pop(0)
+            cost = wait + self.latency + cells * self.per_cell_latency
+            self.clock += cost
+            self._window.append(self.clock)
+            self.calls += 1
+            self.cells += cells
+            self.by_method[method] = self.by_method.get(method, 0) + 1
+        if self.real_sleep: time_module.sleep(cost)
+
+
+class FakeSpreadsheet:
+    def __init__(self, meter, spreadsheet_id="fake-spreadsheet"):
+        self.meter = meter
+        self.id = spreadsheet_id
+        self._sheets = []
+
+    def add_worksheet(self, title, rows=1000, cols=26, values=None):
+        ws = FakeWorksheet(self, title, len(self._sheets), values)
+        self._sheets.append(ws)
+        if values is None: self.meter.charge("add_worksheet")
+        return ws
+
+    def _by_id(self, sheet_id):
+        return next(ws for ws in self._sheets if ws.id == sheet_id)
+
+    def worksheets(self):
+        self.meter.charge("fetch_sheet_metadata")
+        return list(self._sheets)
+
+    def worksheet(self, title):
+        from gspread.exceptions import WorksheetNotFound
+        self.meter.charge("fetch_sheet_metadata")
+        for ws in self._sheets:
+            if ws.title == title: return ws
+        raise WorksheetNotFound(title)
+
+    def batch_update(self, body):
+        # 한도 오류로 거절된 요청은 반영되지 않도록 먼저 과금
+        self.meter.charge("batch_update", sum(len(row["values"]) for r in body["requests"] if "updateCells" in r for row in r["updateCells"]["rows"]))
+        for request in body["requests"]:
+            if "deleteDimension" in request:
+                rng = request["deleteDimension"]["range"]
+                del self._by_id(rng["sheetId"]).rows[rng["startIndex"]:rng["endIndex"]]
+            elif "updateCells" in request:
+                rng = request["updateCells"]["range"]
+                ws = self._by_id(rng["sheetId"])
+                for i, row in enumerate(request["updateCells"]["rows"]):
+                    for j, cell in enumerate(row["values"]):
+                        value = next(iter(cell["userEnteredValue"].values()))
+                        ws._set_cell(rng["startRowIndex"] + i, rng["startColumnIndex"] + j, str(value))
+        return {"replies": [{} for _ in body["requests"]]}
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id, values=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = [list(map(str, row)) for row in (values or [])]
+
+    def _charge(self, method, cells=0):
+        self.spreadsheet.meter.charge(method, cells)
+
+    def _set_cell(self, row_index, col_index, value):
+        while len(self.rows) <= row_index: self.rows.append([])
+        row = self.rows[row_index]
+        while len(row) <= col_index: row.append("")
+        row[col_index] = value
+
+    def _cells(self, rows):
+        return sum(len(row) for row in rows)
+
+    def get_all_values(self):
+        values = [list(row) for row in self.rows]
+        self._charge("values_get", self._cells(values))
+        return values
+
+    def get_values(self, range_name=None, **kwargs):
+        values = self.get_all_values() if range_name is None else self.get(range_name)
+        width = max((len(row) for row in values), default=0)
+        return _render([row + [""] * (width - len(row)) for row in values], kwargs)
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values: return []
+        header = values[0]
+        return [dict(zip(header, [_numericise(v) for v in row] + [""] * (len(header) - len(row)))) for row in values[1:]]
+
+    def col_values(self, col):
+        values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        while values and values[-1] == "": values.pop()
+        self._charge("values_get", len(values))
+        return values
+
+    def _read(self, a1):
+        r1, c1, r2, c2 = _parse_range(a1)
+        return [row[c1 - 1:c2] for row in self.rows[r1 - 1:r2] if row[c1 - 1:c2]]
+
+    def get(self, a1, **kwargs):
+        values = self._read(a1)
+        self._charge("values_get", self._cells(values))
+        return _render(values, kwargs)
+
+    def batch_get(self, ranges, **kwargs):
+        result = [self._read(a1) for a1 in ranges]
+        self._charge("values_batch_get", sum(self._cells(values) for values in result))
+        return [_render(values, kwargs) for values in result]
+
+    def append_rows(self, values, value_input_option=None, table_range=None, **kwargs):
+        self._charge("values_append", self._cells(values))
+        start = len(self.rows) + 1
+        self.rows.extend([list(map(str, row)) for row in values])
+        return {"updates": {"updatedRange": f"'{self.title}'!A{start}:G{len(self.rows)}", "updatedRows": len(values)}}
+
+    def clear(self):
+        self._charge("values_clear")
+        self.rows = []
+
+    def update(self, values, range_name=None, **kwargs):
+        self._charge("values_update", self._cells(values))
+        r1, c1 = (1, 1) if range_name is None else _parse_range(range_name)[:2]
+        for i, row in enumerate(values):
+            for j, value in enumerate(row): self._set_cell(r1 - 1 + i, c1 - 1 + j, str(value))
+        return {"updatedCells": self._cells(values)}
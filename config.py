@@ -0,0 +1,33 @@
+from datetime import time, timedelta, timezone
+
+# --- 초기 설정 ---
+# streamlit_app.py 와 저장소/부가 모듈이 함께 사용하는 상수
+AUTO_ASSIGN_EXCLUDE_TEAMS = ["대면A", "대면B", "대면C"]
+SENIOR_TEAM = "시니어조"
+SENIOR_ROOM = "9F-1"
+ALL_TEAMS = [f"{i}조" for i in range(1, 14)] + ["대면A", "대면B", "대면C","대면D", "청년", "중고등", SENIOR_TEAM]
+ROTATION_TEAMS = [team for team in ALL_TEAMS if team not in AUTO_ASSIGN_EXCLUDE_TEAMS and team != SENIOR_TEAM]
+ALL_ROOMS = [f"9F-{i}" for i in range(1, 7)] + ["B5-A", "B5-B", "B5-C"]
+ROTATION_ROOMS = [room for room in ALL_ROOMS if room != SENIOR_ROOM]
+
+RESERVATION_SHEET_HEADERS = ["날짜", "시간_시작", "시간_종료", "조", "방", "예약유형", "예약ID"]
+RESERVATION_TYPES = ["자동", "수동"]
+ROTATION_SHEET_HEADER = ["next_team_index"]
+TIME_STEP_MINUTES = 60
+
+DEFAULT_AUTO_ASSIGN_START_TIME = time(11, 0)
+DEFAULT_AUTO_ASSIGN_END_TIME = time(13, 0)
+
+DEFAULT_MANUAL_RESERVATION_START_HOUR = 13
+DEFAULT_MANUAL_RESERVATION_END_HOUR = 17
+
+WEDNESDAY_AUTO_ASSIGN_START_TIME = time(21, 0)
+WEDNESDAY_AUTO_ASSIGN_END_TIME = time(23, 59)
+
+WEDNESDAY_MANUAL_RESERVATION_START_HOUR = 16
+WEDNESDAY_MANUAL_RESERVATION_END_HOUR = 19
+
+KST = timezone(timedelta(hours=9))
+
+# 로컬 SQLite 저장소 경로 (환경 변수로 변경 가능)
+DEFAULT_RESERVATION_DB_PATH = "reservations.db"
@@ -0,0 +1,76 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from config import (
+    ALL_ROOMS, TIME_STEP_MINUTES,
+    DEFAULT_MANUAL_RESERVATION_START_HOUR, DEFAULT_MANUAL_RESERVATION_END_HOUR,
+    WEDNESDAY_MANUAL_RESERVATION_START_HOUR, WEDNESDAY_MANUAL_RESERVATION_END_HOUR,
+)
+from occupancy import interval_mask
+
+# --- 빈 방 찾기 ---
+# OccupancyIndex 의 (날짜, 방)/(날짜, 조) 비트마스크로 수동 예약 시간대 안의 빈 (날짜, 방, 시작) 을 찾는다.
+# 기간 검색은 load_range 한 번으로 색인을 채운 뒤(prime) 후보마다 마스크 AND 한 번만 하므로,
+# 한 달(31일 × 9방 × 몇 칸)을 훑어도 수 ms 안에 끝난다. 예약 폼의 방/시간 선택지도 같은 색인에서 거른다.
+
+FreeSlot = namedtuple("FreeSlot", ["day", "room", "start_min", "end_min"])
+
+
+def manual_hours(day):
+    """해당 날짜의 수동 예약 가능 (시작 시, 끝 시). 수요일은 저녁 시간대."""
+    if day.weekday() == 2: return WEDNESDAY_MANUAL_RESERVATION_START_HOUR, WEDNESDAY_MANUAL_RESERVATION_END_HOUR
+    return DEFAULT_MANUAL_RESERVATION_START_HOUR, DEFAULT_MANUAL_RESERVATION_END_HOUR
+
+
+def _busy_mask(index, day, team, room):
+    # 방이 쓰이고 있거나 조가 다른 방에 있는 분
+    return index.room_mask(day, room) | index.team_mask(day, team)
+
+
+def _slot_starts(day, duration_min, not_before=None, step=TIME_STEP_MINUTES):
+    # not_before=(오늘 날짜, 현재 분): 오늘은 이미 끝난 칸에서 시작하는 후보를 뺌
+    start_hour, end_hour = manual_hours(day)
+    starts = range(start_hour * 60, end_hour * 60 - duration_min + 1, step)
+    if not_before is not None and day == not_before[0]: starts = [s for s in starts if s + step > not_before[1]]
+    return starts
+
+
+def free_starts(index, day, team, room, not_before=None, step=TIME_STEP_MINUTES):
+    """예약 폼용: 방과 조가 모두 비어 있는 step 분 칸의 시작 분 목록."""
+    busy = _busy_mask(index, day, team, room)
+    return [s for s in _slot_starts(day, step, not_before, step) if not busy & interval_mask(s, s + step)]
+
+
+def free_ends(index, day, team, room, start_min, step=TIME_STEP_MINUTES):
+    """예약 폼용: start_min 에 시작해 끊기지 않고 이어지는 빈 구간의 가능한 종료 분 목록."""
+    busy = _busy_mask(index, day, team, room)
+    window_end = manual_hours(day)[1] * 60
+    ends = []
+    for end in range(start_min + step, window_end + 1, step):
+        if busy & interval_mask(end - step, end): break
+        ends.append(end)
+    return ends
+
+
+def free_rooms(index, day, team, rooms=ALL_ROOMS, not_before=None, step=TIME_STEP_MINUTES):
+    """예약 폼용: 수동 예약 시간대 안에 빈 칸이 하나라도 있는 방 목록 (rooms 순서)."""
+    return [room for room in rooms if free_starts(index, day, team, room, not_before, step)]
+
+
+def find_free_slots(index, team, duration_min, start_day, end_day, rooms=ALL_ROOMS, not_before=None, limit=None, step=TIME_STEP_MINUTES):
+    """start_day~end_day 의 수동 예약 시간대 안에서 team 이 duration_min 분 동안 쓸 수 있는 (날짜, 방, 시작) 목록.
+
+    빠른 순서(날짜 → 시작 시각 → rooms 순서)로 정렬되며 limit 개까지 반환한다. index 는 기간이 미리 채워져 있으면 좋다.
+    """
+    found = []
+    day = start_day
+    while day <= end_day:
+        busy = {room: _busy_mask(index, day, team, room) for room in rooms}
+        for start in _slot_starts(day, duration_min, not_before, step):
+            mask = interval_mask(start, start + duration_min)
+            for room in rooms:
+                if busy[room] & mask: continue
+                found.append(FreeSlot(day, room, start, start + duration_min))
+                if limit is not None and len(found) >= limit: return found
+        day += timedelta(days=1)
+    return found
@@ -0,0 +1,187 @@
+import json
+import math
+import logging
+import threading
+import time as time_module
+from collections import deque
+from contextlib import contextmanager
+
+# --- 실행 계측 ---
+# 스크립트 실행(rerun)마다 단계별(load, filter, timetable_build, render, write) 소요 시간을 재고,
+# Google Sheets API 호출 수·바이트와 캐시 적중률을 프로세스 전체 및 세션별로 집계한다.
+# 단계 시간은 최근 window 개만 보관해 p50/p95 를 계산하며, 각 실행은 JSON 한 줄로 로그에 남긴다.
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, q):
+    """최근접 순위 방식 백분위수. 값이 없으면 None."""
+    if not values: return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class MetricsRegistry:
+    """프로세스 전체가 공유하는 계측 저장소. 모든 메서드는 여러 스레드에서 호출해도 된다."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._phases = {}
+        self._phase_totals = {}
+        self._sheets = {}
+        self._caches = {}
+        self._cache_sources = {}
+
+    # --- 실행 / 단계 ---
+    def begin_rerun(self, session_usage, page=None, scope="app"):
+        """스크립트 실행 시작. session_usage 는 세션별 Sheets 사용량을 누적할 dict (st.session_state 에 보관).
+
+        scope 는 전체 실행이면 "app", 조각(fragment)만 다시 실행되면 그 조각 이름이다.
+        st.rerun()/st.stop() 으로 끝까지 가지 못한 직전 실행은 마지막 단계가 끝난 시점 기준으로 로그만 남긴다.
+        """
+        previous = session_usage.get("_open_rerun")
+        if previous is not None: self._log_rerun(previous, previous["last_mark"], completed=False)
+        now = time_module.perf_counter()
+        rerun = {"page": page, "scope": scope, "started": now, "last_mark": now, "phases": {}, "sheets_calls": 0, "sheets_bytes": 0}
+        session_usage["_open_rerun"] = rerun
+        self._local.rerun = rerun
+        self._local.session_usage = session_usage
+        return rerun
+
+    def end_rerun(self, session_usage):
+        rerun = session_usage.pop("_open_rerun", None)
+        self._local.rerun = None
+        if rerun is None: return
+        ended = time_module.perf_counter()
+        self.observe("rerun" if rerun["scope"] == "app" else f"rerun:{rerun['scope']}", ended - rerun["started"])
+        self._log_rerun(rerun, ended, completed=True)
+
+    def _log_rerun(self, rerun, ended, completed):
+        logger.info(json.dumps({
+            "event": "rerun", "page": rerun["page"], "scope": rerun["scope"], "completed": completed,
+            "total_ms": round((ended - rerun["started"]) * 1000, 2),
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in rerun["phases"].items()},
+            "sheets_calls": rerun["sheets_calls"], "sheets_bytes": rerun["sheets_bytes"],
+        }, ensure_ascii=False))
+
+    @contextmanager
+    def phase(self, name):
+        started = time_module.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time_module.perf_counter()
+            self.observe(name, ended - started)
+            rerun = getattr(self._local, "rerun", None)
+            if rerun is not None:
+                rerun["phases"][name] = rerun["phases"].get(name, 0.0) + (ended - started)
+                rerun["last_mark"] = ended
+
+    def observe(self, name, seconds):
+        with self._lock:
+            samples = self._phases.get(name)
+            if samples is None: samples = self._phases[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            totals = self._phase_totals.setdefault(name, [0, 0.0])
+            totals[0] += 1; totals[1] += seconds
+
+    def phase_summary(self):
+        """[{phase, count, p50_ms, p95_ms, max_ms}] — 백분위수는 최근 window 개 기준, count 는 누적."""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._phases.items()}
+            counts = {name: totals[0] for name, totals in self._phase_totals.items()}
+        return [{"phase": name, "count": counts[name],
+                 "p50_ms": round(percentile(samples, 50) * 1000, 2), "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                 "max_ms": round(max(samples) * 1000, 2)} for name, samples in sorted(snapshot.items())]
+
+    # --- Google Sheets API ---
+    def record_sheets_call(self, kind, bytes_out, bytes_in, seconds, status):
+        """HTTP 요청 하나. 스크립트 실행 중 호출이면 해당 세션 사용량에도 더한다 (백그라운드 스레드 호출은 프로세스 집계만)."""
+        with self._lock:
+            stats = self._sheets.setdefault(kind, {"calls": 0, "errors": 0, "bytes_out": 0, "bytes_in": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats["errors"] += status >= 400
+            stats["bytes_out"] += bytes_out; stats["bytes_in"] += bytes_in; stats["seconds"] += seconds
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun["sheets_calls"] += 1
+            rerun["sheets_bytes"] += bytes_out + bytes_in
+            usage = self._local.session_usage
+            usage["calls"] = usage.get("calls", 0) + 1
+            usage["bytes"] = usage.get("bytes", 0) + bytes_out + bytes_in
+
+    def sheets_summary(self):
+        with self._lock:
+            return {kind: dict(stats) for kind, stats in self._sheets.items()}
+
+    # --- 캐시 ---
+    def record_cache(self, name, hit):
+        with self._lock:
+            counts = self._caches.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def register_cache(self, name, stats):
+        """자체 적중/미스 카운터가 있는 캐시를 등록. stats() 는 (hits, misses) 를 반환."""
+        with self._lock: self._cache_sources[name] = stats
+
+    def cache_summary(self):
+        with self._lock:
+            counts = {name: tuple(c) for name, c in self._caches.items()}
+            sources = dict(self._cache_sources)
+        counts.update({name: tuple(stats()) for name, stats in sources.items()})
+        return {name: {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+                for name, (hits, misses) in sorted(counts.items())}
+
+    # --- Prometheus ---
+    def to_prometheus(self):
+        """Prometheus 텍스트 형식(0.0.4)."""
+        lines = ["# TYPE fruitroom_phase_seconds summary"]
+        with self._lock:
+            phases = {name: (list(samples), list(self._phase_totals[name])) for name, samples in self._phases.items()}
+        for name, (samples, (count, total)) in sorted(phases.items()):
+            for q in (0.5, 0.95):
+                lines.append(f'fruitroom_phase_seconds{{phase="{name}",quantile="{q}"}} {percentile(samples, q * 100):.6f}')
+            lines.append(f'fruitroom_phase_seconds_sum{{phase="{name}"}} {total:.6f}')
+            lines.append(f'fruitroom_phase_seconds_count{{phase="{name}"}} {count}')
+        sheets = self.sheets_summary()
+        for metric, key in (("fruitroom_sheets_requests_total", "calls"), ("fruitroom_sheets_errors_total", "errors")):
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f'{metric}{{endpoint="{kind}"}} {stats[key]}' for kind, stats in sorted(sheets.items())]
+        lines.append("# TYPE fruitroom_sheets_bytes_total counter")
+        for kind, stats in sorted(sheets.items()):
+            lines.append(f'fruitroom_sheets_bytes_total{{endpoint="{kind}",direction="out"}} {stats["bytes_out"]}')
+            lines.append(f'fruitroom_sheets_bytes_total{{endpoint="{kind}",direction="in"}} {stats["bytes_in"]}')
+        lines.append("# TYPE fruitroom_cache_requests_total counter")
+        for name, stats in self.cache_summary().items():
+            lines.append(f'fruitroom_cache_requests_total{{cache="{name}",result="hit"}} {stats["hits"]}')
+            lines.append(f'fruitroom_cache_requests_total{{cache="{name}",result="miss"}} {stats["misses"]}')
+        return "\n".join(lines) + "\n"
+
+
+def start_prometheus_exporter(registry, port, host="0.0.0.0"):
+    """GET /metrics 로 registry.to_prometheus() 를 내보내는 데몬 HTTP 서버를 띄우고 서버 객체를 반환."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404); return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+METRICS = MetricsRegistry()
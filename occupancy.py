@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+
+# --- 점유 색인 ---
+# (날짜, 방) / (날짜, 조) 별로 하루 1440분을 비트마스크(파이썬 int) 하나로 표현한다.
+# "구간 [start, end) 가 비었는가"는 마스크 AND 한 번으로 답하며, 색인은 데이터 버전마다 새로 만들고
+# 날짜별로 처음 조회될 때 한 번만 채운다. 조회 결과는 reservation_frame 의 분 단위 정수 컬럼을 그대로 쓴다.
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def time_to_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def end_minutes(start_min, end_min):
+    """실제 종료 시각(분). 자정까지를 뜻하는 23:59 와 오후 시작 예약의 00:00 은 하루 끝(1440)으로 본다."""
+    if end_min == MINUTES_PER_DAY - 1: return MINUTES_PER_DAY
+    if end_min == 0 and start_min > 12 * 60: return MINUTES_PER_DAY
+    return end_min
+
+
+def end_minutes_array(start_min, end_min):
+    """end_minutes 의 배열 버전 (int32 배열 반환)."""
+    start_min = np.asarray(start_min, dtype=np.int32)
+    end_min = np.asarray(end_min, dtype=np.int32)
+    return np.where((end_min == MINUTES_PER_DAY - 1) | ((end_min == 0) & (start_min > 12 * 60)), MINUTES_PER_DAY, end_min).astype(np.int32)
+
+
+def end_time_to_minutes(start, end):
+    return end_minutes(time_to_minutes(start), time_to_minutes(end))
+
+
+def interval_mask(start_min, end_min):
+    if end_min <= start_min: return 0
+    return ((1 << (end_min - start_min)) - 1) << start_min
+
+
+def reservation_mask(start, end):
+    return interval_mask(time_to_minutes(start), end_time_to_minutes(start, end))
+
+
+class OccupancyIndex:
+    """데이터 버전 하나에 대한 방/조 점유 색인. load_date(day)는 해당 날짜의 컬럼형 예약 DataFrame을 돌려주는 함수."""
+
+    def __init__(self, load_date, version=None):
+        self.version = version
+        self._load_date = load_date
+        self._lock = threading.Lock()
+        self._loaded_dates = set()
+        self._room_masks = {}
+        self._team_masks = {}
+
+    def _mark(self, day, room, team, mask):
+        self._room_masks[(day, room)] = self._room_masks.get((day, room), 0) | mask
+        self._team_masks[(day, team)] = self._team_masks.get((day, team), 0) | mask
+
+    def _mark_frame(self, days, df):
+        # days: 각 행의 날짜(date) 목록
+        ends = end_minutes_array(df["시간_시작"], df["시간_종료"]).tolist()
+        for day, room, team, start, end in zip(days, df["방"], df["조"], df["시간_시작"].tolist(), ends):
+            self._mark(day, room, team, interval_mask(start, end))
+
+    def _ensure_date(self, day):
+        if day in self._loaded_dates: return
+        with self._lock:
+            if day in self._loaded_dates: return
+            day_df = self._load_date(day)
+            self._mark_frame([day] * len(day_df), day_df)
+            self._loaded_dates.add(day)
+
+    def prime(self, days, range_df):
+        """기간 조회 결과(range_df)로 days 의 색인을 한 번에 채움. 이미 채워진 날짜는 건드리지 않는다."""
+        with self._lock:
+            days = [day for day in days if day not in self._loaded_dates]
+            if not days: return
+            by_ordinal = {day.toordinal(): day for day in days}
+            range_df = range_df[range_df["날짜"].isin(list(by_ordinal))]
+            self._mark_frame([by_ordinal[o] for o in range_df["날짜"].tolist()], range_df)
+            self._loaded_dates.update(days)
+
+    def missing_days(self, days):
+        """days 중 아직 색인에 채워지지 않은 날짜 목록 (기간 조회가 필요한지 판단용)."""
+        return [day for day in days if day not in self._loaded_dates]
+
+    def room_mask(self, day, room):
+        self._ensure_date(day)
+        return self._room_masks.get((day, room), 0)
+
+    def team_mask(self, day, team):
+        self._ensure_date(day)
+        return self._team_masks.get((day, team), 0)
+
+    def room_free(self, day, room, start, end):
+        return not (self.room_mask(day, room) & reservation_mask(start, end))
+
+    def team_free(self, day, team, start, end):
+        return not (self.team_mask(day, team) & reservation_mask(start, end))
+
+    def conflict(self, day, room, team, start, end):
+        """겹치는 대상이 있으면 "room" 또는 "team", 없으면 None."""
+        if not self.room_free(day, room, start, end): return "room"
+        if not self.team_free(day, team, start, end): return "team"
+        return None
+
+    def validate_batch(self, rows):
+        """여러 예약(dict 목록)을 기존 예약 및 배치 내부 예약과 한 번에 대조. (row, "room"|"team") 충돌 목록을 반환."""
+        pending_rooms, pending_teams = {}, {}
+        conflicts = []
+        for row in rows:
+            day, room, team = row["날짜"], row["방"], row["조"]
+            mask = reservation_mask(row["시간_시작"], row["시간_종료"])
+            room_key, team_key = (day, room), (day, team)
+            if (self.room_mask(day, room) | pending_rooms.get(room_key, 0)) & mask:
+                conflicts.append((row, "room"))
+            elif (self.team_mask(day, team) | pending_teams.get(team_key, 0)) & mask:
+                conflicts.append((row, "team"))
+            pending_rooms[room_key] = pending_rooms.get(room_key, 0) | mask
+            pending_teams[team_key] = pending_teams.get(team_key, 0) | mask
+        return conflicts
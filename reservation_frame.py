@@ -0,0 +1,86 @@
+from datetime import date, time
+
+import numpy as np
+import pandas as pd
+
+from config import ALL_ROOMS, ALL_TEAMS, RESERVATION_SHEET_HEADERS, RESERVATION_TYPES
+from occupancy import MINUTES_PER_DAY
+
+# --- 컬럼형 예약 모델 ---
+# 로컬 저장소/시트에서 읽은 행(문자열 또는 시트 일련번호)을 명시적 형식으로 한 번에 파싱해 작은 정수·범주형 컬럼으로 보관한다.
+#   날짜: int32 (date.toordinal()), 시간_시작/시간_종료: int16 (자정부터의 분, 23:59 는 1439 그대로),
+#   조/방/예약유형: category (ALL_TEAMS / ALL_ROOMS / RESERVATION_TYPES 순서의 코드, 목록에 없는 값은 뒤에 덧붙임), 예약ID: 문자열
+# 필터와 겹침 검사는 이 정수 컬럼끼리 비교하고, 화면·시트에 내보낼 때만 문자열로 바꾼다.
+
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SHEETS_EPOCH_ORDINAL = date(1899, 12, 30).toordinal()  # 스프레드시트 날짜 일련번호 0 의 날짜
+
+_MINUTE_TEXT = [f"{m // 60:02d}:{m % 60:02d}" for m in range(MINUTES_PER_DAY + 1)]
+
+
+def minutes_to_time(minutes):
+    minutes = int(minutes)
+    return time(minutes // 60, minutes % 60)
+
+
+def format_minutes(minutes):
+    return _MINUTE_TEXT[int(minutes)]
+
+
+def ordinal_to_date(ordinal):
+    return date.fromordinal(int(ordinal))
+
+
+def _serial_or_text(col, fmt):
+    # 시트를 UNFORMATTED_VALUE 로 읽으면 날짜/시간 셀은 일련번호(숫자)로, 텍스트 셀은 문자열로 온다.
+    # 형식 파싱을 먼저 하고, 실패한 칸만 숫자로 해석 (SQLite 의 텍스트 행은 숫자 변환을 거치지 않음)
+    text = pd.to_datetime(col, format=fmt, errors="coerce")
+    rest = text.isna()
+    numeric = pd.to_numeric(col[rest], errors="coerce") if rest.any() else pd.Series(dtype=float)
+    return numeric.reindex(col.index), text
+
+
+def _parse_days(col):
+    numeric, text = _serial_or_text(col, "%Y-%m-%d")
+    days = (text - pd.Timestamp(1970, 1, 1)).dt.days + UNIX_EPOCH_ORDINAL
+    return days.fillna(np.floor(numeric) + SHEETS_EPOCH_ORDINAL)
+
+
+def _parse_minutes(col):
+    numeric, text = _serial_or_text(col, "%H:%M")
+    minutes = text.dt.hour * 60 + text.dt.minute
+    return minutes.fillna(((numeric % 1) * MINUTES_PER_DAY).round())
+
+
+def _categorical(col, known):
+    values = col.astype(str)
+    extra = sorted(set(values.unique()) - set(known))
+    return pd.Categorical(values, categories=list(known) + extra)
+
+
+def frame_from_rows(rows, headers=RESERVATION_SHEET_HEADERS):
+    """헤더 순서의 행 목록 → 컬럼형 예약 DataFrame. 날짜/시간을 해석할 수 없는 행은 버린다."""
+    raw = pd.DataFrame(list(rows), columns=headers, dtype=object)
+    days = _parse_days(raw["날짜"])
+    starts = _parse_minutes(raw["시간_시작"])
+    ends = _parse_minutes(raw["시간_종료"])
+    valid = (days.notna() & starts.notna() & ends.notna()).to_numpy()
+    raw = raw[valid]
+    columns = {
+        "날짜": days[valid].to_numpy(np.int32), "시간_시작": starts[valid].to_numpy(np.int16), "시간_종료": ends[valid].to_numpy(np.int16),
+        "조": _categorical(raw["조"], ALL_TEAMS), "방": _categorical(raw["방"], ALL_ROOMS), "예약유형": _categorical(raw["예약유형"], RESERVATION_TYPES),
+        "예약ID": raw["예약ID"].astype(str).to_numpy(object),
+    }
+    return pd.DataFrame({h: columns[h] for h in headers})
+
+
+def frame_values(df, headers=RESERVATION_SHEET_HEADERS):
+    """컬럼형 예약 DataFrame → 시트/SQLite 에 쓰는 문자열 행 목록 (날짜 'YYYY-MM-DD', 시간 'HH:MM')."""
+    if df.empty: return []
+    columns = {
+        "날짜": pd.to_datetime(df["날짜"].to_numpy(np.int64) - UNIX_EPOCH_ORDINAL, unit="D").strftime("%Y-%m-%d"),
+        "시간_시작": [_MINUTE_TEXT[m] for m in df["시간_시작"].tolist()],
+        "시간_종료": [_MINUTE_TEXT[m] for m in df["시간_종료"].tolist()],
+        "조": df["조"].astype(str), "방": df["방"].astype(str), "예약유형": df["예약유형"].astype(str), "예약ID": df["예약ID"],
+    }
+    return [list(row) for row in zip(*(list(columns[h]) for h in headers))]
@@ -0,0 +1,246 @@
+import re
+import uuid
+from bisect import bisect_left
+from datetime import date, time
+
+from reservation_frame import frame_from_rows
+
+# --- reservations 워크시트 행 단위 증분 쓰기 ---
+# 전체 시트를 clear() 후 다시 올리는 대신, 새 예약은 끝에 추가하고 취소는 해당 행만 삭제한다.
+# 예약ID → 시트 행 번호(1행은 헤더) 위치는 메모리에 유지하며, 삭제 직전에 해당 셀만 읽어 검증한다.
+# 읽기는 get_values/batch_get 을 UNFORMATTED_VALUE 로 호출해 행 목록을 받고, 시트 로캘의 표시 형식과 무관하게
+# reservation_frame 이 날짜·시간 일련번호(또는 'YYYY-MM-DD' / 'HH:MM' 텍스트)를 컬럼형 DataFrame 으로 파싱한다.
+
+_UPDATED_RANGE_START_ROW = re.compile(r"![A-Z]+(\d+)")
+UNFORMATTED = "UNFORMATTED_VALUE"
+
+
+def serialize_cell(value):
+    if isinstance(value, time): return value.strftime('%H:%M')
+    if isinstance(value, date): return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _column_letter(col_number):
+    letters = ""
+    while col_number > 0:
+        col_number, remainder = divmod(col_number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class ReservationSheet:
+    """reservations 워크시트에 대한 추가/삭제 전용 쓰기 경로.
+
+    위치 정보는 같은 프로세스의 쓰기로만 갱신되므로, 시트를 직접 편집한 경우를 대비해
+    삭제 전에 대상 행의 예약ID를 한 번의 batch_get으로 확인하고 어긋나면 다시 색인한다.
+    """
+
+    def __init__(self, ws, headers, id_header="예약ID"):
+        self.ws = ws
+        self.headers = list(headers)
+        self.id_col = self.headers.index(id_header) + 1
+        self._id_col_letter = _column_letter(self.id_col)
+        self._row_by_id = None
+        self._last_row = None
+
+    def reset_positions(self, reservation_ids):
+        """2행부터 시트 순서 그대로의 예약ID 목록으로 위치를 재구성 (i번째 → i+2행)."""
+        self._row_by_id = {}
+        for i, res_id in enumerate(reservation_ids):
+            if res_id != "": self._row_by_id[str(res_id)] = i + 2
+        self._last_row = len(reservation_ids) + 1
+
+    def _reindex(self):
+        id_values = self.ws.col_values(self.id_col)
+        if not id_values:
+            self._row_by_id, self._last_row = {}, 0
+            return
+        self.reset_positions(id_values[1:])
+
+    def _positions(self):
+        if self._row_by_id is None: self._reindex()
+        return self._row_by_id
+
+    def row_of(self, res_id):
+        return self._positions().get(str(res_id))
+
+    def append(self, rows):
+        """rows(dict 목록)를 시트 끝에 한 번의 append 호출로 추가. 이미 시트에 있는 예약ID는 건너뜀 (저널 재실행 대비)."""
+        positions = self._positions()
+        rows = [row for row in rows if serialize_cell(row.get(self.headers[self.id_col - 1], "")) not in positions]
+        if not rows: return
+        values = [[serialize_cell(row.get(h, "")) for h in self.headers] for row in rows]
+        if self._last_row == 0: values = [self.headers] + values
+        try: response = self.ws.append_rows(values, value_input_option='USER_ENTERED', table_range="A1")
+        except Exception:
+            # 서버에는 반영됐는데 응답만 실패했을 수 있으므로, 재시도 전에 시트를 다시 색인해 중복 추가를 막음
+            self._row_by_id = None
+            raise
+        first_row = self._first_appended_row(response)
+        if first_row is None:
+            # 응답에서 위치를 알 수 없으면 다음 사용 시 다시 색인
+            self._row_by_id = None
+            return
+        if self._last_row == 0: values, first_row = values[1:], first_row + 1
+        id_idx = self.id_col - 1
+        for offset, row_values in enumerate(values):
+            self._row_by_id[row_values[id_idx]] = first_row + offset
+        self._last_row = first_row + len(values) - 1
+
+    @staticmethod
+    def _first_appended_row(response):
+        try: updated_range = response["updates"]["updatedRange"]
+        except (KeyError, TypeError): return None
+        match = _UPDATED_RANGE_START_ROW.search(updated_range)
+        return int(match.group(1)) if match else None
+
+    def delete(self, reservation_ids, extra_requests=()):
+        """예약ID에 해당하는 행만 삭제. 연속 구간을 묶어 한 번의 batch_update로 처리하고 삭제한 행 수를 반환.
+
+        extra_requests 는 같은 batch_update 에 함께 실어 보낼 요청 (예: rotation_state 셀 갱신).
+        """
+        wanted = {str(res_id) for res_id in reservation_ids}
+        rows = self._verified_rows(wanted) if wanted else []
+        requests = [{"deleteDimension": {"range": {
+            "sheetId": self.ws.id, "dimension": "ROWS",
+            "startIndex": start - 1, "endIndex": end}}}
+            for start, end in self._contiguous_ranges(rows)] + list(extra_requests)
+        if not requests: return 0
+        self.ws.spreadsheet.batch_update({"requests": requests})
+        if rows: self._shift_after_delete(rows)
+        return len(rows)
+
+    def _verified_rows(self, wanted):
+        positions = self._positions()
+        rows = sorted(positions[res_id] for res_id in wanted if res_id in positions)
+        if not rows: return []
+        cells = self.ws.batch_get([f"{self._id_col_letter}{row}" for row in rows])
+        actual = [str(cell[0][0]) if cell and cell[0] else "" for cell in cells]
+        if all(value in wanted for value in actual): return rows
+        self._reindex()
+        positions = self._row_by_id
+        return sorted(positions[res_id] for res_id in wanted if res_id in positions)
+
+    @staticmethod
+    def _contiguous_ranges(rows):
+        # 뒤쪽 구간부터 지워야 앞쪽 구간의 행 번호가 유지됨
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1: ranges[-1][1] = row
+            else: ranges.append([row, row])
+        return list(reversed(ranges))
+
+    def _shift_after_delete(self, deleted_rows):
+        deleted = sorted(deleted_rows)
+        deleted_set = set(deleted)
+        self._row_by_id = {res_id: row - bisect_left(deleted, row)
+                           for res_id, row in self._row_by_id.items() if row not in deleted_set}
+        self._last_row -= len(deleted)
+
+
+def _fit_row(row, width):
+    row = list(row[:width])
+    return row + [""] * (width - len(row))
+
+
+class SheetsMirror:
+    """로컬 저장소의 변경을 reservations / rotation_state 워크시트에 반영하는 미러.
+
+    반영할 때마다 rotation_state!B2 에 새 데이터 버전 토큰을 기록한다. 다른 인스턴스(또는 다음 폴링)는
+    이 셀 하나만 읽어 원격 변경 여부를 판단하고, 바뀐 경우에만 예약ID 열과 새 행 범위를 읽는다.
+    """
+
+    VERSION_HEADER = "data_version"
+    ARCHIVE_TITLE = "reservations_archive"
+
+    def __init__(self, reservations_ws, rotation_ws, headers, rotation_header):
+        self.reservations_ws = reservations_ws
+        self.rotation_ws = rotation_ws
+        self.headers = list(headers)
+        self.rotation_header = list(rotation_header)
+        self.sheet = ReservationSheet(reservations_ws, headers)
+        self._archive_sheet = None
+
+    def _archive(self, create=False):
+        """보관 워크시트(reservations_archive). 없으면 create=True 일 때만 만든다."""
+        if self._archive_sheet is None:
+            from gspread.exceptions import WorksheetNotFound
+            spreadsheet = self.reservations_ws.spreadsheet
+            try: archive_ws = spreadsheet.worksheet(self.ARCHIVE_TITLE)
+            except WorksheetNotFound:
+                if not create: return None
+                archive_ws = spreadsheet.add_worksheet(title=self.ARCHIVE_TITLE, rows=1000, cols=len(self.headers))
+            self._archive_sheet = ReservationSheet(archive_ws, self.headers)
+        return self._archive_sheet
+
+    def _rotation_request(self, next_team_index):
+        return {"updateCells": {
+            "range": {"sheetId": self.rotation_ws.id, "startRowIndex": 0, "endRowIndex": 2, "startColumnIndex": 0, "endColumnIndex": 1},
+            "rows": [{"values": [{"userEnteredValue": {"stringValue": self.rotation_header[0]}}]},
+                     {"values": [{"userEnteredValue": {"numberValue": int(next_team_index)}}]}],
+            "fields": "userEnteredValue"}}
+
+    def _version_request(self, token):
+        return {"updateCells": {
+            "range": {"sheetId": self.rotation_ws.id, "startRowIndex": 0, "endRowIndex": 2, "startColumnIndex": 1, "endColumnIndex": 2},
+            "rows": [{"values": [{"userEnteredValue": {"stringValue": self.VERSION_HEADER}}]},
+                     {"values": [{"userEnteredValue": {"stringValue": token}}]}],
+            "fields": "userEnteredValue"}}
+
+    def apply_batch(self, batch):
+        """저널에서 병합된 변경(write_behind.MirrorBatch)을 반영하고 새로 기록한 데이터 버전 토큰을 반환.
+
+        추가는 한 번의 append, 삭제·로테이션·버전 토큰 갱신은 한 번의 batch_update 로 처리한다.
+        토큰은 마지막에 바뀌므로 토큰 변화를 본 쪽은 항상 완료된 변경을 읽게 된다.
+        보관된 예약은 라이브 시트에서 지우기 전에 보관 시트에 먼저 추가한다.
+        """
+        token = uuid.uuid4().hex
+        if batch.archived: self._archive(create=True).append(batch.archived)
+        extra = [self._rotation_request(batch.rotation_index)] if batch.rotation_index is not None else []
+        extra.append(self._version_request(token))
+        self.sheet.append(batch.adds)
+        self.sheet.delete(batch.deletes, extra_requests=extra)
+        return token
+
+    def fetch_remote_state(self):
+        """rotation_state 2행(A2:B2)을 한 번에 읽어 (데이터 버전 토큰, 로테이션 인덱스) 반환."""
+        values = self.rotation_ws.get("A2:B2")
+        row = list(values[0]) if values and values[0] else []
+        row += [""] * (2 - len(row))
+        try: next_team_index = int(row[0])
+        except (ValueError, TypeError): next_team_index = None
+        return str(row[1]), next_team_index
+
+    def fetch_delta(self, known_ids):
+        """예약ID 열 하나를 읽어 known_ids 에 없는 행만 범위 단위로 가져옴. (시트의 전체 예약ID 목록, 새 행 DataFrame) 반환."""
+        id_values = self.reservations_ws.col_values(self.sheet.id_col)
+        sheet_ids = [str(v) for v in id_values[1:]]
+        self.sheet.reset_positions(sheet_ids)
+        new_rows = [i + 2 for i, res_id in enumerate(sheet_ids) if res_id != "" and res_id not in known_ids]
+        if not new_rows: return sheet_ids, frame_from_rows([], self.headers)
+        last_col = _column_letter(len(self.headers))
+        ranges = [f"A{start}:{last_col}{end}" for start, end in reversed(ReservationSheet._contiguous_ranges(new_rows))]
+        width = len(self.headers)
+        rows = [_fit_row(row, width) for value_range in self.reservations_ws.batch_get(ranges, value_render_option=UNFORMATTED) for row in value_range]
+        return sheet_ids, frame_from_rows(rows, self.headers)
+
+    def _fetch_sheet(self, sheet):
+        """워크시트 전체를 한 번 읽어 위치 정보를 다시 만들고 컬럼형 DataFrame 으로 반환 (1행은 헤더)."""
+        width = len(self.headers)
+        rows = [_fit_row(row, width) for row in sheet.ws.get_values(value_render_option=UNFORMATTED)[1:]]
+        sheet.reset_positions([str(row[sheet.id_col - 1]) for row in rows])
+        return frame_from_rows(rows, self.headers)
+
+    def fetch_reservations(self):
+        return self._fetch_sheet(self.sheet)
+
+    def fetch_archive(self):
+        archive = self._archive()
+        if archive is None: return frame_from_rows([], self.headers)
+        return self._fetch_sheet(archive)
+
+    def fetch_rotation_index(self):
+        records = self.rotation_ws.get_all_records()
+        try: return int(records[0][self.rotation_header[0]]) if records else 0
+        except (KeyError, ValueError, TypeError): return 0
@@ -0,0 +1,377 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, time
+
+import pandas as pd
+
+from analytics import AGG_COLUMNS, aggregate_rows, aggregate_values, week_of
+from config import KST, RESERVATION_SHEET_HEADERS
+from occupancy import OccupancyIndex
+from reservation_frame import frame_from_rows, frame_values
+from reservation_sheet import serialize_cell
+
+# --- 예약 저장소 ---
+# 모든 변경은 로컬 SQLite 에 커밋되며, 같은 트랜잭션 안에서 outbox 저널에도 기록된다.
+# 미러(Google Sheets 등) 반영은 write_behind.MirrorSyncWorker 가 저널을 읽어 나중에 일괄 처리하므로
+# 시트가 느리거나 장애 중이어도 예약은 즉시 확정되고, 재시작 후에도 남은 저널이 다시 반영된다.
+# 지난 날짜의 예약은 archive_before() 로 reservations_archive 테이블(시트에서는 reservations_archive 워크시트)로
+# 옮겨, 평소 조회·동기화 경로는 오늘 이후의 라이브 파티션만 다룬다.
+# 조회 결과와 DataFrame 인자는 모두 reservation_frame 의 컬럼형 예약 DataFrame 이다.
+# 이용 통계(analytics)용 주간 집계 usage_weekly 는 추가/취소/병합과 같은 트랜잭션에서 바뀐 예약분만 더하고 빼며,
+# 전체 교체처럼 한꺼번에 바뀌는 경우에는 비워 두었다가 다음 조회 때 라이브+보관 파티션 전체로 한 번에 다시 채운다.
+
+
+class ReservationConflict(ValueError):
+    """추가하려는 예약이 기존 예약(또는 같은 배치의 앞선 예약)과 방/조 시간이 겹침. conflicts 는 (행 dict, "room"|"team") 목록."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__(", ".join(
+            f"{serialize_cell(row['날짜'])} {serialize_cell(row['시간_시작'])}-{serialize_cell(row['시간_종료'])} {row['조']} → {row['방']} "
+            f"({'방 사용 중' if kind == 'room' else '조가 이미 다른 방 예약'})" for row, kind in conflicts))
+
+
+def _journal_row(values, headers):
+    return dict(zip(headers, values))
+
+
+def _with_id(values, id_idx):
+    if values[id_idx] in ("", "nan", "None"): values[id_idx] = str(uuid.uuid4())
+    return values
+
+
+def _row_values(row, headers):
+    return _with_id([serialize_cell(row.get(h, "")) for h in headers], headers.index("예약ID"))
+
+
+def _frame_values(df, headers):
+    id_idx = headers.index("예약ID")
+    return [_with_id(values, id_idx) for values in frame_values(df, headers)]
+
+
+class ReservationStore:
+    """예약 저장소 인터페이스. 하위 클래스는 _add/_delete/_replace_all/_set_rotation_index/_mark_reconciled, 저널 메서드와 조회 메서드를 구현한다.
+
+    journal=True 인 변경은 미러에 반영할 작업으로 outbox 에 함께 기록된다.
+    version 은 예약 데이터가 바뀔 때마다 1씩 증가하며, 파생 색인/캐시의 무효화 기준으로 쓴다.
+    """
+
+    def __init__(self):
+        self.version = 0
+
+    def add(self, rows, next_team_index=None):
+        """예약 추가. next_team_index 를 주면 로테이션 인덱스도 같은 트랜잭션에서 기록 (자동 배정용).
+
+        같은 트랜잭션 안에서 기존 예약 및 배치 내부 예약과 방/조 겹침을 확인하며, 하나라도 겹치면 아무것도 쓰지 않고 ReservationConflict 를 던진다.
+        """
+        if not rows:
+            if next_team_index is not None: self.set_rotation_index(next_team_index)
+            return
+        self._add(rows, journal=True, next_team_index=next_team_index)
+        self.version += 1
+
+    def delete(self, reservation_ids):
+        reservation_ids = [str(res_id) for res_id in reservation_ids]
+        if not reservation_ids: return 0
+        deleted = self._delete(reservation_ids, journal=True)
+        if deleted: self.version += 1
+        return deleted
+
+    def set_rotation_index(self, next_team_index):
+        self._set_rotation_index(next_team_index, journal=True)
+
+    def archive_before(self, cutoff_day):
+        """cutoff_day 이전 날짜의 예약을 라이브 파티션에서 보관 파티션으로 옮기고 옮긴 건수를 반환."""
+        moved = self._archive_before(cutoff_day)
+        if moved: self.version += 1
+        return moved
+
+    def import_archive(self, df):
+        """미러의 보관 데이터를 로컬 보관 파티션에 합침 (이미 있는 예약ID는 유지, 저널에 남기지 않음)."""
+        self._import_archive(df)
+        self.version += 1
+
+    def merge_remote(self, remote_ids, remote_rows, next_team_index=None, today=None):
+        """미러에서 읽은 전체 예약ID 목록과 새 행(및 로테이션 인덱스)으로 로컬을 맞춤 (저널에 남기지 않음). 바뀐 행 수를 반환.
+
+        아직 미러에 반영되지 않은 로컬 변경은 보존한다.
+        라이브 시트에서 사라진 행 중 today(기본: 오늘 KST) 이전 날짜는 다른 인스턴스가 보관한 것이므로 로컬 보관 파티션으로 옮긴다.
+        한 번 대조가 끝나면(import_from 포함) reconciled() 가 True 가 되며 저장소를 다시 열어도 유지된다.
+        """
+        changed = self._merge_remote(set(remote_ids), remote_rows, next_team_index, today or datetime.now(KST).date())
+        if changed: self.version += 1
+        self._mark_reconciled()
+        return changed
+
+    def import_from(self, mirror):
+        """미러의 현재 내용으로 로컬 저장소를 덮어씀 (미러에는 다시 쓰지 않음). 반영 대기 중인 저널이 있으면 거부."""
+        if self.pending_count(): raise RuntimeError(f"시트에 아직 반영되지 않은 변경 {self.pending_count()}건이 있어 덮어쓸 수 없습니다.")
+        self._replace_all(mirror.fetch_reservations())
+        self.version += 1
+        self._set_rotation_index(mirror.fetch_rotation_index(), journal=False)
+        self._mark_reconciled()
+
+
+class SQLiteReservationStore(ReservationStore):
+    """(날짜, 방)/(날짜, 조) 인덱스를 가진 SQLite 저장소. 모든 세션이 하나의 연결을 잠금과 함께 공유한다."""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reservations (
+        "예약ID" TEXT PRIMARY KEY,
+        "날짜" TEXT NOT NULL,
+        "시간_시작" TEXT NOT NULL,
+        "시간_종료" TEXT NOT NULL,
+        "조" TEXT NOT NULL,
+        "방" TEXT NOT NULL,
+        "예약유형" TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reservations_date_room ON reservations ("날짜", "방");
+    CREATE INDEX IF NOT EXISTS idx_reservations_date_team ON reservations ("날짜", "조");
+    CREATE TABLE IF NOT EXISTS reservations_archive (
+        "예약ID" TEXT PRIMARY KEY,
+        "날짜" TEXT NOT NULL,
+        "시간_시작" TEXT NOT NULL,
+        "시간_종료" TEXT NOT NULL,
+        "조" TEXT NOT NULL,
+        "방" TEXT NOT NULL,
+        "예약유형" TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reservations_archive_date ON reservations_archive ("날짜");
+    CREATE TABLE IF NOT EXISTS app_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, payload TEXT);
+    CREATE TABLE IF NOT EXISTS usage_weekly (
+        dim TEXT NOT NULL,
+        week INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        minutes INTEGER NOT NULL,
+        bookings INTEGER NOT NULL,
+        auto_window_bookings INTEGER NOT NULL,
+        PRIMARY KEY (dim, week, key)
+    );
+    """
+
+    def __init__(self, path, headers=RESERVATION_SHEET_HEADERS):
+        super().__init__()
+        self.headers = list(headers)
+        self._columns = ", ".join(f'"{h}"' for h in self.headers)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:": self._conn.execute("PRAGMA journal_mode=WAL")
+        # 커밋마다 fsync 하여 확정 응답 후 프로세스가 죽어도 저널이 남도록 함
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(self._SCHEMA)
+        # usage_weekly 가 채워져 있는지. 이 저장소만 집계를 바꾸므로 열 때 한 번 읽고 메모리에서 유지
+        self._usage_ready = bool(self._conn.execute("SELECT 1 FROM app_state WHERE key = 'usage_ready'").fetchall())
+        # 미러 내용과 한 번이라도 대조(merge_remote/import_from)했는지. 대조 전의 로컬 데이터는 비었거나 낡았을 수 있음
+        self._reconciled = bool(self._conn.execute("SELECT 1 FROM app_state WHERE key = 'remote_reconciled'").fetchall())
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def load_all(self):
+        return frame_from_rows(self._query(f"SELECT {self._columns} FROM reservations"), self.headers)
+
+    def load_date(self, day, include_archive=False):
+        """해당 날짜 예약. include_archive=True 이면 보관 파티션도 함께 조회 (지난 날짜 화면 전용)."""
+        sql = f'SELECT {self._columns} FROM reservations WHERE "날짜" = ?'
+        params = (serialize_cell(day),)
+        if include_archive:
+            sql += f' UNION ALL SELECT {self._columns} FROM reservations_archive WHERE "날짜" = ?'
+            params += params
+        return frame_from_rows(self._query(sql, params), self.headers)
+
+    def load_range(self, start_day, end_day, include_archive=False):
+        """start_day~end_day(포함) 예약. 날짜 인덱스의 범위 조회 한 번 (include_archive=True 이면 보관 파티션 포함)."""
+        sql = f'SELECT {self._columns} FROM reservations WHERE "날짜" BETWEEN ? AND ?'
+        params = (serialize_cell(start_day), serialize_cell(end_day))
+        if include_archive:
+            sql += f' UNION ALL SELECT {self._columns} FROM reservations_archive WHERE "날짜" BETWEEN ? AND ?'
+            params += params
+        return frame_from_rows(self._query(sql, params), self.headers)
+
+    def data_version(self):
+        """다른 연결(다른 프로세스)의 커밋까지 반영하는 데이터 버전 문자열. 읽기 전용 프로세스에서도 변경을 감지할 수 있다."""
+        return f"{self.version}.{self._query('PRAGMA data_version')[0][0]}"
+
+    # --- 이용 통계 집계 ---
+    def usage_aggregates(self, start_day=None, end_day=None):
+        """start_day~end_day 가 속한 주들의 집계 행 (AGG_COLUMNS DataFrame). 집계가 비어 있으면 먼저 전체 기록으로 채운다."""
+        if not self._usage_ready: self.backfill_usage()
+        sql, params = f"SELECT {', '.join(AGG_COLUMNS)} FROM usage_weekly WHERE 1 = 1", ()
+        if start_day is not None: sql += " AND week >= ?"; params += (week_of(start_day.toordinal()),)
+        if end_day is not None: sql += " AND week <= ?"; params += (end_day.toordinal(),)
+        return pd.DataFrame(self._query(sql, params), columns=AGG_COLUMNS)
+
+    def backfill_usage(self):
+        """라이브+보관 파티션 전체를 한 번 읽어 usage_weekly 를 다시 만듦 (집계는 DataFrame 연산 한 번)."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(f"SELECT {self._columns} FROM reservations UNION ALL SELECT {self._columns} FROM reservations_archive").fetchall()
+            self._conn.execute("DELETE FROM usage_weekly")
+            self._conn.executemany(f"INSERT INTO usage_weekly ({', '.join(AGG_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", aggregate_values(frame_from_rows(rows, self.headers)))
+            self._conn.execute("INSERT OR REPLACE INTO app_state (key, value) VALUES ('usage_ready', '1')")
+        self._usage_ready = True
+
+    def _usage_apply(self, values, sign):
+        # 호출 측 트랜잭션 안에서 실행됨. values 는 헤더 순서의 저장 행
+        if not values or not self._usage_ready: return
+        self._conn.executemany(f"""INSERT INTO usage_weekly ({', '.join(AGG_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (dim, week, key) DO UPDATE SET minutes = minutes + excluded.minutes, bookings = bookings + excluded.bookings,
+            auto_window_bookings = auto_window_bookings + excluded.auto_window_bookings""", aggregate_rows(values, self.headers, sign))
+        if sign < 0: self._conn.execute("DELETE FROM usage_weekly WHERE bookings <= 0")
+
+    def _usage_invalidate(self):
+        # 호출 측 트랜잭션 안에서 실행됨. 다음 usage_aggregates() 가 전체를 다시 채움
+        self._conn.execute("DELETE FROM usage_weekly")
+        self._conn.execute("DELETE FROM app_state WHERE key = 'usage_ready'")
+        self._usage_ready = False
+
+    def _rows_by_ids(self, reservation_ids, chunk=500):
+        # 호출 측 트랜잭션 안에서 실행됨
+        rows = []
+        for i in range(0, len(reservation_ids), chunk):
+            part = reservation_ids[i:i + chunk]
+            rows += self._conn.execute(f'SELECT {self._columns} FROM reservations WHERE "예약ID" IN ({", ".join("?" for _ in part)})', part).fetchall()
+        return rows
+
+    def _conflicts(self, values):
+        # 호출 측 트랜잭션 안에서 실행됨. 검사와 추가가 같은 잠금 안이므로 다른 세션의 예약이 그 사이에 끼어들 수 없음
+        id_idx = self.headers.index("예약ID")
+        ids = {v[id_idx] for v in values}  # 같은 예약ID 를 다시 쓰는 경우 자기 자신과는 비교하지 않음
+        sql = f'SELECT {self._columns} FROM reservations WHERE "날짜" = ? UNION ALL SELECT {self._columns} FROM reservations_archive WHERE "날짜" = ?'
+        def load_date(day):
+            key = serialize_cell(day)
+            return frame_from_rows([row for row in self._conn.execute(sql, (key, key)) if row[id_idx] not in ids], self.headers)
+        rows = []
+        for v in values:
+            row = dict(zip(self.headers, v))
+            try: rows.append({**row, "날짜": date.fromisoformat(row["날짜"]), "시간_시작": time.fromisoformat(row["시간_시작"]), "시간_종료": time.fromisoformat(row["시간_종료"])})
+            except ValueError: continue  # frame_from_rows 와 같이 해석할 수 없는 행은 대조하지 않음
+        return OccupancyIndex(load_date).validate_batch(rows)
+
+    def _insert_many(self, values):
+        placeholders = ", ".join("?" for _ in self.headers)
+        self._conn.executemany(f"INSERT OR REPLACE INTO reservations ({self._columns}) VALUES ({placeholders})", values)
+
+    def _journal(self, op, payload):
+        # 호출 측 트랜잭션 안에서 실행됨
+        self._conn.execute("INSERT INTO outbox (op, payload) VALUES (?, ?)", (op, json.dumps(payload, ensure_ascii=False)))
+
+    def _add(self, rows, journal, next_team_index=None):
+        values = [_row_values(row, self.headers) for row in rows]
+        with self._lock, self._conn:
+            conflicts = self._conflicts(values)
+            if conflicts: raise ReservationConflict(conflicts)
+            # 같은 예약ID 가 이미 있으면 INSERT OR REPLACE 로 바뀌므로 기존 행 몫을 먼저 뺌
+            if self._usage_ready: self._usage_apply(self._rows_by_ids([v[self.headers.index("예약ID")] for v in values]), -1)
+            self._insert_many(values)
+            self._usage_apply(values, 1)
+            if journal: self._journal("add", [_journal_row(v, self.headers) for v in values])
+            if next_team_index is not None: self._write_rotation_index(next_team_index, journal)
+
+    def _delete(self, reservation_ids, journal):
+        with self._lock, self._conn:
+            if self._usage_ready: self._usage_apply(self._rows_by_ids(reservation_ids), -1)
+            cursor = self._conn.executemany('DELETE FROM reservations WHERE "예약ID" = ?', [(res_id,) for res_id in reservation_ids])
+            if journal and cursor.rowcount: self._journal("delete", reservation_ids)
+            return cursor.rowcount
+
+    def _replace_all(self, df):
+        values = _frame_values(df, self.headers)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM reservations")
+            self._insert_many(values)
+            self._usage_invalidate()
+
+    def _archive_before(self, cutoff_day):
+        cutoff = serialize_cell(cutoff_day)
+        with self._lock, self._conn:
+            rows = self._conn.execute(f'SELECT {self._columns} FROM reservations WHERE "날짜" < ?', (cutoff,)).fetchall()
+            if not rows: return 0
+            placeholders = ", ".join("?" for _ in self.headers)
+            self._conn.executemany(f"INSERT OR REPLACE INTO reservations_archive ({self._columns}) VALUES ({placeholders})", rows)
+            self._conn.execute('DELETE FROM reservations WHERE "날짜" < ?', (cutoff,))
+            self._journal("archive", [_journal_row(row, self.headers) for row in rows])
+            return len(rows)
+
+    def _import_archive(self, df):
+        values = _frame_values(df, self.headers)
+        placeholders = ", ".join("?" for _ in self.headers)
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT OR IGNORE INTO reservations_archive ({self._columns}) VALUES ({placeholders})", values)
+            self._usage_invalidate()
+            self._conn.execute("INSERT OR REPLACE INTO app_state (key, value) VALUES ('archive_imported', '1')")
+
+    def archive_imported(self):
+        return bool(self._query("SELECT 1 FROM app_state WHERE key = 'archive_imported'"))
+
+    def reconciled(self):
+        return self._reconciled
+
+    def _mark_reconciled(self):
+        if self._reconciled: return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO app_state (key, value) VALUES ('remote_reconciled', '1')")
+        self._reconciled = True
+
+    def _pending_ids(self):
+        # 호출 측이 잠금을 잡은 상태에서 실행됨
+        pending_adds, pending_deletes, pending_ops = set(), set(), set()
+        for op, payload in self._conn.execute("SELECT op, payload FROM outbox").fetchall():
+            payload = json.loads(payload)
+            pending_ops.add(op)
+            if op == "add": pending_adds.update(row["예약ID"] for row in payload)
+            elif op == "delete": pending_deletes.update(payload)
+            elif op == "archive": pending_deletes.update(row["예약ID"] for row in payload)
+        return pending_adds, pending_deletes, pending_ops
+
+    def _merge_remote(self, remote_ids, remote_rows, next_team_index, today):
+        values = _frame_values(remote_rows, self.headers)
+        id_idx = self.headers.index("예약ID")
+        with self._lock, self._conn:
+            pending_adds, pending_deletes, pending_ops = self._pending_ids()
+            if next_team_index is not None and "set_rotation_index" not in pending_ops:
+                self._conn.execute("INSERT OR REPLACE INTO app_state (key, value) VALUES ('next_team_index', ?)", (str(next_team_index),))
+            local_ids = {row[0] for row in self._conn.execute('SELECT "예약ID" FROM reservations')}
+            removed = self._rows_by_ids(list(local_ids - remote_ids - pending_adds))
+            inserted = [v for v in values if v[id_idx] not in local_ids and v[id_idx] not in pending_deletes]
+            # 지난 날짜 행은 보관된 것이므로 보관 파티션으로 옮기고 집계에 그대로 둠. 나머지는 취소된 것
+            cutoff, date_idx = serialize_cell(today), self.headers.index("날짜")
+            archived = [row for row in removed if row[date_idx] < cutoff]
+            placeholders = ", ".join("?" for _ in self.headers)
+            self._conn.executemany(f"INSERT OR IGNORE INTO reservations_archive ({self._columns}) VALUES ({placeholders})", archived)
+            self._usage_apply([row for row in removed if row[date_idx] >= cutoff], -1)
+            self._conn.executemany('DELETE FROM reservations WHERE "예약ID" = ?', [(row[id_idx],) for row in removed])
+            self._insert_many(inserted)
+            self._usage_apply(inserted, 1)
+            return len(removed) + len(inserted)
+
+    def known_ids(self):
+        return {row[0] for row in self._query('SELECT "예약ID" FROM reservations')}
+
+    def pending_ops(self):
+        """미러에 아직 반영되지 않은 (seq, op, payload) 목록, seq 순."""
+        return [(seq, op, json.loads(payload)) for seq, op, payload in self._query("SELECT seq, op, payload FROM outbox ORDER BY seq")]
+
+    def pending_count(self):
+        return self._query("SELECT COUNT(*) FROM outbox")[0][0]
+
+    def ack(self, max_seq):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE seq <= ?", (max_seq,))
+
+    def get_rotation_index(self):
+        rows = self._query("SELECT value FROM app_state WHERE key = 'next_team_index'")
+        try: return int(rows[0][0]) if rows else 0
+        except (ValueError, TypeError): return 0
+
+    def _set_rotation_index(self, next_team_index, journal):
+        with self._lock, self._conn:
+            self._write_rotation_index(next_team_index, journal)
+
+    def _write_rotation_index(self, next_team_index, journal):
+        # 호출 측 트랜잭션 안에서 실행됨
+        self._conn.execute("INSERT OR REPLACE INTO app_state (key, value) VALUES ('next_team_index', ?)", (str(int(next_team_index)),))
+        if journal: self._journal("set_rotation_index", int(next_team_index))
@@ -0,0 +1,258 @@
+import logging
+import random
+import threading
+import time as time_module
+
+# --- 요청 한도를 지키는 Sheets 클라이언트 ---
+# 모든 세션과 동기화 워커가 하나의 SheetsClient 를 공유한다. 읽기/쓰기 요청은 각각의 토큰 버킷을 거쳐
+# Sheets 분당 한도(사용자당 읽기 60, 쓰기 60) 안에서 나가고, 429·5xx·네트워크 오류는 지터를 섞은 지수 백오프로 다시 시도한다.
+# 짧은 시간(coalesce_window) 안에 같은 워크시트로 들어온 get/batch_get 은 batch_get 한 번으로,
+# 같은 스프레드시트로 들어온 batch_update 는 요청 목록을 이어 붙여 batch_update 한 번으로 보낸다 (행 삽입/삭제가 든 요청은 제외).
+
+logger = logging.getLogger(__name__)
+
+
+def retryable_status(exc):
+    """다시 시도할 만한 오류면 HTTP 상태 코드(네트워크 오류는 0), 아니면 None."""
+    code = getattr(exc, "code", None)
+    if code is None and getattr(exc, "response", None) is not None: code = getattr(exc.response, "status_code", None)
+    if isinstance(code, int) and (code == 429 or code >= 500): return code
+    if code is None and isinstance(exc, OSError): return 0  # requests 의 연결/타임아웃 오류도 OSError
+    return None
+
+
+def _retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try: return float(headers.get("Retry-After"))
+    except (TypeError, ValueError): return None
+
+
+class TokenBucket:
+    """rate_per_minute 속도로 채워지고 최대 burst 개까지 쌓이는 토큰 버킷. 한 분 동안 나가는 요청은 최대 rate_per_minute + burst."""
+
+    def __init__(self, rate_per_minute, burst=5, clock=time_module.monotonic, sleep=time_module.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 기다리고 기다린 시간(초)을 반환."""
+        if self.rate <= 0: return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.waited += waited
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """429 를 받았을 때 남은 토큰을 비워 바로 이어지는 요청을 늦춤."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _Coalescer:
+    """같은 key 로 window 초 안에 들어온 요청을 모아 flush(items) 한 번으로 처리. 첫 요청 스레드가 대표로 보낸다."""
+
+    def __init__(self, window, sleep=time_module.sleep):
+        self.window = window
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.flushes = 0
+        self.merged = 0
+
+    def submit(self, key, item, flush):
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader: batch = self._pending[key] = _Batch()
+            slot = len(batch.items)
+            batch.items.append(item)
+        if leader:
+            if self.window: self._sleep(self.window)
+            with self._lock: del self._pending[key]
+            try: batch.results = flush(batch.items)
+            except Exception as e: batch.error = e
+            self.flushes += 1
+            self.merged += len(batch.items) - 1
+            batch.done.set()
+        else:
+            batch.done.wait()
+        if batch.error is not None: raise batch.error
+        return batch.results[slot]
+
+
+class SheetsClient:
+    """요청 한도·재시도·요청 병합을 담당하는 공유 클라이언트. worksheet(ws) 로 감싼 워크시트를 gspread 워크시트 대신 쓴다.
+
+    기본값은 Sheets 의 사용자당 분당 60회 한도에 맞춰, 한 분 동안 최대 rate + burst = 60 회가 나가도록 잡았다.
+    rate_per_minute=0 이면 속도 제한을 끈다 (가짜 시트로 측정할 때 등).
+    """
+
+    def __init__(self, rate_per_minute=55, burst=5, max_retries=5, retry_base=1.0, max_backoff=32.0, coalesce_window=0.05,
+                 clock=time_module.monotonic, sleep=time_module.sleep):
+        self.buckets = {"read": TokenBucket(rate_per_minute, burst, clock, sleep), "write": TokenBucket(rate_per_minute, burst, clock, sleep)}
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self._coalescer = _Coalescer(coalesce_window, sleep)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def call(self, kind, fn, *args, idempotent=True, **kwargs):
+        """kind("read"|"write") 버킷에서 토큰을 얻어 fn 을 호출. 재시도할 만한 오류는 max_retries 번까지 다시 시도한다.
+
+        idempotent=False 인 요청(행 추가, 행 삭제가 든 batch_update)은 처리 전에 거절된 것이 확실한 429 만 다시 시도한다.
+        5xx·타임아웃은 서버에 이미 반영됐을 수 있어, 한 번 더 보내면 행이 중복되거나 엉뚱한 행이 지워질 수 있기 때문이다.
+        """
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            bucket.acquire()
+            with self._lock: self.requests += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = retryable_status(e)
+                if status is None or attempt >= self.max_retries or (status != 429 and not idempotent): raise
+                attempt += 1
+                delay = min(self.max_backoff, self.retry_base * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+                if status == 429:
+                    bucket.drain()
+                    delay = max(delay, _retry_after(e) or 0.0)
+                with self._lock:
+                    self.retries += 1
+                    self.throttled += status == 429
+                logger.warning("Sheets %s 요청 실패 (HTTP %s, %d번째 재시도, %.1f초 후): %s", kind, status or "-", attempt, delay, e)
+                self._sleep(delay)
+
+    def stats(self):
+        return {"requests": self.requests, "retries": self.retries, "throttled": self.throttled,
+                "limiter_wait_seconds": round(sum(b.waited for b in self.buckets.values()), 3),
+                "coalesced_flushes": self._coalescer.flushes, "coalesced_requests": self._coalescer.merged}
+
+    def worksheet(self, ws):
+        return ws if isinstance(ws, QuotaAwareWorksheet) else QuotaAwareWorksheet(ws, self)
+
+    def spreadsheet(self, spreadsheet):
+        return spreadsheet if isinstance(spreadsheet, QuotaAwareSpreadsheet) else QuotaAwareSpreadsheet(spreadsheet, self)
+
+    # --- 병합 ---
+    def batch_get(self, ws, ranges, **kwargs):
+        """kwargs(value_render_option 등)가 같은 요청끼리만 합친다."""
+        def flush(items):
+            merged = [a1 for item in items for a1 in item]
+            values = self.call("read", ws.batch_get, merged, **kwargs)
+            results, pos = [], 0
+            for item in items:
+                results.append(values[pos:pos + len(item)]); pos += len(item)
+            return results
+        return self._coalescer.submit(("batch_get", ws.spreadsheet.id, ws.id, tuple(sorted(kwargs.items()))), list(ranges), flush)
+
+    def batch_update(self, spreadsheet, body):
+        # 행 삽입/삭제가 든 요청은 다른 요청과 합치면 행 번호가 어긋나므로 따로 보냄
+        if any("deleteDimension" in r or "insertDimension" in r for r in body["requests"]):
+            return self.call("write", spreadsheet.batch_update, body, idempotent=False)
+        def flush(bodies):
+            response = self.call("write", spreadsheet.batch_update, {"requests": [r for b in bodies for r in b["requests"]]}, idempotent=False)
+            replies = (response or {}).get("replies", [])
+            results, pos = [], 0
+            for b in bodies:
+                results.append(dict(response or {}, replies=replies[pos:pos + len(b["requests"])])); pos += len(b["requests"])
+            return results
+        return self._coalescer.submit(("batch_update", spreadsheet.id), body, flush)
+
+
+class QuotaAwareSpreadsheet:
+    def __init__(self, spreadsheet, client):
+        self._spreadsheet = spreadsheet
+        self._client = client
+
+    @property
+    def id(self):
+        return self._spreadsheet.id
+
+    def batch_update(self, body):
+        return self._client.batch_update(self._spreadsheet, body)
+
+    def worksheet(self, title):
+        return self._client.worksheet(self._client.call("read", self._spreadsheet.worksheet, title))
+
+    def worksheets(self):
+        return [self._client.worksheet(ws) for ws in self._client.call("read", self._spreadsheet.worksheets)]
+
+    def add_worksheet(self, title, rows, cols):
+        return self._client.worksheet(self._client.call("write", self._spreadsheet.add_worksheet, title=title, rows=rows, cols=cols, idempotent=False))
+
+
+class QuotaAwareWorksheet:
+    """gspread Worksheet 대신 쓰는 래퍼. SheetsMirror 가 쓰는 메서드만 한도·재시도를 거치며 나머지 속성은 그대로 넘긴다."""
+
+    def __init__(self, ws, client):
+        self._ws = ws
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+    @property
+    def spreadsheet(self):
+        return self._client.spreadsheet(self._ws.spreadsheet)
+
+    # 읽기
+    def get(self, range_name=None, **kwargs):
+        if range_name is None: return self._client.call("read", self._ws.get, range_name, **kwargs)
+        return self._client.batch_get(self._ws, [range_name], **kwargs)[0]
+
+    def batch_get(self, ranges, **kwargs):
+        return self._client.batch_get(self._ws, ranges, **kwargs)
+
+    def get_values(self, range_name=None, **kwargs):
+        return self._client.call("read", self._ws.get_values, range_name, **kwargs)
+
+    def col_values(self, col, **kwargs):
+        return self._client.call("read", self._ws.col_values, col, **kwargs)
+
+    def get_all_values(self, **kwargs):
+        return self._client.call("read", self._ws.get_all_values, **kwargs)
+
+    def get_all_records(self, **kwargs):
+        return self._client.call("read", self._ws.get_all_records, **kwargs)
+
+    # 쓰기
+    def append_rows(self, values, **kwargs):
+        return self._client.call("write", self._ws.append_rows, values, idempotent=False, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._client.call("write", self._ws.update, *args, **kwargs)
+
+    def clear(self):
+        return self._client.call("write", self._ws.clear)
@@ -0,0 +1,127 @@
+import logging
+import random
+import re
+import threading
+import time as time_module
+
+from metrics import METRICS
+
+# --- Google Sheets 연결 ---
+# 자격 증명 파싱, OAuth, 스프레드시트 열기, 워크시트 조회를 백그라운드 스레드에서 처리해 첫 화면이 연결을 기다리지 않게 한다.
+# gspread / google-auth 는 이 스레드 안에서 처음 import 하며, 두 워크시트는 메타데이터 조회 한 번(worksheets())으로 함께 얻는다.
+# 실패하면 지수 백오프(지터 포함)로 다시 시도하고, 그동안 앱은 로컬 저장소만으로 동작한다.
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+_SPREADSHEET_PATH = re.compile(r"/v4/spreadsheets/[^/:?]+(.*)")
+_http_client_class = None
+
+
+def endpoint_kind(method, url):
+    """계측용 엔드포인트 이름. 예: 'spreadsheet:get', 'spreadsheet:batchUpdate', 'values:get', 'values:batchGet', 'values:append', 'drive'.
+
+    gspread 는 범위를 URL 인코딩하므로 경로에 남은 ':' 는 동작 이름 구분자뿐이다.
+    """
+    m = _SPREADSHEET_PATH.search(url.split("?")[0])
+    if m is None: return "drive" if "/drive/" in url else "other"
+    rest = m.group(1)
+    resource = "values" if rest.startswith("/values") else "spreadsheet"
+    action = rest.rsplit(":", 1)[1] if ":" in rest else method.lower()
+    return f"{resource}:{action}"
+
+
+def _metered_http_client():
+    """요청마다 METRICS 에 호출 수·바이트·소요 시간을 기록하는 gspread HTTPClient 하위 클래스 (gspread 를 처음 쓸 때 만든다)."""
+    global _http_client_class
+    if _http_client_class is None:
+        from gspread.exceptions import APIError
+        from gspread.http_client import HTTPClient
+
+        class MeteredHTTPClient(HTTPClient):
+            def request(self, method, endpoint, *args, **kwargs):
+                started = time_module.perf_counter()
+                status, bytes_out, bytes_in, response = 0, 0, 0, None
+                try:
+                    response = super().request(method, endpoint, *args, **kwargs)
+                except APIError as e:
+                    response = e.response
+                    raise
+                finally:
+                    if response is not None:
+                        status = response.status_code
+                        bytes_in = len(response.content or b"")
+                        bytes_out = len(response.request.body or b"") if response.request is not None else 0
+                    METRICS.record_sheets_call(endpoint_kind(method.upper(), endpoint), bytes_out, bytes_in, time_module.perf_counter() - started, status)
+                return response
+
+        _http_client_class = MeteredHTTPClient
+    return _http_client_class
+
+
+def _parse_credentials(creds_json_str):
+    import json
+    creds_dict = json.loads(creds_json_str)
+    if 'private_key' in creds_dict and isinstance(creds_dict.get('private_key'), str):
+        creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
+    return creds_dict
+
+
+class SheetsConnector:
+    """스프레드시트의 워크시트 핸들을 백그라운드에서 얻는 연결기.
+
+    status 는 "connecting"(첫 시도 중), "retrying"(실패 후 대기 중), "ready" 중 하나이며,
+    ready 가 되면 worksheets 에 {제목: 워크시트} 가 채워진다. request_timeout 은 각 HTTP 요청의 제한 시간(초).
+    """
+
+    def __init__(self, creds_json_str, spreadsheet_name, titles, request_timeout=15.0, retry_base=2.0, max_backoff=300.0):
+        self.creds_json_str = creds_json_str
+        self.spreadsheet_name = spreadsheet_name
+        self.titles = list(titles)
+        self.request_timeout = request_timeout
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.status = "connecting"
+        self.worksheets = None
+        self.last_error = None
+        self.failures = 0
+        self.connect_seconds = None
+        self._thread = threading.Thread(target=self._run, name="sheets-connect", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _connect(self):
+        import gspread
+        from google.oauth2.service_account import Credentials
+        creds = Credentials.from_service_account_info(_parse_credentials(self.creds_json_str), scopes=SCOPES)
+        gc = gspread.authorize(creds, http_client=_metered_http_client())
+        gc.set_timeout(self.request_timeout)
+        by_title = {ws.title: ws for ws in gc.open(self.spreadsheet_name).worksheets()}
+        missing = [title for title in self.titles if title not in by_title]
+        if missing: raise gspread.exceptions.WorksheetNotFound(", ".join(missing))
+        return {title: by_title[title] for title in self.titles}
+
+    def _backoff(self):
+        delay = min(self.max_backoff, self.retry_base * (2 ** (self.failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _run(self):
+        started = time_module.perf_counter()
+        while True:
+            try:
+                self.worksheets = self._connect()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+                self.status = "retrying"
+                delay = self._backoff()
+                logger.warning("Google Sheets 연결 실패 (%d회째, %.1f초 후 재시도): %s", self.failures, delay, e)
+                time_module.sleep(delay)
+                continue
+            self.connect_seconds = time_module.perf_counter() - started
+            self.status, self.last_error = "ready", None
+            logger.info("Google Sheets 연결 완료 (%.2f초)", self.connect_seconds)
+            return
@@ -1,161 +1,416 @@
 import streamlit as st # st를 가장 먼저 import
+from streamlit.runtime.scriptrunner import ScriptRunContext, get_script_run_ctx
+import time as time_module
+script_started_at = time_module.perf_counter()
+import logging
 import pandas as pd
-from datetime import datetime, date, time, timedelta, timezone
-import gspread
-from google.oauth2.service_account import Credentials
+from datetime import datetime, time, timedelta
+import os
+import threading
 import uuid
-import json
+import functools
+import dataclasses
+from config import (
+    ALL_TEAMS, ROTATION_TEAMS, ALL_ROOMS,
+    RESERVATION_SHEET_HEADERS, ROTATION_SHEET_HEADER, RESERVATION_TYPES,
+    DEFAULT_AUTO_ASSIGN_START_TIME, DEFAULT_AUTO_ASSIGN_END_TIME,
+    DEFAULT_MANUAL_RESERVATION_START_HOUR, DEFAULT_MANUAL_RESERVATION_END_HOUR,
+    WEDNESDAY_AUTO_ASSIGN_START_TIME, WEDNESDAY_AUTO_ASSIGN_END_TIME,
+    KST, DEFAULT_RESERVATION_DB_PATH,
+)
+from reservation_sheet import SheetsMirror
+from reservation_store import ReservationConflict, SQLiteReservationStore
+from write_behind import MirrorSyncWorker
+from occupancy import OccupancyIndex, time_to_minutes
+from reservation_frame import format_minutes, minutes_to_time
+from analytics import collision_summary, hours_by_week, totals, week_of
+from free_slots import find_free_slots, free_ends, free_rooms, free_starts, manual_hours
+from timetable import build_timetable, display_hours, style_timetable, TimetableHtmlCache
+from auto_assign import assign_day, plan_range
+from sheets_connection import SheetsConnector
+from sheets_client import SheetsClient
+from metrics import METRICS, start_prometheus_exporter
+from timetable_api import start_timetable_api
 
 # set_page_config를 모든 다른 st 명령어보다 먼저 호출
 st.set_page_config(page_title="조모임방 예약/조회", layout="centered", initial_sidebar_state="expanded")
 
-# --- 초기 설정 ---
-AUTO_ASSIGN_EXCLUDE_TEAMS = ["대면A", "대면B", "대면C"]
-SENIOR_TEAM = "시니어조"
-SENIOR_ROOM = "9F-1"
-ALL_TEAMS = [f"{i}조" for i in range(1, 14)] + ["대면A", "대면B", "대면C","대면D", "청년", "중고등", SENIOR_TEAM]
-ROTATION_TEAMS = [team for team in ALL_TEAMS if team not in AUTO_ASSIGN_EXCLUDE_TEAMS and team != SENIOR_TEAM]
-ALL_ROOMS = [f"9F-{i}" for i in range(1, 7)] + ["B5-A", "B5-B", "B5-C"]
-ROTATION_ROOMS = [room for room in ALL_ROOMS if room != SENIOR_ROOM]
-
-RESERVATION_SHEET_HEADERS = ["날짜", "시간_시작", "시간_종료", "조", "방", "예약유형", "예약ID"]
-ROTATION_SHEET_HEADER = ["next_team_index"]
-TIME_STEP_MINUTES = 60
-
-DEFAULT_AUTO_ASSIGN_START_TIME = time(11, 0)
-DEFAULT_AUTO_ASSIGN_END_TIME = time(13, 0)
-
-DEFAULT_MANUAL_RESERVATION_START_HOUR = 13
-DEFAULT_MANUAL_RESERVATION_END_HOUR = 17
-
-WEDNESDAY_AUTO_ASSIGN_START_TIME = time(21, 0)
-WEDNESDAY_AUTO_ASSIGN_END_TIME = time(23, 59)
-
-WEDNESDAY_MANUAL_RESERVATION_START_HOUR = 16
-WEDNESDAY_MANUAL_RESERVATION_END_HOUR = 19
-
-KST = timezone(timedelta(hours=9))
-
 def get_today_kst():
     return datetime.now(KST).date()
 
-# --- Google Sheets 클라이언트 및 워크시트 초기화 ---
-# @st.cache_resource 데코레이터는 함수 정의이므로 set_page_config 이후에 와도 괜찮음
+# --- Google Sheets 연결 (백그라운드) ---
+# 인증과 워크시트 조회는 SheetsConnector 스레드가 처리하므로 첫 화면은 연결을 기다리지 않고 바로 그려진다.
+# 연결 전이나 연결 실패 중에는 로컬 저장소만으로 동작하고, 연결되면 미러와 동기화 워커가 붙는다.
 @st.cache_resource
-def init_gspread_client():
+def _sheets_connector_state():
+    # (연결기, 설정 오류 메시지). 캐시 함수 안의 st.error 는 실행마다 다시 그려지므로 오류는 돌려주고 메인 화면에서 한 번만 표시
     try:
         creds_json_str = st.secrets["GOOGLE_SHEETS_CREDENTIALS"]
-        creds_dict = json.loads(creds_json_str)
-        if 'private_key' in creds_dict and isinstance(creds_dict.get('private_key'), str):
-            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
-        scopes = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        gc = gspread.authorize(creds)
-        return gc
+        spreadsheet_name = st.secrets["GOOGLE_SHEET_NAME"]
     except Exception as e:
-        # 이 st.error 호출이 set_page_config 전에 실행되면 안됨.
-        # 하지만 init_gspread_client가 호출되는 시점은 set_page_config 이후이므로 안전.
-        st.error(f"Google Sheets 클라이언트 초기화 실패: {e}")
-        return None
+        return None, f"Google Sheets 클라이언트 초기화 실패: {e}"
+    return SheetsConnector(creds_json_str, spreadsheet_name, ("reservations", "rotation_state")).start(), None
+
+def get_sheets_connector():
+    return _sheets_connector_state()[0]
 
 @st.cache_resource
-def get_worksheets(_gc_client):
-    if _gc_client is None: return None, None, False
-    try:
-        SPREADSHEET_NAME = st.secrets["GOOGLE_SHEET_NAME"]
-        spreadsheet = _gc_client.open(SPREADSHEET_NAME)
-        reservations_ws = spreadsheet.worksheet("reservations")
-        rotation_ws = spreadsheet.worksheet("rotation_state")
-        return reservations_ws, rotation_ws, True
-    except Exception as e:
-        st.error(f"Google Sheets 워크시트 가져오기 실패: {e}")
-        return None, None, False
+def get_sheets_client():
+    # 모든 세션과 동기화 워커가 공유하는 요청 한도/재시도 계층 (SHEETS_REQUESTS_PER_MINUTE=0 이면 속도 제한 없음)
+    return SheetsClient(rate_per_minute=float(os.environ.get("SHEETS_REQUESTS_PER_MINUTE", 55)))
 
-# gc_client 와 GSHEET_AVAILABLE는 함수 호출 결과이므로,
-# 해당 함수들이 set_page_config 이후에 호출되도록 배치
-# 이 변수들을 사용하는 코드가 나오기 전에 초기화 필요
-# 보통은 스크립트 본문에서 Streamlit UI를 그리기 시작하는 부분 직전에 호출
-# 여기서는 일단 정의만 하고, 실제 사용 전에 호출되도록 함.
-# 하지만 더 안전하게는 이 호출도 set_page_config 보다 아래로,
-# 그리고 UI 렌더링 시작 전에 위치시키는 것이 좋음.
-# 지금 구조에서는 이 위치도 괜찮음.
-gc_client = init_gspread_client()
-reservations_ws, rotation_ws, GSHEET_AVAILABLE = get_worksheets(gc_client)
+@st.cache_resource
+def _sheets_resource_holder():
+    return {"lock": threading.Lock(), "mirror": None, "worker": None}
 
 
 # --- 데이터 로드 및 저장 함수 ---
-@st.cache_data(ttl=180)
-def get_all_records_as_df_cached(_ws, expected_headers, _cache_key_prefix):
-    if not GSHEET_AVAILABLE or _ws is None: return pd.DataFrame(columns=expected_headers)
-    try:
-        records = _ws.get_all_records()
-        df = pd.DataFrame(records)
-        if df.empty or not all(h in df.columns for h in expected_headers):
-            return pd.DataFrame(columns=expected_headers)
-        if "날짜" in df.columns and _ws.title == "reservations":
-            df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce').dt.date
-            if "시간_시작" in df.columns:
-                df['시간_시작'] = pd.to_datetime(df['시간_시작'], format='%H:%M', errors='coerce').dt.time
-            if "시간_종료" in df.columns:
-                df['시간_종료'] = pd.to_datetime(df['시간_종료'], format='%H:%M', errors='coerce').dt.time
-            df = df.dropna(subset=['날짜', '시간_시작', '시간_종료'])
-        return df
-    except Exception as e:
-        st.warning(f"'{_ws.title}' 시트 로드 중 오류 (캐시 사용 시도): {e}")
-        return pd.DataFrame(columns=expected_headers)
+# 로컬 SQLite 저장소가 기본이며, Google Sheets는 연결된 경우에만 미러로 붙는다.
+# 변경은 로컬 커밋(+저널) 즉시 확정되고, 시트 반영은 백그라운드 동기화 워커가 모아서 처리한다.
+def get_sheets_mirror():
+    # 연결이 끝난 뒤 처음 호출될 때 한 번 만듦. 그 전에는 None
+    holder = _sheets_resource_holder()
+    if holder["mirror"] is None:
+        connector = get_sheets_connector()
+        if connector is None or connector.status != "ready": return None
+        with holder["lock"]:
+            if holder["mirror"] is None:
+                client = get_sheets_client()
+                worksheets = connector.worksheets
+                holder["mirror"] = SheetsMirror(client.worksheet(worksheets["reservations"]), client.worksheet(worksheets["rotation_state"]), RESERVATION_SHEET_HEADERS, ROTATION_SHEET_HEADER)
+    return holder["mirror"]
 
-def update_worksheet_from_df(_ws, df, headers):
-    if not GSHEET_AVAILABLE or _ws is None: return
+@st.cache_resource
+def get_reservation_store():
+    # 로컬 저장소가 비어 있으면(첫 실행, 재배포 등) 동기화 워커의 첫 원격 확인에서 시트 내용을 가져옴
+    return SQLiteReservationStore(os.environ.get("RESERVATION_DB_PATH", DEFAULT_RESERVATION_DB_PATH))
+
+def get_sync_worker():
+    holder = _sheets_resource_holder()
+    if holder["worker"] is None:
+        mirror = get_sheets_mirror()
+        if mirror is None: return None
+        with holder["lock"]:
+            if holder["worker"] is None:
+                holder["worker"] = MirrorSyncWorker(get_reservation_store(), mirror)
+                holder["worker"].start()
+    return holder["worker"]
+
+def awaiting_first_sync():
+    # 시트가 설정돼 있는데 로컬 저장소가 아직 한 번도 시트와 대조되지 않았으면(새 배포 등) 비어 있거나 낡은 데이터로
+    # 충돌 검사·자동 배정 확인·로테이션이 통과하므로, 첫 대조가 끝날 때까지 쓰기 버튼을 막음
+    return get_sheets_connector() is not None and not get_reservation_store().reconciled()
+
+def _run_store_write(action_label, write):
     try:
-        df_to_save = df.copy()
-        if "시간_시작" in df_to_save.columns:
-            df_to_save['시간_시작'] = df_to_save['시간_시작'].apply(lambda t: t.strftime('%H:%M') if isinstance(t, time) else t)
-        if "시간_종료" in df_to_save.columns:
-            df_to_save['시간_종료'] = df_to_save['시간_종료'].apply(lambda t: t.strftime('%H:%M') if isinstance(t, time) else t)
-        df_values = [headers] + df_to_save.astype(str).values.tolist()
-        _ws.clear()
-        _ws.update(df_values, value_input_option='USER_ENTERED')
-        if _ws.title == "reservations": get_all_records_as_df_cached.clear()
-        elif _ws.title == "rotation_state": load_rotation_state_cached.clear()
+        with METRICS.phase("write"): write()
+    except ReservationConflict as e:
+        # 화면의 사전 검사 뒤 다른 세션이 먼저 같은 시간을 예약한 경우 (저장소가 같은 트랜잭션에서 다시 확인)
+        st.error(f"⚠️ {action_label}하지 못했습니다. 방금 다른 예약과 겹쳤습니다: {e}")
+        return False
     except Exception as e:
-        st.error(f"'{_ws.title}' 시트 업데이트 중 오류: {e}")
+        st.error(f"{action_label} 중 오류: {e}")
+        return False
+    worker = get_sync_worker()
+    if worker is not None: worker.notify()
+    return True
+
+def append_reservations(new_rows):
+    # 새 예약 행만 추가 (전체 재기록 없음)
+    return _run_store_write("예약 추가", lambda: get_reservation_store().add(new_rows))
+
+def commit_auto_assignments(new_rows, next_team_index):
+    # 배정 행과 다음 로테이션 인덱스를 한 트랜잭션으로 기록 (시트에도 한 배치로 반영)
+    return _run_store_write("자동 배정 저장", lambda: get_reservation_store().add(new_rows, next_team_index=next_team_index))
+
+def plan_auto_assignments(start_day, end_day):
+    # 기간 조회 한 번으로 기존 자동 배정 확인과 충돌 검사용 색인을 함께 준비. 지난 날짜가 섞이면 보관 파티션까지 읽음
+    include_archive = start_day < get_today_kst()
+    if include_archive: _ensure_archive_loaded()
+    existing = get_reservation_store().load_range(start_day, end_day, include_archive=include_archive)
+    plan = plan_range(start_day, end_day, load_rotation_state(), existing)
+    occupancy = get_occupancy_index()
+    occupancy.prime(plan.days, existing)
+    return plan, occupancy.validate_batch(plan.rows)
+
+def now_minutes_kst():
+    # (오늘 날짜, 현재 분) — 오늘 이미 끝난 시간 칸을 빈 방 후보에서 빼는 기준
+    now = datetime.now(KST)
+    return now.date(), now.hour * 60 + now.minute
+
+def search_free_slots(team, duration_min, start_day, end_day):
+    # 색인에 없는 날짜만 기간 조회 한 번으로 채운 뒤, 비트마스크만으로 빈 (날짜, 방, 시작) 을 빠른 순으로 찾음
+    occupancy = get_occupancy_index()
+    missing = occupancy.missing_days([start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)])
+    if missing:
+        with METRICS.phase("load"): existing = get_reservation_store().load_range(missing[0], missing[-1])
+        occupancy.prime(missing, existing)
+    with METRICS.phase("free_slots"):
+        return find_free_slots(occupancy, team, duration_min, start_day, end_day, not_before=now_minutes_kst(), limit=FREE_SLOT_RESULT_LIMIT)
+
+def cancel_reservation(res_id):
+    # 해당 예약ID 행만 삭제
+    return _run_store_write("예약 취소", lambda: get_reservation_store().delete([res_id]))
+
+def load_reservations(day=None):
+    # day가 주어지면 해당 날짜만 인덱스로 조회. 지난 날짜일 때만 보관 파티션까지 읽음
+    store = get_reservation_store()
+    with METRICS.phase("load"):
+        if day is None: return store.load_all()
+        if day < get_today_kst():
+            _ensure_archive_loaded()
+            return store.load_date(day, include_archive=True)
+        return store.load_date(day)
+
+def _ensure_archive_loaded():
+    # 보관 시트는 지난 날짜를 처음 조회할 때 한 번만 가져옴
+    store = get_reservation_store()
+    mirror = get_sheets_mirror()
+    if mirror is None or store.archive_imported(): return
+    try: store.import_archive(mirror.fetch_archive())
+    except Exception as e: st.warning(f"Google Sheets 보관 데이터를 가져오지 못했습니다 (로컬 보관 데이터만 표시): {e}")
+
+def archive_past_reservations(cutoff_day):
+    # cutoff_day 이전 예약을 보관 파티션으로 이동 (시트 반영은 동기화 워커가 처리)
+    moved = get_reservation_store().archive_before(cutoff_day)
+    worker = get_sync_worker()
+    if moved and worker is not None: worker.notify()
+    return moved
 
-def load_reservations():
-    return get_all_records_as_df_cached(reservations_ws, RESERVATION_SHEET_HEADERS, "reservations_cache")
+@st.cache_resource
+def _archive_schedule():
+    return {"last_cutoff": None}
 
-@st.cache_data(ttl=180)
-def load_rotation_state_cached(_rotation_ws, _cache_key_prefix):
-    if not GSHEET_AVAILABLE or _rotation_ws is None: return 0
-    df_state = get_all_records_as_df_cached(_rotation_ws, ROTATION_SHEET_HEADER, _cache_key_prefix)
-    if not df_state.empty and "next_team_index" in df_state.columns:
-        try: return int(df_state.iloc[0]["next_team_index"])
-        except (ValueError, TypeError): return 0
-    return 0
+def run_daily_archive(today):
+    # 프로세스마다 날짜가 바뀐 뒤 첫 실행에서 한 번 보관 작업을 수행 (시트와 첫 대조 전이면 다음 실행으로 미룸)
+    schedule = _archive_schedule()
+    if schedule["last_cutoff"] == today or awaiting_first_sync(): return
+    schedule["last_cutoff"] = today
+    try: archive_past_reservations(today)
+    except Exception as e: st.warning(f"지난 예약 보관 중 오류: {e}")
 
 def load_rotation_state():
-    return load_rotation_state_cached(rotation_ws, "rotation_state_cache")
+    return get_reservation_store().get_rotation_index()
+
+def load_usage_aggregates(start_day, end_day):
+    # 주간 집계 테이블만 읽음 (비어 있으면 저장소가 전체 기록으로 한 번 채움). 지난 주가 포함되면 보관 시트를 먼저 가져옴
+    if start_day < get_today_kst(): _ensure_archive_loaded()
+    with METRICS.phase("load"): return get_reservation_store().usage_aggregates(start_day, end_day)
+
+def reload_from_sheets():
+    mirror = get_sheets_mirror()
+    if mirror is None: return
+    with METRICS.phase("load"): get_reservation_store().import_from(mirror)
+
 
-def save_reservations(df):
-    update_worksheet_from_df(reservations_ws, df, RESERVATION_SHEET_HEADERS)
+@st.cache_resource
+def get_timetable_html_cache():
+    # (날짜, 데이터 버전) → 시간표 HTML, 모든 세션 공유
+    cache = TimetableHtmlCache(maxsize=64)
+    METRICS.register_cache("timetable_html", lambda: (cache.hits, cache.misses))
+    return cache
+
+def render_timetable_html(day_df, start_hour, end_hour):
+    with METRICS.phase("timetable_build"): table = build_timetable(day_df, ALL_ROOMS, start_hour, end_hour)
+    with METRICS.phase("render"): return style_timetable(table).to_html(escape=False)
 
-def save_rotation_state(next_team_index):
-    if not GSHEET_AVAILABLE or rotation_ws is None: return
-    df_state = pd.DataFrame({"next_team_index": [next_team_index]})
-    update_worksheet_from_df(rotation_ws, df_state, ROTATION_SHEET_HEADER)
+@st.cache_resource
+def _occupancy_index_holder():
+    return {}
+
+def get_occupancy_index():
+    # 저장소 데이터 버전이 바뀐 경우에만 새 색인을 만듦 (날짜별 내용은 조회 시 채움)
+    store = get_reservation_store()
+    holder = _occupancy_index_holder()
+    index = holder.get("index")
+    rebuilt = index is None or index.version != store.version
+    if rebuilt:
+        index = OccupancyIndex(store.load_date, version=store.version)
+        holder["index"] = index
+    METRICS.record_cache("occupancy_index", hit=not rebuilt)
+    return index
+
+
+# --- 콜드 스타트 측정 ---
+# 프로세스의 첫 스크립트 실행이 화면을 모두 그리기까지 걸린 시간(모듈 import 포함)을 한 번 기록한다.
+@st.cache_resource
+def _startup_metrics():
+    return {"first_paint_seconds": None}
 
-def check_time_overlap(new_start, new_end, existing_start, existing_end):
-    dummy_date = date.min
-    new_start_dt = datetime.combine(dummy_date, new_start)
-    new_end_dt = datetime.combine(dummy_date, new_end)
-    existing_start_dt = datetime.combine(dummy_date, existing_start)
-    existing_end_dt = datetime.combine(dummy_date, existing_end)
-    return max(new_start_dt, existing_start_dt) < min(new_end_dt, existing_end_dt)
+def record_first_paint():
+    metrics = _startup_metrics()
+    if metrics["first_paint_seconds"] is not None: return
+    metrics["first_paint_seconds"] = time_module.perf_counter() - script_started_at
+    logging.getLogger(__name__).info("콜드 스타트 첫 화면까지 %.3f초", metrics["first_paint_seconds"])
+
+
+# --- 계측 패널 / 내보내기 ---
+@st.cache_resource
+def _configure_metrics_export():
+    # 구조화 로그(실행당 JSON 한 줄)를 표준 출력으로, METRICS_PROMETHEUS_PORT 가 있으면 /metrics 엔드포인트도 띄움
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    port = os.environ.get("METRICS_PROMETHEUS_PORT")
+    if not port: return None
+    try: return start_prometheus_exporter(METRICS, int(port))
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning("Prometheus 내보내기 시작 실패 (포트 %s): %s", port, e)
+        return None
+
+@st.cache_resource
+def _configure_timetable_api():
+    # TIMETABLE_API_PORT 가 있으면 같은 로컬 저장소를 읽는 시간표 JSON/ICS 엔드포인트를 띄움 (키오스크·휴대폰 폴링용)
+    port = os.environ.get("TIMETABLE_API_PORT")
+    if not port: return None
+    try: return start_timetable_api(get_reservation_store(), int(port))
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning("시간표 API 시작 실패 (포트 %s): %s", port, e)
+        return None
 
+def render_metrics_panel(session_usage):
+    with st.sidebar.expander("📊 성능 지표 (관리자)", expanded=False):
+        st.caption(f"단계별 소요 시간 (최근 {METRICS.window}회 기준 p50/p95)")
+        phase_rows = METRICS.phase_summary()
+        if phase_rows: st.dataframe(pd.DataFrame(phase_rows).set_index("phase"), use_container_width=True)
+        sheets_stats = METRICS.sheets_summary()
+        total_calls = sum(s["calls"] for s in sheets_stats.values())
+        total_bytes = sum(s["bytes_out"] + s["bytes_in"] for s in sheets_stats.values())
+        st.caption(f"Google Sheets API: 프로세스 전체 {total_calls}회 / {total_bytes / 1024:.1f} KB, 이 세션 {session_usage.get('calls', 0)}회 / {session_usage.get('bytes', 0) / 1024:.1f} KB")
+        if sheets_stats: st.dataframe(pd.DataFrame.from_dict(sheets_stats, orient="index")[["calls", "errors", "bytes_out", "bytes_in"]], use_container_width=True)
+        client_stats = get_sheets_client().stats()
+        st.caption(f"요청 한도 계층: 재시도 {client_stats['retries']}회 (429 {client_stats['throttled']}회), 한도 대기 {client_stats['limiter_wait_seconds']:.1f}초, 병합된 요청 {client_stats['coalesced_requests']}건")
+        cache_stats = METRICS.cache_summary()
+        if cache_stats: st.dataframe(pd.DataFrame.from_dict(cache_stats, orient="index"), use_container_width=True)
+        st.download_button("Prometheus 텍스트 내려받기", METRICS.to_prometheus(), file_name="fruitroom_metrics.txt", mime="text/plain", key="metrics_prometheus_download_v8")
+
+
+# --- 메인 페이지 조각(fragment) ---
+# 시간표, 새 예약 폼, 취소 목록, 빈 방 찾기를 각각 st.fragment 로 나눠, 폼 위젯(조/방/시간)이나 취소 버튼을 건드리면 그 조각만 다시 실행한다.
+# 시간표 조각에는 위젯이 없어 날짜 변경이나 예약/취소 후의 전체 실행에서만 다시 그려지며, 그때도 (날짜, 데이터 버전)
+# 캐시에 있으면 예약 조회 없이 HTML 을 재사용한다. 예약/취소가 성공하면 시간표까지 갱신되도록 전체 실행(st.rerun)으로 넘긴다.
+FREE_SLOT_RESULT_LIMIT = 50  # 빈 방 찾기 결과 최대 건수
+FREE_SLOT_MAX_DAYS = 92  # 빈 방 찾기 기간 최대 일수
+
+@st.cache_resource
+def _fragment_rerun_detectable():
+    # 조각만 다시 실행됐는지는 공개 API 가 없어 ScriptRunContext.fragment_ids_this_run(내부 속성)으로만 알 수 있음.
+    # 업그레이드로 없어지면 조각 실행이 전체 실행 계측(scope="app")에 섞일 뿐 화면 동작은 그대로이므로, 경고만 한 번 남김
+    supported = "fragment_ids_this_run" in {f.name for f in dataclasses.fields(ScriptRunContext)}
+    if not supported: logging.getLogger(__name__).warning("이 Streamlit 버전에서는 조각 실행을 구분할 수 없어 조각별 실행 계측을 끕니다.")
+    return supported
+
+def _is_fragment_rerun():
+    if not _fragment_rerun_detectable(): return False
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+def metered_fragment(name):
+    # 조각만 다시 실행될 때는 본문 실행 전체가 따로 계측되도록 scope=name 으로 실행을 열고 닫음
+    def decorate(body):
+        @functools.wraps(body)
+        def run(*args, **kwargs):
+            if not _is_fragment_rerun(): return body(*args, **kwargs)
+            session_usage = st.session_state.metrics_usage_v8
+            METRICS.begin_rerun(session_usage, st.session_state.current_page, scope=name)
+            body(*args, **kwargs)
+            METRICS.end_rerun(session_usage)
+        return st.fragment(run)
+    return decorate
+
+@metered_fragment("timetable")
+def timetable_fragment(timetable_date):
+    timetable_display_start_hour, timetable_display_end_hour = display_hours(timetable_date)
+    timetable_html_v8 = get_timetable_html_cache().get_or_render(
+        (timetable_date, get_reservation_store().version),
+        lambda: render_timetable_html(load_reservations(timetable_date), timetable_display_start_hour, timetable_display_end_hour)
+    )
+    st.markdown(f"**{timetable_date.strftime('%Y-%m-%d')} 예약 현황 (1시간 단위)**")
+    if timetable_display_start_hour < timetable_display_end_hour:
+        st.html(timetable_html_v8)
+    else:
+        st.info(f"{timetable_date.strftime('%Y-%m-%d')}에 표시할 시간 슬롯이 없거나 예약이 없습니다.")
+
+@metered_fragment("booking_form")
+def booking_form_fragment(timetable_date, key_suffix_manual):
+    # 방/시간 선택지는 점유 색인에서 선택한 조와 방이 모두 비어 있는 칸만 보여줌 (클릭 시 충돌 검사는 동시 예약 대비로 유지)
+    current_manual_start_hour, current_manual_end_hour = manual_hours(timetable_date)
+    st.markdown("##### 📝 새 예약 등록")
+    selected_team_main_reserve_v8 = st.selectbox("조 선택", ALL_TEAMS, key="manual_team_sel_main_page_reserve_v8" + key_suffix_manual)
+    occupancy_main_reserve_v8 = get_occupancy_index()
+    not_before_main_reserve_v8 = now_minutes_kst()
+    with METRICS.phase("free_slots"):
+        room_options_main_reserve_v8 = free_rooms(occupancy_main_reserve_v8, timetable_date, selected_team_main_reserve_v8, not_before=not_before_main_reserve_v8)
+    if not room_options_main_reserve_v8:
+        st.info(f"{selected_team_main_reserve_v8}이(가) {timetable_date.strftime('%Y-%m-%d')} {current_manual_start_hour}:00~{current_manual_end_hour}:00에 예약할 수 있는 빈 방이 없습니다. 아래 '빈 방 찾기'로 다른 날짜를 찾아보세요.")
+        return
+    selected_room_main_reserve_v8 = st.selectbox("방 선택", room_options_main_reserve_v8, key="manual_room_sel_main_page_reserve_v8" + key_suffix_manual)
+    cols_time_reserve_v8 = st.columns(2)
+    with cols_time_reserve_v8[0]:
+        start_options_main_reserve_v8 = free_starts(occupancy_main_reserve_v8, timetable_date, selected_team_main_reserve_v8, selected_room_main_reserve_v8, not_before=not_before_main_reserve_v8)
+        manual_start_min_main_reserve_v8 = st.selectbox("시작 시간", start_options_main_reserve_v8, format_func=format_minutes, key="manual_start_time_main_page_reserve_v8" + key_suffix_manual)
+    with cols_time_reserve_v8[1]:
+        end_options_main_reserve_v8 = free_ends(occupancy_main_reserve_v8, timetable_date, selected_team_main_reserve_v8, selected_room_main_reserve_v8, manual_start_min_main_reserve_v8)
+        manual_end_min_main_reserve_v8 = st.selectbox("종료 시간", end_options_main_reserve_v8, index=len(end_options_main_reserve_v8) - 1, format_func=format_minutes, key="manual_end_time_main_page_reserve_v8" + key_suffix_manual)
+    manual_start_time_main_reserve_v8, manual_end_time_main_reserve_v8 = minutes_to_time(manual_start_min_main_reserve_v8), minutes_to_time(manual_end_min_main_reserve_v8)
+
+    if st.button("✅ 예약하기", key="manual_reserve_btn_main_page_reserve_v8"  + key_suffix_manual, type="primary", use_container_width=True, disabled=awaiting_first_sync()):
+        overlap_main_reserve_v8 = get_occupancy_index().conflict(timetable_date, selected_room_main_reserve_v8, selected_team_main_reserve_v8, manual_start_time_main_reserve_v8, manual_end_time_main_reserve_v8)
+        if overlap_main_reserve_v8 == "room": st.error(f"⚠️ {selected_room_main_reserve_v8}은(는) 해당 시간에 일부 또는 전체가 이미 예약되어 있습니다.")
+        elif overlap_main_reserve_v8 == "team": st.error(f"⚠️ {selected_team_main_reserve_v8}은(는) 해당 시간에 이미 다른 방을 예약했습니다.")
+        else:
+            new_item_main_reserve_v8 = {"날짜": timetable_date, "시간_시작": manual_start_time_main_reserve_v8, "시간_종료": manual_end_time_main_reserve_v8, "조": selected_team_main_reserve_v8, "방": selected_room_main_reserve_v8, "예약유형": "수동", "예약ID": str(uuid.uuid4())}
+            if append_reservations([new_item_main_reserve_v8]): st.success(f"🎉 예약 완료!"); st.rerun()
+
+@metered_fragment("cancel_list")
+def cancel_list_fragment(timetable_date, key_suffix_manual):
+    day_reservations = load_reservations(timetable_date)
+    st.markdown("##### 🚫 나의 수동 예약 취소")
+    with METRICS.phase("filter"):
+        my_manual_res_display_cancel_v8 = day_reservations[day_reservations["예약유형"] == "수동"].sort_values(by=["시간_시작", "조"])
+    if not my_manual_res_display_cancel_v8.empty:
+        sync_wait_cancel_v8 = awaiting_first_sync()
+        for _, row_main_cancel_v8 in my_manual_res_display_cancel_v8.iterrows():
+            res_id_main_cancel_v8 = row_main_cancel_v8["예약ID"]; time_str_main_cancel_v8 = f"{format_minutes(row_main_cancel_v8['시간_시작'])} - {format_minutes(row_main_cancel_v8['시간_종료'])}"
+            item_cols_main_cancel_v8 = st.columns([3,1])
+            with item_cols_main_cancel_v8[0]: st.markdown(f"**{time_str_main_cancel_v8}** / **{row_main_cancel_v8['조']}** / `{row_main_cancel_v8['방']}`")
+            with item_cols_main_cancel_v8[1]:
+                if st.button("취소", key=f"cancel_{res_id_main_cancel_v8}_main_page_reserve_v8" + key_suffix_manual, use_container_width=True, disabled=sync_wait_cancel_v8):
+                    if cancel_reservation(res_id_main_cancel_v8): st.success(f"🗑️ 예약 취소됨"); st.rerun()
+    else: st.info(f"{timetable_date.strftime('%Y-%m-%d')}에 취소할 수동 예약 내역이 없습니다.")
+
+
+@metered_fragment("free_slot_finder")
+def free_slot_finder_fragment(today_kst):
+    st.markdown("##### 🔎 빈 방 찾기")
+    st.caption(f"조, 사용 시간, 기간을 고르면 수동 예약 시간대 안에서 가장 빠른 (날짜, 방, 시작 시간)을 최대 {FREE_SLOT_RESULT_LIMIT}건 찾습니다.")
+    finder_cols_v8 = st.columns(3)
+    with finder_cols_v8[0]: finder_team_v8 = st.selectbox("조", ALL_TEAMS, key="free_slot_team_sel_v8")
+    with finder_cols_v8[1]: finder_hours_v8 = st.selectbox("사용 시간", range(1, DEFAULT_MANUAL_RESERVATION_END_HOUR - DEFAULT_MANUAL_RESERVATION_START_HOUR + 1), format_func=lambda h: f"{h}시간", key="free_slot_hours_sel_v8")
+    with finder_cols_v8[2]: finder_range_v8 = st.date_input("기간", value=(today_kst, today_kst + timedelta(days=6)), min_value=today_kst, max_value=today_kst + timedelta(days=FREE_SLOT_MAX_DAYS - 1), key="free_slot_range_v8")
+    if len(finder_range_v8) != 2:
+        st.info("기간의 끝 날짜를 골라 주세요."); return
+    if st.button("🔎 빈 방 찾기", key="free_slot_search_btn_v8", use_container_width=True):
+        searched_at_v8 = time_module.perf_counter()
+        found_slots_v8 = search_free_slots(finder_team_v8, finder_hours_v8 * 60, finder_range_v8[0], finder_range_v8[1])
+        search_ms_v8 = (time_module.perf_counter() - searched_at_v8) * 1000
+        if not found_slots_v8:
+            st.info(f"{finder_range_v8[0].strftime('%Y-%m-%d')} ~ {finder_range_v8[1].strftime('%Y-%m-%d')}에 {finder_team_v8}이(가) {finder_hours_v8}시간 쓸 수 있는 빈 방이 없습니다.")
+        else:
+            st.dataframe(pd.DataFrame({
+                "날짜": [s.day.strftime('%Y-%m-%d') + " (" + "월화수목금토일"[s.day.weekday()] + ")" for s in found_slots_v8],
+                "시간": [f"{format_minutes(s.start_min)} - {format_minutes(s.end_min)}" for s in found_slots_v8],
+                "방": [s.room for s in found_slots_v8],
+            }), hide_index=True, use_container_width=True)
+        st.caption(f"검색 {len(found_slots_v8)}건 · {search_ms_v8:.1f}ms")
 
 # --- Streamlit UI 시작 ---
 # st.session_state 초기화는 set_page_config 이후, UI 렌더링 전에 하는 것이 좋음
 if "current_page" not in st.session_state:
     st.session_state.current_page = "🗓️ 예약 시간표 및 수동 예약"
+if "metrics_usage_v8" not in st.session_state:
+    st.session_state.metrics_usage_v8 = {}
+_configure_metrics_export()
+_configure_timetable_api()
+METRICS.begin_rerun(st.session_state.metrics_usage_v8, st.session_state.current_page)
 
 # 사이드바 구성
 st.sidebar.title("🚀 조모임방 예약/조회")
@@ -165,6 +420,10 @@ if st.session_state.current_page == "🔄 자동 배정 (관리자)":
     if st.sidebar.button("🏠 시간표 및 수동 예약으로 돌아가기", key="return_to_main_from_admin_v8"):
         st.session_state.current_page = "🗓️ 예약 시간표 및 수동 예약"
         st.rerun()
+elif st.session_state.current_page == "📈 이용 통계 (관리자)":
+    if st.sidebar.button("🏠 시간표 및 수동 예약으로 돌아가기", key="return_to_main_from_analytics_v8"):
+        st.session_state.current_page = "🗓️ 예약 시간표 및 수동 예약"
+        st.rerun()
 elif st.session_state.current_page == "📖 관리자 매뉴얼":
     if st.sidebar.button("🏠 시간표 및 수동 예약으로 돌아가기", key="return_to_main_from_manual_v8"):
         st.session_state.current_page = "🗓️ 예약 시간표 및 수동 예약"
@@ -177,6 +436,9 @@ else: # "🗓️ 예약 시간표 및 수동 예약" 페이지
     if st.sidebar.button("⚙️ 자동 배정 설정 페이지로 이동", key="admin_auto_assign_nav_btn_main_v8"):
         st.session_state.current_page = "🔄 자동 배정 (관리자)"
         st.rerun()
+    if st.sidebar.button("📈 이용 통계 보기", key="admin_analytics_nav_btn_main_v8"):
+        st.session_state.current_page = "📈 이용 통계 (관리자)"
+        st.rerun()
     if st.sidebar.button("📖 관리자 매뉴얼 보기", key="admin_manual_nav_btn_main_v8"):
         st.session_state.current_page = "📖 관리자 매뉴얼"
         st.rerun()
@@ -188,23 +450,41 @@ else: # "🗓️ 예약 시간표 및 수동 예약" 페이지
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("⚙️ 기타 설정")
-if st.sidebar.button("🔄 데이터 캐시 새로고침", key="cache_refresh_btn_admin_v8"):
-    # 캐시 클리어 함수 호출
-    get_all_records_as_df_cached.clear()
-    load_rotation_state_cached.clear()
-    st.sidebar.success("데이터 캐시가 초기화되었습니다.")
-    st.rerun()
+_sheets_connector = get_sheets_connector()
+GSHEET_AVAILABLE = get_sheets_mirror() is not None
+if _sheets_connector is not None and _sheets_connector.status == "connecting":
+    st.sidebar.caption("☁️ Google Sheets 연결 중... (그동안 로컬 저장소로 동작)")
+elif _sheets_connector is not None and _sheets_connector.status == "retrying":
+    st.sidebar.warning(f"☁️ Google Sheets 연결 재시도 중 ({_sheets_connector.failures}회 실패): {_sheets_connector.last_error}")
+_sync_worker = get_sync_worker()
+_pending_sync_count = get_reservation_store().pending_count()
+if _sync_worker is not None and _sync_worker.last_error is not None:
+    st.sidebar.warning(f"☁️ 시트 동기화 재시도 중 (대기 {_pending_sync_count}건): {_sync_worker.last_error}")
+elif _pending_sync_count:
+    st.sidebar.caption(f"☁️ 시트 반영 대기 중인 변경 {_pending_sync_count}건")
+_first_paint_seconds = _startup_metrics()["first_paint_seconds"]
+if _first_paint_seconds is not None:
+    _connect_seconds = _sheets_connector.connect_seconds if _sheets_connector is not None else None
+    st.sidebar.caption(f"⏱️ 콜드 스타트 첫 화면 {_first_paint_seconds:.2f}초" + (f" · Sheets 연결 {_connect_seconds:.2f}초" if _connect_seconds is not None else ""))
+if st.sidebar.button("🔄 Google Sheets에서 다시 불러오기", key="cache_refresh_btn_admin_v8", disabled=not GSHEET_AVAILABLE, help="시트 내용으로 로컬 저장소를 덮어씁니다."):
+    try:
+        reload_from_sheets()
+        st.sidebar.success("Google Sheets 데이터로 로컬 저장소를 갱신했습니다.")
+        st.rerun()
+    except Exception as e:
+        st.sidebar.error(f"Google Sheets에서 불러오기 실패: {e}")
 
 # --- 메인 화면 콘텐츠 ---
-# GSHEET_AVAILABLE 체크는 UI 렌더링 직전에 하는 것이 좋음
-if not GSHEET_AVAILABLE:
-    st.error("Google Sheets에 연결할 수 없습니다. 설정을 확인하고 페이지를 새로고침해주세요.")
-    # GSHEET_AVAILABLE이 False이면 여기서 멈추도록 st.stop() 추가
-    st.stop()
+# Google Sheets 없이도 로컬 저장소로 계속 동작 (연결 중일 때는 사이드바에만 표시)
+if _sheets_connector is None:
+    _sheets_config_error = _sheets_connector_state()[1]
+    if _sheets_config_error: st.error(_sheets_config_error)
+    st.warning("Google Sheets에 연결할 수 없어 로컬 저장소만 사용합니다 (오프라인 모드). 변경 사항은 시트에 반영되지 않습니다.")
+elif awaiting_first_sync():
+    st.info("☁️ Google Sheets와 첫 동기화 중입니다. 끝나면 예약·취소·자동 배정 버튼이 활성화됩니다.")
 
-
-reservations_df = load_reservations() # 데이터 로드는 여기서
 today_kst = get_today_kst()
+run_daily_archive(today_kst)
 
 if st.session_state.current_page == "🗓️ 예약 시간표 및 수동 예약":
     st.header("🗓️ 예약 시간표 및 수동 예약/취소")
@@ -217,87 +497,11 @@ if st.session_state.current_page == "🗓️ 예약 시간표 및 수동 예약"
     selected_weekday = timetable_date.weekday()
     is_wednesday_selected = (selected_weekday == 2)
 
-    timetable_display_start_hour = DEFAULT_AUTO_ASSIGN_START_TIME.hour
-    timetable_display_end_hour = DEFAULT_MANUAL_RESERVATION_END_HOUR
-    if is_wednesday_selected:
-        timetable_display_start_hour = min(DEFAULT_AUTO_ASSIGN_START_TIME.hour, WEDNESDAY_AUTO_ASSIGN_START_TIME.hour)
-        timetable_display_end_hour = WEDNESDAY_AUTO_ASSIGN_END_TIME.hour + 1
-
-    def style_timetable(df_in):
-        styled_df = df_in.style.set_properties(**{
-            'border': '1px solid #ddd', 'text-align': 'center', 'vertical-align': 'middle',
-            'min-width': '85px', 'height': '60px', 'font-size': '0.9em',
-            'line-height': '1.5'
-        }).set_table_styles([
-            {'selector': 'th', 'props': [
-                ('background-color', '#f0f0f0'), ('border', '1px solid #ccc'),
-                ('font-weight', 'bold'), ('padding', '8px'), ('color', '#333'),
-                ('vertical-align', 'middle')
-            ]},
-            {'selector': 'th.row_heading', 'props': [
-                ('background-color', '#f0f0f0'), ('border', '1px solid #ccc'),
-                ('font-weight', 'bold'), ('padding', '8px'), ('color', '#333'),
-                ('vertical-align', 'middle')
-            ]},
-            {'selector': 'td', 'props': [('padding', '8px'), ('vertical-align', 'top')]}
-        ])
-        def highlight_reserved_cell(val_html):
-            bg_color = 'background-color: white;'
-            if isinstance(val_html, str) and val_html != '':
-                if '(자동)' in val_html: bg_color = 'background-color: #e0f3ff;'
-                elif '(수동)' in val_html: bg_color = 'background-color: #d4edda;'
-            return f'{bg_color};' 
-        try:
-            styled_df = styled_df.set_table_attributes('style="border-collapse: collapse;"').map(highlight_reserved_cell)
-        except AttributeError:
-            st.warning("Pandas Styler.map()을 사용할 수 없습니다. 이전 방식(applymap)을 사용합니다.")
-            styled_df = styled_df.applymap(highlight_reserved_cell)
-        return styled_df
-
-    time_slots_v8 = []
-    current_hour = timetable_display_start_hour
-    end_hour_for_loop = timetable_display_end_hour
-    
-    while current_hour < end_hour_for_loop :
-        time_slots_v8.append(time(current_hour,0))
-        current_hour +=1
-        
-    timetable_df_v8 = pd.DataFrame(index=[t.strftime("%H:%M") for t in time_slots_v8], columns=ALL_ROOMS).fillna('')
-
-    if not reservations_df.empty:
-        day_reservations = reservations_df[reservations_df["날짜"] == timetable_date].copy()
-        if not day_reservations.empty:
-            for _, res_v8 in day_reservations.iterrows():
-                res_start_time = res_v8["시간_시작"]
-                res_end_time = res_v8["시간_종료"]
-                res_type_str_v8 = "(자동)" if res_v8['예약유형'] == '자동' else "(수동)"
-                team_name_color = "#333333" 
-                cell_content_v8 = f"<b style='color: {team_name_color};'>{res_v8['조']}</b><br><small style='color: #555;'>{res_type_str_v8}</small>"
-                for slot_start_time_obj in time_slots_v8:
-                    slot_start_dt = datetime.combine(date.min, slot_start_time_obj)
-                    slot_end_dt = slot_start_dt + timedelta(hours=1)
-                    res_start_dt_combined = datetime.combine(date.min, res_start_time)
-                    if res_end_time == time(0,0) and res_start_time > time(12,0):
-                         res_end_dt_combined = datetime.combine(date.min + timedelta(days=1), time(0,0))
-                    elif res_end_time == time(23,59) and is_wednesday_selected:
-                         res_end_dt_combined = datetime.combine(date.min, time(23,59,59))
-                    else:
-                         res_end_dt_combined = datetime.combine(date.min, res_end_time)
-                    if res_start_dt_combined < slot_end_dt and res_end_dt_combined > slot_start_dt:
-                        slot_str_v8 = slot_start_time_obj.strftime("%H:%M")
-                        if slot_str_v8 in timetable_df_v8.index and res_v8["방"] in timetable_df_v8.columns:
-                            timetable_df_v8.loc[slot_str_v8, res_v8["방"]] = cell_content_v8
-    
-    st.markdown(f"**{timetable_date.strftime('%Y-%m-%d')} 예약 현황 (1시간 단위)**")
-    if not timetable_df_v8.empty:
-        st.html(style_timetable(timetable_df_v8).to_html(escape=False))
-    else:
-        st.info(f"{timetable_date.strftime('%Y-%m-%d')}에 표시할 시간 슬롯이 없거나 예약이 없습니다.")
+    timetable_fragment(timetable_date)
     
     st.markdown("---")
     can_manual_reserve_today = timetable_date >= today_kst
-    current_manual_start_hour = WEDNESDAY_MANUAL_RESERVATION_START_HOUR if is_wednesday_selected else DEFAULT_MANUAL_RESERVATION_START_HOUR
-    current_manual_end_hour = WEDNESDAY_MANUAL_RESERVATION_END_HOUR if is_wednesday_selected else DEFAULT_MANUAL_RESERVATION_END_HOUR
+    current_manual_start_hour, current_manual_end_hour = manual_hours(timetable_date)
 
     with st.expander("ℹ️ 수동 예약 안내 (클릭하여 보기)", expanded=False):
         st.markdown(f"""
@@ -311,66 +515,12 @@ if st.session_state.current_page == "🗓️ 예약 시간표 및 수동 예약"
     if not can_manual_reserve_today:
         st.warning(f"{timetable_date.strftime('%Y-%m-%d')}은(는) 과거 날짜이므로 수동 예약/취소가 불가능합니다.")
     else:
-        st.markdown("##### 📝 새 예약 등록")
         key_suffix_manual = "_wed" if is_wednesday_selected else "_other"
-        selected_team_main_reserve_v8 = st.selectbox("조 선택", ALL_TEAMS, key="manual_team_sel_main_page_reserve_v8" + key_suffix_manual)
-        selected_room_main_reserve_v8 = st.selectbox("방 선택", ALL_ROOMS, key="manual_room_sel_main_page_reserve_v8" + key_suffix_manual)
-        cols_time_reserve_v8 = st.columns(2)
-        _today_for_time_calc_v8 = today_kst
-        with cols_time_reserve_v8[0]:
-            start_time_default_val_v8 = time(current_manual_start_hour, 0)
-            max_possible_start_time_dt_v8 = datetime.combine(_today_for_time_calc_v8, time(current_manual_end_hour, 0)) - timedelta(hours=1)
-            max_possible_start_time_val_v8 = max_possible_start_time_dt_v8.time()
-            if start_time_default_val_v8 > max_possible_start_time_val_v8 : start_time_default_val_v8 = max_possible_start_time_val_v8
-            if start_time_default_val_v8 < time(current_manual_start_hour,0): start_time_default_val_v8 = time(current_manual_start_hour,0)
-            manual_start_time_main_reserve_v8 = st.time_input("시작 시간", value=start_time_default_val_v8, step=timedelta(hours=1), key="manual_start_time_main_page_reserve_v8" + key_suffix_manual)
-        with cols_time_reserve_v8[1]:
-            end_time_default_val_v8 = time(current_manual_end_hour, 0)
-            min_possible_end_time_dt_v8 = datetime.combine(_today_for_time_calc_v8, manual_start_time_main_reserve_v8) + timedelta(hours=1)
-            min_possible_end_time_val_v8 = min_possible_end_time_dt_v8.time()
-            max_possible_end_time_val_v8 = time(current_manual_end_hour, 0)
-            if end_time_default_val_v8 < min_possible_end_time_val_v8: end_time_default_val_v8 = min_possible_end_time_val_v8
-            if end_time_default_val_v8 > max_possible_end_time_val_v8: end_time_default_val_v8 = max_possible_end_time_val_v8
-            manual_end_time_main_reserve_v8 = st.time_input("종료 시간", value=end_time_default_val_v8, step=timedelta(hours=1), key="manual_end_time_main_page_reserve_v8" + key_suffix_manual)
-
-        time_valid_main_reserve_v8 = True
-        if manual_start_time_main_reserve_v8 < time(current_manual_start_hour, 0): st.error(f"시작 시간은 {time(current_manual_start_hour, 0).strftime('%H:%M')} 이후여야 합니다."); time_valid_main_reserve_v8 = False
-        if manual_start_time_main_reserve_v8 >= time(current_manual_end_hour, 0): st.error(f"시작 시간은 {time(current_manual_end_hour-1, 0).strftime('%H:%M')} 이전이어야 합니다."); time_valid_main_reserve_v8 = False
-        elif manual_start_time_main_reserve_v8 > max_possible_start_time_val_v8: st.error(f"시작 시간은 {max_possible_start_time_val_v8.strftime('%H:%M')} 이전이어야 합니다 (최소 1시간 예약 필요)."); time_valid_main_reserve_v8 = False
-        if manual_start_time_main_reserve_v8 >= manual_end_time_main_reserve_v8: st.error("종료 시간은 시작 시간보다 이후여야 합니다."); time_valid_main_reserve_v8 = False
-        if manual_end_time_main_reserve_v8 > time(current_manual_end_hour, 0): st.error(f"종료 시간은 {time(current_manual_end_hour, 0).strftime('%H:%M')} 이전이어야 합니다."); time_valid_main_reserve_v8 = False
-        min_duration_main_reserve_v8 = timedelta(hours=1)
-        current_duration_v8 = datetime.combine(date.min, manual_end_time_main_reserve_v8) - datetime.combine(date.min, manual_start_time_main_reserve_v8)
-        if current_duration_v8 < min_duration_main_reserve_v8 and time_valid_main_reserve_v8 : st.error(f"최소 예약 시간은 {min_duration_main_reserve_v8.seconds // 3600}시간입니다."); time_valid_main_reserve_v8 = False
-
-        if st.button("✅ 예약하기", key="manual_reserve_btn_main_page_reserve_v8"  + key_suffix_manual, type="primary", use_container_width=True, disabled=not time_valid_main_reserve_v8):
-            current_reservations_main_reserve_v8 = load_reservations()
-            is_overlap_main_reserve_v8 = False
-            room_res_check_v8 = current_reservations_main_reserve_v8[(current_reservations_main_reserve_v8["날짜"] == timetable_date) & (current_reservations_main_reserve_v8["방"] == selected_room_main_reserve_v8)]
-            for _, ex_res_check_v8 in room_res_check_v8.iterrows():
-                if check_time_overlap(manual_start_time_main_reserve_v8, manual_end_time_main_reserve_v8, ex_res_check_v8["시간_시작"], ex_res_check_v8["시간_종료"]): st.error(f"⚠️ {selected_room_main_reserve_v8}은(는) 해당 시간에 일부 또는 전체가 이미 예약되어 있습니다."); is_overlap_main_reserve_v8=True; break
-            if not is_overlap_main_reserve_v8:
-                team_res_check_v8 = current_reservations_main_reserve_v8[(current_reservations_main_reserve_v8["날짜"] == timetable_date) & (current_reservations_main_reserve_v8["조"] == selected_team_main_reserve_v8)]
-                for _, ex_res_check_v8 in team_res_check_v8.iterrows():
-                    if check_time_overlap(manual_start_time_main_reserve_v8, manual_end_time_main_reserve_v8, ex_res_check_v8["시간_시작"], ex_res_check_v8["시간_종료"]): st.error(f"⚠️ {selected_team_main_reserve_v8}은(는) 해당 시간에 이미 다른 방을 예약했습니다."); is_overlap_main_reserve_v8=True; break
-            if not is_overlap_main_reserve_v8:
-                new_item_main_reserve_v8 = {"날짜": timetable_date, "시간_시작": manual_start_time_main_reserve_v8, "시간_종료": manual_end_time_main_reserve_v8, "조": selected_team_main_reserve_v8, "방": selected_room_main_reserve_v8, "예약유형": "수동", "예약ID": str(uuid.uuid4())}
-                updated_df_main_reserve_v8 = pd.concat([current_reservations_main_reserve_v8, pd.DataFrame([new_item_main_reserve_v8])], ignore_index=True); save_reservations(updated_df_main_reserve_v8)
-                st.success(f"🎉 예약 완료!"); st.rerun()
-
-        st.markdown("##### 🚫 나의 수동 예약 취소")
-        my_manual_res_display_cancel_v8 = reservations_df[(reservations_df["날짜"] == timetable_date) & (reservations_df["예약유형"] == "수동")].copy()
-        if not my_manual_res_display_cancel_v8.empty:
-            my_manual_res_display_cancel_v8 = my_manual_res_display_cancel_v8.sort_values(by=["시간_시작", "조"])
-            for _, row_main_cancel_v8 in my_manual_res_display_cancel_v8.iterrows():
-                res_id_main_cancel_v8 = row_main_cancel_v8["예약ID"]; time_str_main_cancel_v8 = f"{row_main_cancel_v8['시간_시작'].strftime('%H:%M')} - {row_main_cancel_v8['시간_종료'].strftime('%H:%M')}"
-                item_cols_main_cancel_v8 = st.columns([3,1])
-                with item_cols_main_cancel_v8[0]: st.markdown(f"**{time_str_main_cancel_v8}** / **{row_main_cancel_v8['조']}** / `{row_main_cancel_v8['방']}`")
-                with item_cols_main_cancel_v8[1]:
-                    if st.button("취소", key=f"cancel_{res_id_main_cancel_v8}_main_page_reserve_v8" + key_suffix_manual, use_container_width=True):
-                        current_on_cancel_main_reserve_v8 = load_reservations(); updated_on_cancel_main_reserve_v8 = current_on_cancel_main_reserve_v8[current_on_cancel_main_reserve_v8["예약ID"] != res_id_main_cancel_v8]
-                        save_reservations(updated_on_cancel_main_reserve_v8); st.success(f"🗑️ 예약 취소됨"); st.rerun()
-        else: st.info(f"{timetable_date.strftime('%Y-%m-%d')}에 취소할 수동 예약 내역이 없습니다.")
+        booking_form_fragment(timetable_date, key_suffix_manual)
+        cancel_list_fragment(timetable_date, key_suffix_manual)
+
+    st.markdown("---")
+    free_slot_finder_fragment(today_kst)
 
 elif st.session_state.current_page == "🔄 자동 배정 (관리자)":
     st.header("🔄 자동 배정 ⚠️ 관리자 전용")
@@ -385,6 +535,7 @@ elif st.session_state.current_page == "🔄 자동 배정 (관리자)":
     start_str_auto = current_auto_assign_start_time.strftime('%H:%M'); end_str_auto = current_auto_assign_end_time.strftime('%H:%M')
     if is_wednesday_auto_assign and current_auto_assign_end_time == time(23, 59): end_str_auto = "00:00"
     current_auto_assign_slot_str = f"{start_str_auto} - {end_str_auto}"
+    current_auto_assign_start_min, current_auto_assign_end_min = time_to_minutes(current_auto_assign_start_time), time_to_minutes(current_auto_assign_end_time)
     if current_test_mode_admin: st.info("🧪 테스트 모드: 요일 제한 없이 자동 배정 가능합니다.")
     else: st.info(f"🗓️ 자동 배정은 수요일 또는 일요일에만 실행 가능합니다. (선택된 날짜: {'수요일' if is_wednesday_auto_assign else '수요일 아님'})")
     with st.expander("ℹ️ 자동 배정 안내 (클릭하여 보기)", expanded=False):
@@ -396,29 +547,90 @@ elif st.session_state.current_page == "🔄 자동 배정 (관리자)":
         """)
     can_auto_assign_admin_page_v8 = current_test_mode_admin or (is_wednesday_auto_assign or weekday_admin_page_v8 == 6)
     if not can_auto_assign_admin_page_v8: st.warning("⚠️ 자동 배정은 수요일 또는 일요일에만 실행할 수 있습니다. (테스트 모드 비활성화 상태)")
-    if st.button("✨ 선택 날짜 자동 배정 실행", key="auto_assign_btn_admin_page_final_v8", type="primary", disabled=not can_auto_assign_admin_page_v8):
-        current_reservations_admin_page_v8 = load_reservations()
-        existing_auto_admin_page_v8 = current_reservations_admin_page_v8[(current_reservations_admin_page_v8["날짜"] == auto_assign_date_admin_page_v8) & (current_reservations_admin_page_v8["시간_시작"] == current_auto_assign_start_time) & (current_reservations_admin_page_v8["시간_종료"] == current_auto_assign_end_time) & (current_reservations_admin_page_v8["예약유형"] == "자동")]
+    if st.button("✨ 선택 날짜 자동 배정 실행", key="auto_assign_btn_admin_page_final_v8", type="primary", disabled=not can_auto_assign_admin_page_v8 or awaiting_first_sync()):
+        current_reservations_admin_page_v8 = load_reservations(auto_assign_date_admin_page_v8)
+        with METRICS.phase("filter"): existing_auto_admin_page_v8 = current_reservations_admin_page_v8[(current_reservations_admin_page_v8["시간_시작"] == current_auto_assign_start_min) & (current_reservations_admin_page_v8["시간_종료"] == current_auto_assign_end_min) & (current_reservations_admin_page_v8["예약유형"] == "자동")]
         if not existing_auto_admin_page_v8.empty: st.warning(f"이미 {auto_assign_date_admin_page_v8.strftime('%Y-%m-%d')} {current_auto_assign_slot_str}에 자동 배정 내역이 있습니다.")
         else:
-            new_auto_list_admin_page_v8 = []; assigned_info_admin_page_v8 = []
-            if SENIOR_TEAM in ALL_TEAMS and SENIOR_ROOM in ALL_ROOMS: new_auto_list_admin_page_v8.append({"날짜": auto_assign_date_admin_page_v8, "시간_시작": current_auto_assign_start_time, "시간_종료": current_auto_assign_end_time, "조": SENIOR_TEAM, "방": SENIOR_ROOM, "예약유형": "자동", "예약ID": str(uuid.uuid4())}); assigned_info_admin_page_v8.append(f"🔒 **{SENIOR_TEAM}** → **{SENIOR_ROOM}** (고정)")
-            next_idx_admin_page_v8 = load_rotation_state(); num_rotation_teams_admin_page_v8 = len(ROTATION_TEAMS); num_rotation_rooms_admin_page_v8 = len(ROTATION_ROOMS); available_slots_for_rotation = min(num_rotation_teams_admin_page_v8, num_rotation_rooms_admin_page_v8)
-            for i in range(available_slots_for_rotation):
-                team_idx_list_admin_page_v8 = (next_idx_admin_page_v8 + i) % num_rotation_teams_admin_page_v8; team_assign_admin_page_v8 = ROTATION_TEAMS[team_idx_list_admin_page_v8]; room_assign_admin_page_v8 = ROTATION_ROOMS[i]
-                new_auto_list_admin_page_v8.append({"날짜": auto_assign_date_admin_page_v8, "시간_시작": current_auto_assign_start_time, "시간_종료": current_auto_assign_end_time, "조": team_assign_admin_page_v8, "방": room_assign_admin_page_v8, "예약유형": "자동", "예약ID": str(uuid.uuid4())}); assigned_info_admin_page_v8.append(f"🔄 **{team_assign_admin_page_v8}** → **{room_assign_admin_page_v8}** (로테이션)")
-            if new_auto_list_admin_page_v8:
-                new_df_admin_page_v8 = pd.DataFrame(new_auto_list_admin_page_v8); updated_df_admin_page_v8 = pd.concat([current_reservations_admin_page_v8, new_df_admin_page_v8], ignore_index=True); save_reservations(updated_df_admin_page_v8)
-                new_next_idx_admin_page_v8 = (next_idx_admin_page_v8 + available_slots_for_rotation) % num_rotation_teams_admin_page_v8 if num_rotation_teams_admin_page_v8 > 0 else 0; save_rotation_state(new_next_idx_admin_page_v8)
+            new_auto_list_admin_page_v8, assigned_info_admin_page_v8, new_next_idx_admin_page_v8 = assign_day(auto_assign_date_admin_page_v8, load_rotation_state())
+            num_rotation_teams_admin_page_v8 = len(ROTATION_TEAMS)
+            auto_conflicts_admin_page_v8 = get_occupancy_index().validate_batch(new_auto_list_admin_page_v8)
+            if auto_conflicts_admin_page_v8:
+                st.error("다음 배정이 기존 예약과 겹쳐 자동 배정을 실행하지 않았습니다:")
+                for conflict_row, conflict_kind in auto_conflicts_admin_page_v8: st.markdown(f"- **{conflict_row['조']}** → **{conflict_row['방']}** ({'방 사용 중' if conflict_kind == 'room' else '조가 이미 다른 방 예약'})")
+            elif new_auto_list_admin_page_v8:
+                if not commit_auto_assignments(new_auto_list_admin_page_v8, new_next_idx_admin_page_v8): st.stop()
                 st.success(f"🎉 {auto_assign_date_admin_page_v8.strftime('%Y-%m-%d')} 자동 배정 완료!"); 
                 for info in assigned_info_admin_page_v8: st.markdown(f"- {info}")
                 if num_rotation_teams_admin_page_v8 > 0: st.info(f"ℹ️ 다음 로테이션 시작 조: '{ROTATION_TEAMS[new_next_idx_admin_page_v8]}'")
                 st.rerun()
             else: st.error("자동 배정할 조 또는 방이 없습니다 (시니어조 배정은 가능할 수 있음, 로테이션 대상 없음).")
     st.subheader(f"자동 배정 현황 ({current_auto_assign_slot_str})")
-    auto_today_display_admin_page_v8 = reservations_df[(reservations_df["날짜"] == auto_assign_date_admin_page_v8) & (reservations_df["시간_시작"] == current_auto_assign_start_time) & (reservations_df["시간_종료"] == current_auto_assign_end_time) & (reservations_df["예약유형"] == "자동")]
+    auto_day_reservations_admin_page_v8 = load_reservations(auto_assign_date_admin_page_v8)
+    with METRICS.phase("filter"): auto_today_display_admin_page_v8 = auto_day_reservations_admin_page_v8[(auto_day_reservations_admin_page_v8["시간_시작"] == current_auto_assign_start_min) & (auto_day_reservations_admin_page_v8["시간_종료"] == current_auto_assign_end_min) & (auto_day_reservations_admin_page_v8["예약유형"] == "자동")]
     if not auto_today_display_admin_page_v8.empty: st.dataframe(auto_today_display_admin_page_v8[["조", "방"]].sort_values(by="방"), use_container_width=True)
     else: st.info(f"{auto_assign_date_admin_page_v8.strftime('%Y-%m-%d')} {current_auto_assign_slot_str} 시간대 자동 배정 내역이 없습니다.")
+    st.markdown("---")
+    st.subheader("📅 기간 자동 배정")
+    st.caption("기간 안의 모든 수요일/일요일에 자동 배정을 한 번에 만듭니다. 이미 자동 배정된 날짜는 건너뛰며, 로테이션은 날짜 순서대로 이어집니다.")
+    plan_cols_admin_page_v8 = st.columns(2)
+    with plan_cols_admin_page_v8[0]: plan_start_admin_page_v8 = st.date_input("시작 날짜", value=today_kst, key="auto_plan_start_admin_page_v8")
+    with plan_cols_admin_page_v8[1]: plan_end_admin_page_v8 = st.date_input("종료 날짜", value=today_kst + timedelta(weeks=4), key="auto_plan_end_admin_page_v8")
+    plan_valid_admin_page_v8 = plan_start_admin_page_v8 <= plan_end_admin_page_v8
+    if not plan_valid_admin_page_v8: st.error("종료 날짜는 시작 날짜 이후여야 합니다.")
+    plan_btn_cols_admin_page_v8 = st.columns(2)
+    with plan_btn_cols_admin_page_v8[0]: plan_preview_admin_page_v8 = st.button("🔍 미리보기 (저장 안 함)", key="auto_plan_preview_btn_admin_page_v8", disabled=not plan_valid_admin_page_v8, use_container_width=True)
+    with plan_btn_cols_admin_page_v8[1]: plan_run_admin_page_v8 = st.button("✨ 기간 자동 배정 실행", key="auto_plan_run_btn_admin_page_v8", type="primary", disabled=not plan_valid_admin_page_v8 or awaiting_first_sync(), use_container_width=True)
+    if plan_preview_admin_page_v8 or plan_run_admin_page_v8:
+        plan_admin_page_v8, plan_conflicts_admin_page_v8 = plan_auto_assignments(plan_start_admin_page_v8, plan_end_admin_page_v8)
+        if plan_admin_page_v8.skipped_days: st.info("이미 자동 배정된 날짜 (건너뜀): " + ", ".join(d.strftime('%Y-%m-%d') for d in plan_admin_page_v8.skipped_days))
+        if not plan_admin_page_v8.rows: st.info("배정할 날짜가 없습니다.")
+        elif plan_conflicts_admin_page_v8:
+            st.error("다음 배정이 기존 예약과 겹쳐 기간 자동 배정을 실행할 수 없습니다:")
+            for conflict_row, conflict_kind in plan_conflicts_admin_page_v8: st.markdown(f"- {conflict_row['날짜'].strftime('%Y-%m-%d')} **{conflict_row['조']}** → **{conflict_row['방']}** ({'방 사용 중' if conflict_kind == 'room' else '조가 이미 다른 방 예약'})")
+        elif plan_run_admin_page_v8:
+            if commit_auto_assignments(plan_admin_page_v8.rows, plan_admin_page_v8.next_team_index):
+                st.success(f"🎉 {len(plan_admin_page_v8.days)}일, {len(plan_admin_page_v8.rows)}건 자동 배정 완료!")
+                if ROTATION_TEAMS: st.info(f"ℹ️ 다음 로테이션 시작 조: '{ROTATION_TEAMS[plan_admin_page_v8.next_team_index]}'")
+        else:
+            st.markdown(f"**미리보기: {len(plan_admin_page_v8.days)}일, {len(plan_admin_page_v8.rows)}건**" + (f" (실행 후 다음 로테이션 시작 조: '{ROTATION_TEAMS[plan_admin_page_v8.next_team_index]}')" if ROTATION_TEAMS else ""))
+            plan_preview_df_admin_page_v8 = pd.DataFrame(plan_admin_page_v8.rows)
+            plan_preview_df_admin_page_v8["시간"] = [f"{s.strftime('%H:%M')} - {e.strftime('%H:%M')}" for s, e in zip(plan_preview_df_admin_page_v8["시간_시작"], plan_preview_df_admin_page_v8["시간_종료"])]
+            st.dataframe(plan_preview_df_admin_page_v8.pivot(index=["날짜", "시간"], columns="방", values="조")[[r for r in ALL_ROOMS if r in set(plan_preview_df_admin_page_v8["방"])]], use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("🗄️ 지난 예약 보관")
+    st.caption("오늘 이전 예약을 보관 영역으로 옮깁니다. 매일 첫 접속 시에도 자동으로 실행되며, 보관된 예약은 지난 날짜 시간표에서 계속 조회할 수 있습니다.")
+    if st.button("🗄️ 지난 예약 보관", key="archive_past_btn_admin_page_v8", disabled=awaiting_first_sync()):
+        moved_archive_admin_page_v8 = archive_past_reservations(today_kst)
+        if moved_archive_admin_page_v8: st.success(f"지난 예약 {moved_archive_admin_page_v8}건을 보관했습니다.")
+        else: st.info("보관할 지난 예약이 없습니다.")
+
+elif st.session_state.current_page == "📈 이용 통계 (관리자)":
+    st.header("📈 이용 통계 ⚠️ 관리자 전용")
+    st.caption("주 단위(월요일 시작)로 미리 집계된 예약 시간으로 그립니다. 집계는 예약/취소 때마다 바뀐 만큼만 갱신되며, 보관된 지난 예약도 포함합니다.")
+    stats_cols_v8 = st.columns(2)
+    with stats_cols_v8[0]: stats_start_v8 = st.date_input("시작 날짜", value=today_kst - timedelta(weeks=11, days=today_kst.weekday()), key="analytics_start_v8")
+    with stats_cols_v8[1]: stats_end_v8 = st.date_input("종료 날짜", value=today_kst, key="analytics_end_v8")
+    if stats_start_v8 > stats_end_v8: st.error("종료 날짜는 시작 날짜 이후여야 합니다."); st.stop()
+    stats_agg_v8 = load_usage_aggregates(stats_start_v8, stats_end_v8)
+    stats_weeks_v8 = (week_of(stats_end_v8.toordinal()) - week_of(stats_start_v8.toordinal())) // 7 + 1
+    if stats_agg_v8.empty:
+        st.info(f"{stats_start_v8.strftime('%Y-%m-%d')} ~ {stats_end_v8.strftime('%Y-%m-%d')} 기간의 예약이 없습니다.")
+    else:
+        st.subheader("🏠 방별 이용 시간 (주별, 시간)")
+        st.bar_chart(hours_by_week(stats_agg_v8, "room", ALL_ROOMS))
+        st.dataframe(totals(stats_agg_v8, "room", ALL_ROOMS, stats_weeks_v8), use_container_width=True)
+        st.subheader("🔄 로테이션 조별 배분")
+        rotation_totals_v8 = totals(stats_agg_v8, "team", ROTATION_TEAMS, stats_weeks_v8).reindex(ROTATION_TEAMS)
+        st.bar_chart(rotation_totals_v8["예약 시간"])
+        if len(rotation_totals_v8) and rotation_totals_v8["예약 시간"].mean() > 0:
+            st.caption(f"로테이션 대상 {len(ROTATION_TEAMS)}개 조: 최다 {rotation_totals_v8['예약 시간'].max():.1f}시간 / 최소 {rotation_totals_v8['예약 시간'].min():.1f}시간, 변동계수 {rotation_totals_v8['예약 시간'].std(ddof=0) / rotation_totals_v8['예약 시간'].mean():.2f} (자동·수동 예약 합계)")
+        st.dataframe(totals(stats_agg_v8, "team", ALL_TEAMS, stats_weeks_v8), use_container_width=True)
+        st.subheader("⏰ 예약유형 및 자동 배정 시간대 겹침")
+        st.bar_chart(hours_by_week(stats_agg_v8, "type", RESERVATION_TYPES))
+        st.dataframe(collision_summary(stats_agg_v8), use_container_width=True)
+        st.caption("자동 배정 시간대와 겹친 건수는 수/일요일 자동 배정 시간에 걸친 예약 수입니다. 수동 예약의 값이 곧 자동 배정 시간대와 충돌한 수동 예약입니다.")
 
 elif st.session_state.current_page == "📖 관리자 매뉴얼":
     st.header("📖 관리자 매뉴얼")
@@ -427,3 +639,9 @@ elif st.session_state.current_page == "📖 관리자 매뉴얼":
     st.markdown(f"""
     (매뉴얼 내용 이전과 동일하게 유지 또는 필요시 위 UI 변경사항 반영하여 수정)
     """)
+
+# 관리자 페이지에서만 계측 패널 표시
+if st.session_state.current_page != "🗓️ 예약 시간표 및 수동 예약":
+    render_metrics_panel(st.session_state.metrics_usage_v8)
+METRICS.end_rerun(st.session_state.metrics_usage_v8)
+record_first_paint()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# 저장소 루트의 모듈(reservation_sheet, sheets_client, ...)과 benchmarks.fake_sheets 를 그대로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_sheets import FakeSpreadsheet, SheetsMeter
+from config import RESERVATION_SHEET_HEADERS
+
+
+@pytest.fixture
+def meter():
+    return SheetsMeter(latency=0.0, per_cell_latency=0.0, quota_per_minute=0)
+
+
+@pytest.fixture
+def spreadsheet(meter):
+    return FakeSpreadsheet(meter)
+
+
+def reservation_row(res_id, day="2026-10-19", start="13:00", end="14:00", team="A", room="9F-1", kind="수동"):
+    return dict(zip(RESERVATION_SHEET_HEADERS, [day, start, end, team, room, kind, res_id]))
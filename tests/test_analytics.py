@@ -0,0 +1,37 @@
+from datetime import date
+
+from analytics import week_of
+from config import RESERVATION_SHEET_HEADERS
+from conftest import reservation_row
+from reservation_frame import frame_from_rows
+from reservation_store import SQLiteReservationStore
+
+MONDAY = date(2026, 9, 7)
+
+
+def _bookings(agg, dim, key, day):
+    part = agg[(agg["dim"] == dim) & (agg["key"] == key) & (agg["week"] == week_of(day.toordinal()))]
+    return int(part["bookings"].sum())
+
+
+def test_aggregates_include_archived_weeks():
+    store = SQLiteReservationStore(":memory:")
+    store.add([reservation_row("old", day="2026-09-08"), reservation_row("new", day="2026-10-19", room="9F-2")])
+    assert store.archive_before(date(2026, 10, 1)) == 1
+    agg = store.usage_aggregates(MONDAY, date(2026, 10, 25))
+    assert _bookings(agg, "room", "9F-1", MONDAY) == 1
+    assert _bookings(agg, "room", "9F-2", date(2026, 10, 19)) == 1
+
+
+def test_imported_archive_rebuilds_aggregates():
+    # 보관 시트를 늦게 가져와도(지난 주 조회 시) 이미 채운 집계가 다시 만들어져 보관분이 포함됨
+    store = SQLiteReservationStore(":memory:")
+    store.add([reservation_row("new", day="2026-10-19")])
+    assert _bookings(store.usage_aggregates(MONDAY), "room", "9F-1", MONDAY) == 0
+    archived = frame_from_rows([list(reservation_row(f"old-{i}", day="2026-09-09", start=f"{13 + i}:00", end=f"{14 + i}:00").values()) for i in range(3)],
+                               RESERVATION_SHEET_HEADERS)
+    store.import_archive(archived)
+    agg = store.usage_aggregates(MONDAY)
+    assert _bookings(agg, "room", "9F-1", MONDAY) == 3
+    assert int(agg[(agg["dim"] == "room") & (agg["week"] == week_of(MONDAY.toordinal()))]["minutes"].sum()) == 180
+    assert _bookings(agg, "team", "A", date(2026, 10, 19)) == 1
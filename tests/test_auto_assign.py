@@ -0,0 +1,39 @@
+from datetime import date
+
+from auto_assign import assign_day, plan_range
+from config import ROTATION_ROOMS, ROTATION_TEAMS, SENIOR_ROOM, SENIOR_TEAM
+from reservation_store import SQLiteReservationStore
+
+PER_DAY = min(len(ROTATION_TEAMS), len(ROTATION_ROOMS))
+
+
+def _teams_by_room(rows, day):
+    return {row["방"]: row["조"] for row in rows if row["날짜"] == day}
+
+
+def test_plan_commit_and_replan_overlapping_range():
+    store = SQLiteReservationStore(":memory:")
+    first = plan_range(date(2026, 10, 18), date(2026, 11, 1), 3, store.load_range(date(2026, 10, 18), date(2026, 11, 1)))
+    assert first.days == [date(2026, 10, 18), date(2026, 10, 21), date(2026, 10, 25), date(2026, 10, 28), date(2026, 11, 1)]
+    assert first.next_team_index == (3 + 5 * PER_DAY) % len(ROTATION_TEAMS)
+    for day in first.days:
+        assert _teams_by_room(first.rows, day)[SENIOR_ROOM] == SENIOR_TEAM  # 시니어조는 매번 같은 방
+    # 로테이션은 날짜 순서대로 이어짐: 둘째 날 첫 방은 첫날 마지막 조의 다음 조
+    assert _teams_by_room(first.rows, first.days[1])[ROTATION_ROOMS[0]] == ROTATION_TEAMS[(3 + PER_DAY) % len(ROTATION_TEAMS)]
+    store.add(first.rows, next_team_index=first.next_team_index)
+
+    second = plan_range(date(2026, 10, 25), date(2026, 11, 8), store.get_rotation_index(), store.load_range(date(2026, 10, 25), date(2026, 11, 8)))
+    assert second.skipped_days == [date(2026, 10, 25), date(2026, 10, 28), date(2026, 11, 1)]
+    assert second.days == [date(2026, 11, 4), date(2026, 11, 8)]
+    assert _teams_by_room(second.rows, date(2026, 11, 4))[ROTATION_ROOMS[0]] == ROTATION_TEAMS[first.next_team_index]
+    assert second.next_team_index == (first.next_team_index + 2 * PER_DAY) % len(ROTATION_TEAMS)
+
+
+def test_plan_matches_assigning_each_day_in_turn():
+    plan = plan_range(date(2026, 10, 18), date(2026, 10, 25), 0, SQLiteReservationStore(":memory:").load_all())
+    index, expected = 0, []
+    for day in (date(2026, 10, 18), date(2026, 10, 21), date(2026, 10, 25)):
+        rows, _, index = assign_day(day, index)
+        expected += [(row["날짜"], row["조"], row["방"], row["시간_시작"], row["시간_종료"]) for row in rows]
+    assert [(row["날짜"], row["조"], row["방"], row["시간_시작"], row["시간_종료"]) for row in plan.rows] == expected
+    assert plan.next_team_index == index
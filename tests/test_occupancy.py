@@ -0,0 +1,68 @@
+from datetime import date, time
+
+from config import RESERVATION_SHEET_HEADERS
+from conftest import reservation_row
+from occupancy import MINUTES_PER_DAY, OccupancyIndex, end_minutes, interval_mask
+from reservation_frame import frame_from_rows
+
+WEDNESDAY = date(2026, 10, 21)
+
+
+def _frame(*rows):
+    return frame_from_rows([list(row.values()) for row in rows], RESERVATION_SHEET_HEADERS)
+
+
+def _index(*rows):
+    df = _frame(*rows)
+    return OccupancyIndex(lambda day: df[df["날짜"] == day.toordinal()])
+
+
+def _row(day, start, end, team="A", room="9F-1"):
+    return {"날짜": day, "시간_시작": start, "시간_종료": end, "조": team, "방": room}
+
+
+def test_end_of_day_markers():
+    assert end_minutes(21 * 60, 23 * 60 + 59) == MINUTES_PER_DAY
+    assert end_minutes(13 * 60, 0) == MINUTES_PER_DAY
+    assert end_minutes(0, 0) == 0  # 오전 시작의 00:00 은 자정 종료가 아님
+    assert end_minutes(9 * 60, 10 * 60) == 10 * 60
+
+
+def test_wednesday_slot_until_2359_blocks_last_minute():
+    index = _index(reservation_row("w", day="2026-10-21", start="21:00", end="23:59"))
+    assert index.room_mask(WEDNESDAY, "9F-1") == interval_mask(21 * 60, MINUTES_PER_DAY)
+    assert index.conflict(WEDNESDAY, "9F-1", "B", time(23, 0), time(0, 0)) == "room"
+    assert index.conflict(WEDNESDAY, "9F-2", "A", time(23, 30), time(23, 59)) == "team"
+    assert index.conflict(WEDNESDAY, "9F-1", "B", time(20, 0), time(21, 0)) is None
+
+
+def test_midnight_end_after_afternoon_start():
+    index = _index(reservation_row("m", day="2026-10-21", start="22:00", end="00:00"))
+    assert index.room_mask(WEDNESDAY, "9F-1") == interval_mask(22 * 60, MINUTES_PER_DAY)
+    assert not index.room_free(WEDNESDAY, "9F-1", time(23, 0), time(23, 59))
+    assert index.room_free(WEDNESDAY, "9F-1", time(0, 0), time(1, 0))
+
+
+def test_validate_batch_reports_intra_batch_clashes():
+    index = _index(reservation_row("x", day="2026-10-21", start="13:00", end="14:00", room="9F-3", team="C"))
+    rows = [
+        _row(WEDNESDAY, time(18, 0), time(19, 0), team="A", room="9F-1"),
+        _row(WEDNESDAY, time(18, 30), time(19, 30), team="B", room="9F-1"),   # 같은 배치의 방과 겹침
+        _row(WEDNESDAY, time(18, 0), time(18, 30), team="A", room="9F-2"),    # 같은 배치의 조와 겹침
+        _row(WEDNESDAY, time(13, 30), time(14, 0), team="D", room="9F-3"),    # 기존 예약과 겹침
+        _row(WEDNESDAY, time(19, 30), time(20, 0), team="A", room="9F-1"),    # 바로 이어지는 시간은 허용
+    ]
+    assert [(row["조"], row["방"], kind) for row, kind in index.validate_batch(rows)] == [("B", "9F-1", "room"), ("A", "9F-2", "team"), ("D", "9F-3", "room")]
+
+
+def test_prime_then_missing_days():
+    loads = []
+    index = OccupancyIndex(lambda day: loads.append(day) or _frame())
+    days = [date(2026, 10, 19), date(2026, 10, 20), date(2026, 10, 21)]
+    index.prime(days[:2], _frame(reservation_row("p", day="2026-10-20")))
+    assert index.missing_days(days) == [date(2026, 10, 21)]
+    assert not index.room_free(days[1], "9F-1", time(13, 0), time(14, 0))
+    assert index.room_free(days[0], "9F-1", time(13, 0), time(14, 0))
+    assert loads == []  # 채운 날짜는 다시 조회하지 않음
+    index.room_mask(days[2], "9F-1")
+    assert loads == [days[2]] and index.missing_days(days) == []
@@ -0,0 +1,96 @@
+from benchmarks.fake_sheets import FakeWorksheet
+from config import RESERVATION_SHEET_HEADERS
+from conftest import reservation_row
+from reservation_sheet import ReservationSheet
+
+
+def _sheet_with(spreadsheet, ids):
+    ws = spreadsheet.add_worksheet("reservations", values=[RESERVATION_SHEET_HEADERS] + [list(reservation_row(i).values()) for i in ids])
+    return ws, ReservationSheet(ws, RESERVATION_SHEET_HEADERS)
+
+
+def _sheet_ids(ws):
+    return [row[-1] for row in ws.rows[1:]]
+
+
+# --- append ---
+
+class _FlakyAppendWorksheet(FakeWorksheet):
+    """첫 append_rows 는 시트에 반영한 뒤 응답 단계에서 실패 (타임아웃/5xx 후 재시도 상황)."""
+
+    failures = 1
+
+    def append_rows(self, values, **kwargs):
+        response = super().append_rows(values, **kwargs)
+        if self.failures:
+            self.failures -= 1
+            raise self.spreadsheet.meter._api_error(503)
+        return response
+
+
+def test_append_after_failed_response_does_not_duplicate(spreadsheet):
+    ws = _FlakyAppendWorksheet(spreadsheet, "reservations", 0, [RESERVATION_SHEET_HEADERS, list(reservation_row("r1").values())])
+    spreadsheet._sheets.append(ws)
+    sheet = ReservationSheet(ws, RESERVATION_SHEET_HEADERS)
+    sheet.row_of("r1")
+    batch = [reservation_row("r2"), reservation_row("r3")]
+    try: sheet.append(batch)
+    except Exception: pass
+    sheet.append(batch)  # 저널 재실행
+    assert _sheet_ids(ws) == ["r1", "r2", "r3"]
+    assert sheet.row_of("r3") == 4
+
+
+def test_append_skips_known_ids_and_tracks_positions(spreadsheet):
+    ws, sheet = _sheet_with(spreadsheet, ["r1"])
+    sheet.append([reservation_row("r1"), reservation_row("r2")])
+    assert _sheet_ids(ws) == ["r1", "r2"]
+    assert sheet.row_of("r2") == 3
+
+
+# --- delete ---
+
+def test_delete_non_contiguous_ids_in_one_batch_update(spreadsheet, meter):
+    ws, sheet = _sheet_with(spreadsheet, ["r1", "r2", "r3", "r4", "r5", "r6"])
+    sheet.row_of("r1")
+    meter.reset()
+    assert sheet.delete(["r2", "r3", "r5"]) == 3
+    assert _sheet_ids(ws) == ["r1", "r4", "r6"]
+    assert meter.by_method["batch_update"] == 1
+    assert {sheet.row_of(i) for i in ["r1", "r4", "r6"]} == {2, 3, 4}
+    assert sheet.row_of("r2") is None
+
+
+def test_delete_shifts_positions_for_later_deletes(spreadsheet):
+    ws, sheet = _sheet_with(spreadsheet, ["r1", "r2", "r3", "r4", "r5"])
+    sheet.delete(["r1", "r3"])
+    assert [sheet.row_of(i) for i in ["r2", "r4", "r5"]] == [2, 3, 4]
+    sheet.delete(["r5"])
+    sheet.append([reservation_row("r6")])
+    assert _sheet_ids(ws) == ["r2", "r4", "r6"]
+    assert sheet.row_of("r6") == 4
+
+
+def test_delete_reindexes_when_sheet_was_edited(spreadsheet, meter):
+    ws, sheet = _sheet_with(spreadsheet, ["r1", "r2", "r3", "r4"])
+    sheet.row_of("r1")
+    del ws.rows[1]  # 다른 곳에서 r1 행을 직접 지움 → 캐시된 위치가 한 칸씩 어긋남
+    meter.reset()
+    assert sheet.delete(["r3"]) == 1
+    assert _sheet_ids(ws) == ["r2", "r4"]
+    assert meter.by_method["batch_update"] == 1
+    assert sheet.row_of("r4") == 3
+
+
+def test_delete_unknown_ids_sends_only_extra_requests(spreadsheet, meter):
+    ws, sheet = _sheet_with(spreadsheet, ["r1"])
+    sheet.row_of("r1")
+    meter.reset()
+    assert sheet.delete(["missing"]) == 0
+    assert "batch_update" not in meter.by_method
+    rotation_ws = spreadsheet.add_worksheet("rotation_state", values=[["next_team_index"], ["0"]])
+    extra = {"updateCells": {"range": {"sheetId": rotation_ws.id, "startRowIndex": 1, "endRowIndex": 2, "startColumnIndex": 0, "endColumnIndex": 1},
+                             "rows": [{"values": [{"userEnteredValue": {"numberValue": 3}}]}], "fields": "userEnteredValue"}}
+    assert sheet.delete(["missing"], extra_requests=[extra]) == 0
+    assert meter.by_method["batch_update"] == 1
+    assert rotation_ws.rows[1] == ["3"] and _sheet_ids(ws) == ["r1"]
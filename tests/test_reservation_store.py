@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from conftest import reservation_row
+from reservation_store import ReservationConflict, SQLiteReservationStore
+
+
+@pytest.fixture
+def store():
+    return SQLiteReservationStore(":memory:")
+
+
+def test_add_rejects_room_and_team_overlaps(store):
+    store.add([reservation_row("r1", start="13:00", end="15:00", team="A", room="9F-1")])
+    with pytest.raises(ReservationConflict) as room:
+        store.add([reservation_row("r2", start="14:00", end="16:00", team="B", room="9F-1")])
+    with pytest.raises(ReservationConflict) as team:
+        store.add([reservation_row("r3", start="14:00", end="15:00", team="A", room="9F-2")])
+    assert [kind for _, kind in room.value.conflicts] == ["room"]
+    assert [kind for _, kind in team.value.conflicts] == ["team"]
+    assert store.known_ids() == {"r1"}
+    assert store.pending_count() == 1
+
+
+def test_add_rejects_whole_batch_on_intra_batch_clash(store):
+    with pytest.raises(ReservationConflict):
+        store.add([reservation_row("r1", start="21:00", end="23:59"), reservation_row("r2", start="23:00", end="00:00", team="B")], next_team_index=2)
+    assert store.known_ids() == set()
+    assert store.get_rotation_index() == 0
+
+
+def test_add_allows_adjacent_slots_and_rewriting_same_id(store):
+    store.add([reservation_row("r1", start="13:00", end="14:00")])
+    store.add([reservation_row("r2", start="14:00", end="15:00")])
+    store.add([reservation_row("r1", start="13:00", end="14:00", team="C")])
+    assert store.known_ids() == {"r1", "r2"}
+
+
+def test_concurrent_adds_for_same_slot_commit_once(store):
+    barrier = threading.Barrier(8)
+    results = []
+    def book(i):
+        barrier.wait()
+        try: store.add([reservation_row(f"r{i}", team=f"T{i}")]); results.append(True)
+        except ReservationConflict: results.append(False)
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert results.count(True) == 1
+    assert len(store.known_ids()) == 1
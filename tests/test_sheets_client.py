@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+from gspread.exceptions import APIError
+
+from config import RESERVATION_SHEET_HEADERS
+from sheets_client import SheetsClient, TokenBucket
+
+
+class FakeClock:
+    """clock/sleep 쌍. sleep 은 기다리지 않고 시각만 앞당기며 요청한 대기 시간을 기록한다."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def worksheet(spreadsheet):
+    return spreadsheet.add_worksheet("reservations", values=[RESERVATION_SHEET_HEADERS, ["2026-10-19", "13:00", "14:00", "A", "9F-1", "수동", "r1"]])
+
+
+def _client(clock, **kwargs):
+    kwargs.setdefault("rate_per_minute", 0)
+    kwargs.setdefault("coalesce_window", 0)
+    return SheetsClient(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+# --- 재시도 ---
+
+def test_read_retries_server_errors_until_success(meter, worksheet, clock):
+    client = _client(clock)
+    meter.inject_errors(2, status=503)
+    assert client.worksheet(worksheet).col_values(7) == ["예약ID", "r1"]
+    assert (client.requests, client.retries, client.throttled) == (3, 2, 0)
+    # retry_base=1 의 지수 백오프에 0.5~1 배 지터
+    assert 0.5 <= clock.sleeps[0] <= 1.0 and 1.0 <= clock.sleeps[1] <= 2.0
+
+
+def test_read_gives_up_after_max_retries(meter, worksheet, clock):
+    client = _client(clock, max_retries=2)
+    meter.inject_errors(3, status=500)
+    with pytest.raises(APIError): client.worksheet(worksheet).col_values(7)
+    assert (client.requests, client.retries) == (3, 2)
+
+
+def test_append_is_not_retried_on_server_error(meter, worksheet, clock):
+    client = _client(clock)
+    meter.inject_errors(1, status=503)
+    with pytest.raises(APIError): client.worksheet(worksheet).append_rows([["2026-10-19", "15:00", "16:00", "B", "9F-2", "수동", "r2"]])
+    assert (client.requests, client.retries) == (1, 0)
+    assert len(worksheet.rows) == 2
+
+
+def test_append_is_retried_on_quota_error(meter, worksheet, clock):
+    client = _client(clock, rate_per_minute=60)
+    meter.inject_errors(1, status=429)
+    client.worksheet(worksheet).append_rows([["2026-10-19", "15:00", "16:00", "B", "9F-2", "수동", "r2"]])
+    assert (client.requests, client.retries, client.throttled) == (2, 1, 1)
+    assert [row[-1] for row in worksheet.rows[1:]] == ["r1", "r2"]
+    assert client.buckets["write"].waited > 0  # 429 후 버킷을 비워 재시도가 토큰을 기다림
+
+
+def test_non_retryable_error_is_raised_immediately(worksheet, clock):
+    client = _client(clock)
+    with pytest.raises(KeyError): client.call("read", lambda: {}["missing"])
+    assert (client.requests, client.retries) == (1, 0)
+
+
+# --- 토큰 버킷 ---
+
+def test_token_bucket_waits_after_burst(clock):
+    bucket = TokenBucket(60, burst=2, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert bucket.acquire() == pytest.approx(1.0)
+    clock.now += 10
+    assert bucket.acquire() == 0.0
+    assert bucket.waited == pytest.approx(2.0)
+
+
+def test_zero_rate_disables_limiting(clock):
+    bucket = TokenBucket(0, burst=1, clock=clock, sleep=clock.sleep)
+    assert sum(bucket.acquire() for _ in range(100)) == 0.0
+    assert clock.sleeps == []
+
+
+def test_reads_and_writes_use_separate_buckets(worksheet, clock):
+    client = _client(clock, rate_per_minute=60, burst=1)
+    wrapped = client.worksheet(worksheet)
+    wrapped.col_values(7)
+    wrapped.update([["x"]], "H1")
+    assert clock.sleeps == []
+    wrapped.col_values(7)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+# --- 병합 ---
+
+def _concurrently(*calls):
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+    def run(i, call):
+        barrier.wait()
+        results[i] = call()
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return results
+
+
+def test_concurrent_range_reads_are_coalesced(meter, worksheet):
+    client = SheetsClient(rate_per_minute=0, coalesce_window=0.2)
+    wrapped = client.worksheet(worksheet)
+    meter.reset()
+    first, second = _concurrently(lambda: wrapped.get("G1"), lambda: wrapped.batch_get(["A2", "G2"]))
+    assert first == [["예약ID"]]
+    assert second == [[["2026-10-19"]], [["r1"]]]
+    assert meter.by_method == {"values_batch_get": 1}
+    assert client.stats()["coalesced_requests"] == 1
+
+
+def test_concurrent_cell_updates_are_coalesced_but_row_deletes_are_not(meter, worksheet, spreadsheet):
+    client = SheetsClient(rate_per_minute=0, coalesce_window=0.2)
+    wrapped = client.spreadsheet(spreadsheet)
+    def update(col, value):
+        return {"requests": [{"updateCells": {"range": {"sheetId": worksheet.id, "startRowIndex": 0, "endRowIndex": 1, "startColumnIndex": col, "endColumnIndex": col + 1},
+                                              "rows": [{"values": [{"userEnteredValue": {"stringValue": value}}]}], "fields": "userEnteredValue"}}]}
+    meter.reset()
+    replies = _concurrently(lambda: wrapped.batch_update(update(7, "x")), lambda: wrapped.batch_update(update(8, "y")))
+    assert meter.by_method == {"batch_update": 1}
+    assert [len(r["replies"]) for r in replies] == [1, 1]
+    assert worksheet.rows[0][7:9] == ["x", "y"]
+    delete = {"requests": [{"deleteDimension": {"range": {"sheetId": worksheet.id, "dimension": "ROWS", "startIndex": 1, "endIndex": 2}}}]}
+    _concurrently(lambda: wrapped.batch_update(delete), lambda: wrapped.batch_update(update(9, "z")))
+    assert meter.by_method == {"batch_update": 3}
+    assert len(worksheet.rows) == 1
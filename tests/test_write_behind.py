@@ -0,0 +1,76 @@
+from datetime import date
+
+from config import RESERVATION_SHEET_HEADERS, ROTATION_SHEET_HEADER
+from conftest import reservation_row
+from reservation_sheet import SheetsMirror
+from reservation_store import SQLiteReservationStore
+from write_behind import MirrorSyncWorker
+
+
+def _mirror(spreadsheet, ids, next_team_index=3):
+    reservations_ws = spreadsheet.add_worksheet("reservations", values=[RESERVATION_SHEET_HEADERS] + [list(reservation_row(i).values()) for i in ids])
+    rotation_ws = spreadsheet.add_worksheet("rotation_state", values=[ROTATION_SHEET_HEADER + ["data_version"], [str(next_team_index), "v1"]])
+    return SheetsMirror(reservations_ws, rotation_ws, RESERVATION_SHEET_HEADERS, ROTATION_SHEET_HEADER)
+
+
+def test_first_poll_marks_store_reconciled(spreadsheet, tmp_path):
+    path = str(tmp_path / "reservations.db")
+    store = SQLiteReservationStore(path)
+    assert not store.reconciled()
+    worker = MirrorSyncWorker(store, _mirror(spreadsheet, ["r1", "r2"]))
+    worker.poll_remote()
+    assert store.reconciled()
+    assert store.known_ids() == {"r1", "r2"}
+    assert store.get_rotation_index() == 3
+    assert SQLiteReservationStore(path).reconciled()  # 재시작 후에도 유지
+
+
+def test_reload_from_mirror_marks_store_reconciled(spreadsheet):
+    store = SQLiteReservationStore(":memory:")
+    store.import_from(_mirror(spreadsheet, ["r1"]))
+    assert store.reconciled()
+    assert store.known_ids() == {"r1"}
+
+
+def _instance(reservations_ws, rotation_ws):
+    store = SQLiteReservationStore(":memory:")
+    worker = MirrorSyncWorker(store, SheetsMirror(reservations_ws, rotation_ws, RESERVATION_SHEET_HEADERS, ROTATION_SHEET_HEADER))
+    worker.poll_remote()
+    return store, worker
+
+
+def test_flush_does_not_hide_another_instances_change(spreadsheet):
+    # 두 인스턴스가 같은 시트를 공유: B 가 반영한 뒤 A 가 반영해도 A 는 B 의 예약을 알아야 함
+    mirror = _mirror(spreadsheet, [])
+    store_a, worker_a = _instance(mirror.reservations_ws, mirror.rotation_ws)
+    store_b, worker_b = _instance(mirror.reservations_ws, mirror.rotation_ws)
+    store_b.add([reservation_row("fromB", room="9F-2")])
+    worker_b.flush_once()
+    store_a.add([reservation_row("fromA")])
+    worker_a.flush_once()
+    worker_a.poll_remote()
+    worker_b.poll_remote()
+    assert store_a.known_ids() == store_b.known_ids() == {"fromA", "fromB"}
+    assert sorted(row[-1] for row in mirror.reservations_ws.rows[1:]) == ["fromA", "fromB"]
+
+
+def test_rows_archived_elsewhere_move_to_local_archive(spreadsheet):
+    mirror = _mirror(spreadsheet, [])
+    store_a, worker_a = _instance(mirror.reservations_ws, mirror.rotation_ws)
+    store_b, worker_b = _instance(mirror.reservations_ws, mirror.rotation_ws)
+    store_a.add([reservation_row("past", day="2026-09-08"), reservation_row("future", day="2099-01-05"), reservation_row("cancelled", day="2099-01-06")])
+    worker_a.flush_once()
+    worker_b.poll_remote()
+    store_b.usage_aggregates()
+    store_b.import_archive(worker_b.mirror.fetch_archive())
+    store_a.delete(["cancelled"])
+    assert store_a.archive_before(date(2026, 10, 1)) == 1
+    worker_a.flush_once()
+    worker_b.poll_remote()
+    assert store_b.known_ids() == {"future"}
+    assert list(store_b.load_date(date(2026, 9, 8), include_archive=True)["예약ID"]) == ["past"]
+    assert store_b.load_date(date(2099, 1, 6), include_archive=True).empty  # 취소된 행은 보관하지 않음
+    agg = store_b.usage_aggregates()
+    assert agg[agg["dim"] == "room"]["bookings"].sum() == 2
+    store_b.backfill_usage()
+    assert store_b.usage_aggregates()[lambda a: a["dim"] == "room"]["bookings"].sum() == 2
@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_AUTO_ASSIGN_START_TIME, DEFAULT_MANUAL_RESERVATION_END_HOUR, WEDNESDAY_AUTO_ASSIGN_START_TIME, WEDNESDAY_AUTO_ASSIGN_END_TIME
+from occupancy import end_minutes_array
+
+# --- 시간표 엔진 ---
+# 하루치 예약의 시작/종료(분) 컬럼과 1시간 슬롯 경계를 브로드캐스팅해 슬롯×방 점유 행렬을 한 번에 계산하고,
+# 최종 HTML은 (날짜, 데이터 버전) 키로 LRU 캐시에 보관해 같은 날을 다시 볼 때 빌드와 Styler 렌더를 모두 건너뛴다.
+
+
+def cell_html(team, reservation_type):
+    type_str = "(자동)" if reservation_type == '자동' else "(수동)"
+    return f"<b style='color: #333333;'>{team}</b><br><small style='color: #555;'>{type_str}</small>"
+
+
+def display_hours(day):
+    """시간표에 보일 (시작 시, 끝 시). 수요일은 저녁 자동 배정 슬롯까지 늘린다."""
+    if day.weekday() == 2:
+        return min(DEFAULT_AUTO_ASSIGN_START_TIME.hour, WEDNESDAY_AUTO_ASSIGN_START_TIME.hour), WEDNESDAY_AUTO_ASSIGN_END_TIME.hour + 1
+    return DEFAULT_AUTO_ASSIGN_START_TIME.hour, DEFAULT_MANUAL_RESERVATION_END_HOUR
+
+
+def slot_owners(day_df, rooms, start_hour, end_hour):
+    """slot(행) × 방(열) 정수 배열. 각 칸을 차지한 예약의 행 위치(여러 예약이 겹치면 나중 행), 비어 있으면 -1."""
+    slot_starts = np.arange(start_hour, end_hour) * 60
+    owners = np.full((len(slot_starts), len(rooms)), -1, dtype=np.int64)
+    if day_df.empty or not len(slot_starts): return owners
+    res_start = day_df["시간_시작"].to_numpy(np.int32)
+    res_end = end_minutes_array(res_start, day_df["시간_종료"])
+    # 방 범주 코드 → rooms 안의 열 위치
+    room_pos = {room: i for i, room in enumerate(rooms)}
+    room_cat = day_df["방"].cat
+    room_idx = np.array([room_pos.get(room, -1) for room in room_cat.categories] + [-1], dtype=np.int32)[room_cat.codes.to_numpy()]
+    # (예약, 슬롯) 겹침 → (예약, 슬롯, 방) 으로 확장
+    overlap = (res_start[:, None] < slot_starts[None, :] + 60) & (res_end[:, None] > slot_starts[None, :])
+    covered = overlap[:, :, None] & (room_idx[:, None, None] == np.arange(len(rooms))[None, None, :])
+    last_res = len(day_df) - 1 - covered[::-1].argmax(axis=0)
+    return np.where(covered.any(axis=0), last_res, owners)
+
+
+def build_timetable(day_df, rooms, start_hour, end_hour):
+    """slot(행) × 방(열) 시간표 DataFrame. 같은 칸에 여러 예약이 겹치면 나중 행이 표시된다."""
+    index = [f"{h:02d}:00" for h in range(start_hour, end_hour)]
+    owners = slot_owners(day_df, rooms, start_hour, end_hour)
+    grid = np.full(owners.shape, '', dtype=object)
+    if not day_df.empty:
+        contents = np.array([cell_html(team, kind) for team, kind in zip(day_df["조"], day_df["예약유형"])], dtype=object)
+        grid = np.where(owners >= 0, contents[owners], grid)
+    return pd.DataFrame(grid, index=index, columns=list(rooms))
+
+
+def style_timetable(df_in):
+    styled_df = df_in.style.set_properties(**{
+        'border': '1px solid #ddd', 'text-align': 'center', 'vertical-align': 'middle',
+        'min-width': '85px', 'height': '60px', 'font-size': '0.9em',
+        'line-height': '1.5'
+    }).set_table_styles([
+        {'selector': 'th', 'props': [
+            ('background-color', '#f0f0f0'), ('border', '1px solid #ccc'),
+            ('font-weight', 'bold'), ('padding', '8px'), ('color', '#333'),
+            ('vertical-align', 'middle')
+        ]},
+        {'selector': 'th.row_heading', 'props': [
+            ('background-color', '#f0f0f0'), ('border', '1px solid #ccc'),
+            ('font-weight', 'bold'), ('padding', '8px'), ('color', '#333'),
+            ('vertical-align', 'middle')
+        ]},
+        {'selector': 'td', 'props': [('padding', '8px'), ('vertical-align', 'top')]}
+    ])
+    def highlight_reserved_cell(val_html):
+        bg_color = 'background-color: white;'
+        if isinstance(val_html, str) and val_html != '':
+            if '(자동)' in val_html: bg_color = 'background-color: #e0f3ff;'
+            elif '(수동)' in val_html: bg_color = 'background-color: #d4edda;'
+        return f'{bg_color};'
+    styled_df = styled_df.set_table_attributes('style="border-collapse: collapse;"')
+    try:
+        return styled_df.map(highlight_reserved_cell)
+    except AttributeError:
+        # pandas < 2.1 에는 Styler.map 이 없음
+        return styled_df.applymap(highlight_reserved_cell)
+
+
+class TimetableHtmlCache:
+    """(날짜, 데이터 버전) → 렌더링된 시간표 HTML. 모든 세션이 공유하며 오래 안 쓴 항목부터 제거한다."""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        html = render()
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock: self._entries.clear()
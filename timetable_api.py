@@ -0,0 +1,165 @@
+"""읽기 전용 시간표 HTTP API.
+
+    GET /api/timetable?date=YYYY-MM-DD          날짜별 방×시간 점유 (JSON, date 생략 시 오늘)
+    GET /api/timetable.ics?date=YYYY-MM-DD&days=7  iCalendar 피드 (date 부터 days 일, 최대 31일)
+
+로비 화면이나 휴대폰처럼 시간표만 보는 클라이언트가 Streamlit 세션 없이 폴링하도록 한다.
+앱 안에서는 환경 변수 TIMETABLE_API_PORT 가 있으면 같은 저장소를 공유하는 스레드로 뜨고,
+따로 띄울 때는 python timetable_api.py --port 8502 --db reservations.db 로 로컬 저장소를 읽기만 한다.
+"""
+import argparse
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from config import ALL_ROOMS, KST, DEFAULT_RESERVATION_DB_PATH
+from metrics import METRICS
+from occupancy import end_minutes_array
+from reservation_frame import format_minutes, ordinal_to_date
+from timetable import TimetableHtmlCache, display_hours, slot_owners
+
+# --- 응답 캐시 / ETag ---
+# ETag 는 (프로세스 시작 nonce, 저장소 데이터 버전, 요청 키)로 만들고, 본문은 같은 키로 LRU 캐시에 보관한다.
+# 데이터가 그대로면 If-None-Match 가 맞는 요청은 저장소 조회 없이 304, 새 클라이언트는 캐시된 본문을 그대로 받는다.
+# 저장소 버전은 프로세스마다 0 부터 다시 세므로 nonce 를 섞어 재시작 전 ETag 와 겹치지 않게 한다.
+
+MAX_ICS_DAYS = 31
+_PROCESS_NONCE = uuid.uuid4().hex[:8]
+
+
+def timetable_payload(day, day_df, rooms=ALL_ROOMS):
+    """하루치 컬럼형 예약 → JSON 용 dict. occupancy 는 방마다 슬롯 순서의 {조, 유형, 예약ID} 또는 null."""
+    start_hour, end_hour = display_hours(day)
+    owners = slot_owners(day_df, rooms, start_hour, end_hour)
+    day_df = day_df.reset_index(drop=True)
+    reservations = [{"start": format_minutes(start), "end": format_minutes(end), "team": team, "room": room, "type": kind, "id": res_id}
+                    for start, end, team, room, kind, res_id in zip(day_df["시간_시작"].tolist(), day_df["시간_종료"].tolist(), day_df["조"], day_df["방"], day_df["예약유형"], day_df["예약ID"])]
+    cells = [{"team": r["team"], "type": r["type"], "id": r["id"]} for r in reservations]
+    return {
+        "date": day.isoformat(),
+        "slots": [f"{h:02d}:00" for h in range(start_hour, end_hour)],
+        "rooms": list(rooms),
+        "occupancy": {room: [cells[owner] if owner >= 0 else None for owner in owners[:, col].tolist()] for col, room in enumerate(rooms)},
+        "reservations": sorted(reservations, key=lambda r: (r["start"], r["room"])),
+    }
+
+
+def _ics_text(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_utc(day, minutes):
+    local = datetime.combine(day, datetime.min.time(), tzinfo=KST) + timedelta(minutes=int(minutes))
+    return local.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def timetable_ics(range_df, stamp):
+    """기간 예약 → iCalendar 텍스트 (CRLF). 시각은 UTC 로 쓰며, 23:59 종료는 자정으로 본다."""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//FruitRoom//Timetable//KO", "CALSCALE:GREGORIAN", "X-WR-CALNAME:조모임방 예약", "X-WR-TIMEZONE:Asia/Seoul"]
+    ends = end_minutes_array(range_df["시간_시작"], range_df["시간_종료"]).tolist()
+    for ordinal, start, end, team, room, kind, res_id in zip(range_df["날짜"].tolist(), range_df["시간_시작"].tolist(), ends,
+                                                             range_df["조"], range_df["방"], range_df["예약유형"], range_df["예약ID"]):
+        day = ordinal_to_date(ordinal)
+        lines += ["BEGIN:VEVENT", f"UID:{_ics_text(res_id)}@fruitroom", f"DTSTAMP:{stamp}",
+                  f"DTSTART:{_ics_utc(day, start)}", f"DTEND:{_ics_utc(day, end)}",
+                  f"SUMMARY:{_ics_text(f'{team} · {room}')}", f"LOCATION:{_ics_text(room)}", f"DESCRIPTION:{_ics_text(f'{kind} 예약')}", "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def _etag_matches(header, etag):
+    # If-None-Match 는 약한 비교: W/ 접두어는 무시
+    if not header: return False
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in (t.strip() for t in header.split(",")))
+
+
+class TimetableAPI:
+    """요청 (경로, 쿼리) → (상태, 헤더, 본문) 처리기. store 는 load_range/data_version 을 가진 예약 저장소."""
+
+    def __init__(self, store, today=None, cache_size=256):
+        self.store = store
+        self.today = today or (lambda: datetime.now(KST).date())
+        self.cache = TimetableHtmlCache(maxsize=cache_size)  # 범용 LRU 로 응답 본문을 보관
+        METRICS.register_cache("timetable_api", lambda: (self.cache.hits, self.cache.misses))
+
+    def _load(self, start_day, end_day):
+        # 지난 날짜가 끼어 있으면 보관 파티션도 함께 읽음 (load_reservations 와 같은 기준)
+        return self.store.load_range(start_day, end_day, include_archive=start_day < self.today())
+
+    def _json(self, day):
+        return json.dumps(timetable_payload(day, self._load(day, day)), ensure_ascii=False).encode("utf-8")
+
+    def _ics(self, day, days):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return timetable_ics(self._load(day, day + timedelta(days=days - 1)), stamp).encode("utf-8")
+
+    def handle(self, path, query, if_none_match=None):
+        if path == "/api/timetable": kind, content_type = "json", "application/json; charset=utf-8"
+        elif path == "/api/timetable.ics": kind, content_type = "ics", "text/calendar; charset=utf-8"
+        else: return 404, {}, b""
+        try:
+            day = date.fromisoformat(query["date"][0]) if "date" in query else self.today()
+            days = max(1, min(MAX_ICS_DAYS, int(query.get("days", ["7"])[0]))) if kind == "ics" else 1
+        except ValueError:
+            return 400, {"Content-Type": "text/plain; charset=utf-8"}, "date=YYYY-MM-DD, days=정수".encode("utf-8")
+        key = (kind, day, days, self.store.data_version())
+        etag = f'"{_PROCESS_NONCE}-{key[3]}-{kind}-{day.isoformat()}-{days}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Access-Control-Allow-Origin": "*"}
+        not_modified = _etag_matches(if_none_match, etag)
+        METRICS.record_cache("timetable_api_etag", hit=not_modified)
+        if not_modified: return 304, headers, b""
+        body = self.cache.get_or_render(key, lambda: self._json(day) if kind == "json" else self._ics(day, days))
+        headers["Content-Type"] = content_type
+        return 200, headers, body
+
+
+def make_server(store, port, host="0.0.0.0"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    api = TimetableAPI(store)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, headers, body = api.handle(url.path, parse_qs(url.query), self.headers.get("If-None-Match"))
+            if status == 404:
+                self.send_error(404); return
+            self.send_response(status)
+            for name, value in headers.items(): self.send_header(name, value)
+            if status != 304: self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if status != 304: self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_timetable_api(store, port, host="0.0.0.0"):
+    """TimetableAPI 를 띄우는 데몬 HTTP 서버를 백그라운드 스레드로 시작하고 서버 객체를 반환."""
+    server = make_server(store, port, host)
+    threading.Thread(target=server.serve_forever, name="timetable-api", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    from reservation_store import SQLiteReservationStore
+    parser = argparse.ArgumentParser(description="읽기 전용 시간표 API (JSON / iCalendar)")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--db", default=os.environ.get("RESERVATION_DB_PATH", DEFAULT_RESERVATION_DB_PATH), help="로컬 예약 저장소(SQLite) 경로")
+    args = parser.parse_args(argv)
+    server = make_server(SQLiteReservationStore(args.db), args.port, args.host)
+    print(f"시간표 API: http://{args.host}:{args.port}/api/timetable")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import logging
+import random
+import threading
+import time as time_module
+from dataclasses import dataclass, field
+
+# --- 미러 write-behind ---
+# 예약/취소는 로컬 저장소와 outbox 저널에 커밋되는 즉시 확정되고, 이 워커가 백그라운드에서 저널을 읽어
+# 여러 변경을 하나의 배치로 합친 뒤 미러(Google Sheets)에 반영한다. 실패하면 저널을 남겨둔 채 지수 백오프로 재시도하므로
+# 시트 장애나 프로세스 재시작 뒤에도 남은 변경이 다시 반영된다.
+# 같은 스레드가 poll_interval 마다 미러의 데이터 버전 토큰(셀 하나)을 확인해, 다른 곳에서 바뀐 경우에만
+# 변경분을 가져와 로컬에 병합한다. 화면은 그동안 로컬 데이터를 그대로 쓰므로 여러 세션이 동시에 시트를 다시 읽는 일이 없다.
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MirrorBatch:
+    adds: list = field(default_factory=list)
+    deletes: list = field(default_factory=list)
+    archived: list = field(default_factory=list)
+    rotation_index: int = None
+
+    def __bool__(self):
+        return bool(self.adds) or bool(self.deletes) or bool(self.archived) or self.rotation_index is not None
+
+
+def coalesce(ops):
+    """(seq, op, payload) 저널을 하나의 MirrorBatch 로 병합.
+
+    같은 배치 안에서 추가 후 취소된 예약은 미러에 아예 보내지 않는다.
+    보관(archive)된 예약은 보관 시트에 추가되고, 라이브 시트에 이미 올라가 있던 경우에만 라이브 시트에서 삭제된다.
+    """
+    batch = MirrorBatch()
+    adds = {}
+    deletes = []
+    archived = []
+    for _, op, payload in ops:
+        if op == "add":
+            for row in payload: adds[row["예약ID"]] = row
+        elif op == "delete":
+            for res_id in payload:
+                if res_id in adds: del adds[res_id]
+                elif res_id not in deletes: deletes.append(res_id)
+        elif op == "archive":
+            for row in payload:
+                archived.append(row)
+                if row["예약ID"] in adds: del adds[row["예약ID"]]
+                elif row["예약ID"] not in deletes: deletes.append(row["예약ID"])
+        elif op == "set_rotation_index":
+            batch.rotation_index = payload
+    batch.archived = archived
+    batch.adds = list(adds.values())
+    batch.deletes = deletes
+    return batch
+
+
+class MirrorSyncWorker(threading.Thread):
+    """store 의 outbox 를 mirror.apply_batch 로 비우는 데몬 스레드.
+
+    notify() 로 깨우면 debounce 초 동안 더 들어오는 변경을 모아 한 번에 반영하고,
+    실패 시 retry_base 부터 max_backoff 까지 지터를 섞은 지수 백오프로 재시도한다.
+    poll_interval 마다 원격 변경을 확인하며, 시작 직후 첫 확인에서는 토큰과 관계없이 한 번 대조한다.
+    """
+
+    def __init__(self, store, mirror, debounce=0.5, poll_interval=30.0, retry_base=2.0, max_backoff=120.0):
+        super().__init__(name="mirror-sync", daemon=True)
+        self.store = store
+        self.mirror = mirror
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.last_error = None
+        self.last_synced_at = None
+        self.remote_version = None
+        self.failures = 0
+        self._last_poll = 0.0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def flush_once(self):
+        """남은 저널을 한 번 반영. 반영한 작업 수를 반환하며 실패 시 예외를 그대로 올린다.
+
+        반영하면 공유 버전 토큰이 새 값으로 바뀌어 그 전의 다른 인스턴스 변경을 토큰으로 더는 감지할 수 없으므로,
+        쓰기 직전에 원격 토큰을 확인해 바뀌었으면 먼저 병합한다.
+        """
+        ops = self.store.pending_ops()
+        if not ops: return 0
+        batch = coalesce(ops)
+        if batch:
+            self.poll_remote()
+            self.remote_version = self.mirror.apply_batch(batch)
+        self.store.ack(ops[-1][0])
+        return len(ops)
+
+    def poll_remote(self):
+        """원격 버전 토큰이 바뀐 경우에만 예약ID 열과 새 행 범위를 읽어 로컬에 병합. 병합한 행 수를 반환."""
+        self._last_poll = time_module.time()
+        token, next_team_index = self.mirror.fetch_remote_state()
+        if token == self.remote_version: return 0
+        sheet_ids, new_rows = self.mirror.fetch_delta(self.store.known_ids())
+        changed = self.store.merge_remote(sheet_ids, new_rows, next_team_index)
+        self.remote_version = token
+        return changed
+
+    def _backoff(self):
+        delay = min(self.max_backoff, self.retry_base * (2 ** (self.failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run(self):
+        timeout = 0  # 시작 직전까지 남아 있던 저널부터 반영
+        retry_at = 0.0
+        while not self._stopped.is_set():
+            woke = self._wakeup.wait(timeout)
+            if self._stopped.is_set(): break
+            if self.failures and time_module.time() < retry_at:
+                # 백오프 중에는 새 변경이 들어와도 재시도 시각까지 기다림
+                self._wakeup.clear()
+                timeout = retry_at - time_module.time()
+                continue
+            if woke and self.debounce: time_module.sleep(self.debounce)
+            self._wakeup.clear()
+            try:
+                self.flush_once()
+                # 반영할 배치가 있었다면 flush_once 가 방금 확인했으므로 주기가 된 경우에만 따로 확인
+                if time_module.time() - self._last_poll >= self.poll_interval: self.poll_remote()
+                self.failures, self.last_error = 0, None
+                self.last_synced_at = time_module.time()
+                timeout = self.poll_interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+                timeout = self._backoff()
+                retry_at = time_module.time() + timeout
+                logger.warning("미러 동기화 실패 (%d회째, %.1f초 후 재시도): %s", self.failures, timeout, e)